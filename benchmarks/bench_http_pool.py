@@ -0,0 +1,74 @@
+"""Connections opened per run: a fresh requests.post per call vs the shared provider pool.
+
+    python benchmarks/bench_http_pool.py [--calls 50]
+
+Starts a local OpenAI-compatible stub, sends the same completion N times both
+ways, and reports how many TCP connections the server accepted and the wall time.
+"""
+from __future__ import annotations
+import argparse, json, os, sys, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import requests  # noqa: E402
+from ai_cli.providers.vllm import VLLM  # noqa: E402
+
+REPLY = json.dumps({"choices": [{"message": {"content": "ok"}}]}).encode()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(REPLY)))
+        self.end_headers()
+        self.wfile.write(REPLY)
+
+
+def serve() -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    srv.lock, srv.connections = threading.Lock(), 0
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=50)
+    args = ap.parse_args()
+    srv = serve()
+    base = f"http://127.0.0.1:{srv.server_address[1]}/v1"
+    body = {"model": "m", "messages": [{"role": "user", "content": "x"}], "max_tokens": 8}
+
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        requests.post(f"{base}/chat/completions", json=body, timeout=10).json()
+    cold, cold_conns = time.perf_counter() - t0, srv.connections
+
+    srv.connections = 0
+    prov = VLLM(base_url=base)
+    t0 = time.perf_counter()
+    for _ in range(args.calls):
+        prov.complete("sys", "x", "m", 8, 10)
+    warm, warm_conns = time.perf_counter() - t0, srv.connections
+
+    print(f"{'':<16}{'connections':>12}{'ms/call':>10}")
+    print(f"{'requests.post':<16}{cold_conns:>12}{cold / args.calls * 1000:>10.2f}")
+    print(f"{'shared pool':<16}{warm_conns:>12}{warm / args.calls * 1000:>10.2f}")
+    print(f"handshakes saved per {args.calls} calls: {cold_conns - warm_conns}; pool_stats={VLLM.pool_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""SSE decoding rate (events/sec): the old line-based parser vs stream.iter_sse.
+
+    python benchmarks/bench_sse.py [--events 200000]
+
+Both parsers read the same Anthropic-style stream (text deltas interleaved with
+ping and comment keep-alives) from an in-memory requests.Response. The
+"+ json" rows include the provider-side json.loads of every event they yield.
+"""
+from __future__ import annotations
+import argparse, io, json, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+import requests  # noqa: E402
+from ai_cli.stream import iter_sse  # noqa: E402
+
+
+def legacy_iter_sse_lines(resp):
+    buf = []
+    for raw in resp.iter_lines(decode_unicode=True):
+        if raw is None:
+            continue
+        if raw == "":
+            if not buf:
+                continue
+            event = {"event": None, "data": "", "id": None}
+            for line in buf:
+                if line.startswith("data:"):
+                    event["data"] += line[5:].lstrip() + "\n"
+                elif line.startswith("event:"):
+                    event["event"] = line[6:].lstrip()
+                elif line.startswith("id:"):
+                    event["id"] = line[3:].lstrip()
+            event["data"] = event["data"].rstrip("\n")
+            yield event
+            buf = []
+        else:
+            buf.append(raw)
+
+
+def make_stream(n: int, crlf: bool) -> bytes:
+    out = []
+    for i in range(n):
+        if i % 10 == 9:
+            out.append(b"event: ping\ndata: {\"type\": \"ping\"}\n\n: keep-alive\n\n")
+        delta = {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": f"tok{i} "}}
+        out.append(b"event: content_block_delta\ndata: " + json.dumps(delta).encode() + b"\n\n")
+    data = b"".join(out)
+    return data.replace(b"\n", b"\r\n") if crlf else data
+
+
+def response(data: bytes) -> requests.Response:
+    r = requests.Response()
+    r.status_code = 200
+    r.encoding = "utf-8"
+    r.raw = io.BytesIO(data)
+    return r
+
+
+def legacy(data: bytes, parse: bool) -> int:
+    n = 0
+    for ev in legacy_iter_sse_lines(response(data)):
+        if parse:
+            if not ev["data"]:
+                continue
+            j = json.loads(ev["data"])
+            if j.get("type") != "content_block_delta":
+                continue
+        n += 1
+    return n
+
+
+def new(data: bytes, parse: bool) -> int:
+    n = 0
+    for ev in iter_sse(response(data), types=("content_block_delta",) if parse else None):
+        if parse:
+            json.loads(ev.data)
+        n += 1
+    return n
+
+
+def rate(fn, data, parse, repeat=5) -> float:
+    best, n = float("inf"), 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn(data, parse)
+        best = min(best, time.perf_counter() - t0)
+    return n / best
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--events", type=int, default=200_000)
+    args = ap.parse_args()
+    print(f"{'parser':<28}{'LF ev/s':>12}{'CRLF ev/s':>12}")
+    lf, crlf = make_stream(args.events, False), make_stream(args.events, True)
+    for name, fn, parse in [("legacy iter_sse_lines", legacy, False), ("iter_sse", new, False),
+                            ("legacy + json", legacy, True), ("iter_sse + json", new, True)]:
+        print(f"{name:<28}{rate(fn, lf, parse):>12,.0f}{rate(fn, crlf, parse):>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
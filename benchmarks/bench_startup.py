@@ -0,0 +1,64 @@
+"""Cold-start budget for the `kull` entry point.
+
+    python benchmarks/bench_startup.py [--budget-ms 40] [--runs 7]
+
+Runs `python -X importtime -c "import ai_cli.cli"` several times and takes the
+median cumulative import time of ai_cli.cli. Exits non-zero when that exceeds
+the budget or when a provider backend (requests) is imported eagerly.
+Also prints the wall time of `python -m ai_cli --version` for reference.
+"""
+from __future__ import annotations
+import argparse, os, statistics, subprocess, sys, time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+FORBIDDEN = ("requests", "urllib3", "ai_cli.providers.openai", "ai_cli.providers.anthropic",
+             "ai_cli.providers.ollama", "ai_cli.user_profile")
+
+
+def import_profile() -> tuple[int, list[str]]:
+    env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""))
+    r = subprocess.run([sys.executable, "-X", "importtime", "-c", "import ai_cli.cli"],
+                       capture_output=True, text=True, env=env, check=True)
+    cli_us, modules = 0, []
+    for line in r.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        name = name.strip()
+        modules.append(name)
+        if name == "ai_cli.cli":
+            cli_us = int(cumulative)
+    return cli_us, modules
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--budget-ms", type=float, default=40.0)
+    ap.add_argument("--runs", type=int, default=7)
+    args = ap.parse_args()
+
+    samples, modules = [], []
+    for _ in range(args.runs):
+        us, modules = import_profile()
+        samples.append(us / 1000)
+    median = statistics.median(samples)
+
+    env = dict(os.environ, PYTHONPATH=SRC)
+    walls = []
+    for _ in range(args.runs):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "ai_cli", "--version"], capture_output=True, env=env, check=True)
+        walls.append((time.perf_counter() - t0) * 1000)
+
+    eager = [m for m in FORBIDDEN if m in modules]
+    print(f"import ai_cli.cli: median {median:.1f} ms (budget {args.budget_ms:.0f} ms)")
+    print(f"kull --version wall: median {statistics.median(walls):.1f} ms (includes interpreter startup)")
+    if eager:
+        print(f"FAIL: imported at startup: {', '.join(eager)}")
+    if median > args.budget_ms:
+        print("FAIL: cold start over budget")
+    sys.exit(1 if eager or median > args.budget_ms else 0)
+
+
+if __name__ == "__main__":
+    main()
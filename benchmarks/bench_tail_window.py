@@ -0,0 +1,46 @@
+"""Throughput of stream.tail_window as the retained window grows.
+
+    python benchmarks/bench_tail_window.py [--input-mib 256]
+
+The per-chunk cost of the ring buffer does not depend on the window size, so
+MB/s should stay flat from 128 KiB up to 64 MiB.
+"""
+from __future__ import annotations
+import argparse, io, os, sys, time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+from ai_cli.stream import tail_window  # noqa: E402
+
+WINDOWS = [128 << 10, 1 << 20, 4 << 20, 16 << 20, 64 << 20]
+
+
+class NullSink:
+    def write(self, b):
+        return len(b)
+
+    def flush(self):
+        pass
+
+
+def run(input_bytes: int, limit: int) -> float:
+    line = b"Oct 16 10:00:00 host sshd[1234]: Failed password for root from 10.0.0.1 port 22 ssh2\n"
+    src = io.BytesIO(line * (input_bytes // len(line)))
+    size = src.getbuffer().nbytes
+    t0 = time.perf_counter()
+    out = tail_window(limit, src=src, dst=NullSink())
+    dt = time.perf_counter() - t0
+    assert len(out) == min(limit, size)
+    return size / dt / 1e6
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--input-mib", type=int, default=256)
+    args = ap.parse_args()
+    print(f"{'window':>10}  {'MB/s':>8}")
+    for w in WINDOWS:
+        print(f"{w >> 10:>8}Ki  {run(args.input_mib << 20, w):>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
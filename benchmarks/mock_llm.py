@@ -0,0 +1,163 @@
+"""Local stand-in for LLM APIs, for benchmarks that must not pay for tokens.
+
+    python benchmarks/mock_llm.py --port 8765 --latency-ms 200 --tps 50 --tokens 200
+
+Speaks three protocols on one port:
+  POST /v1/chat/completions   OpenAI (SSE when "stream": true, JSON otherwise)
+  POST /v1/messages           Anthropic messages (SSE with ping/message_start/... events)
+  POST /api/generate          Ollama (NDJSON when streaming)
+  POST /api/chat              Ollama chat (NDJSON when streaming)
+
+`latency-ms` delays the first token, `tps` paces the rest (0 = as fast as the
+socket allows), `tokens` is the answer length.
+"""
+from __future__ import annotations
+import argparse, json, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *a):
+        pass
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("content-length", 0))) or b"{}")
+        with self.server.lock:
+            self.server.requests += 1
+        route = {"/v1/chat/completions": self.openai, "/chat/completions": self.openai,
+                 "/v1/messages": self.anthropic, "/api/generate": self.ollama,
+                 "/api/chat": self.ollama_chat}.get(self.path)
+        if route is None:
+            self.send_error(404)
+            return
+        time.sleep(self.server.latency)
+        try:
+            route(body, bool(body.get("stream")))
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def tokens(self):
+        gap = 1.0 / self.server.tps if self.server.tps > 0 else 0
+        for i in range(self.server.tokens):
+            if gap and i:
+                time.sleep(gap)
+            yield f"tok{i} " if i % 20 != 19 else f"tok{i}\n"
+
+    def _start(self, ctype: str) -> None:
+        self.send_response(200)
+        self.send_header("content-type", ctype)
+        self.send_header("transfer-encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes) -> None:
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _json(self, obj: dict) -> None:
+        data = json.dumps(obj).encode()
+        self.send_response(200)
+        self.send_header("content-type", "application/json")
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def openai(self, body: dict, stream: bool) -> None:
+        if not stream:
+            self._json({"choices": [{"message": {"role": "assistant", "content": "".join(self.tokens())}}],
+                        "usage": {"prompt_tokens": 100, "completion_tokens": self.server.tokens,
+                                  "prompt_tokens_details": {"cached_tokens": 64}}})
+            return
+        self._start("text/event-stream")
+        self._chunk(b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n\n')
+        for t in self.tokens():
+            self._chunk(b"data: " + json.dumps({"choices": [{"delta": {"content": t}}]}).encode() + b"\n\n")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            self._chunk(b"data: " + json.dumps({"choices": [], "usage": {
+                "prompt_tokens": 100, "completion_tokens": self.server.tokens,
+                "prompt_tokens_details": {"cached_tokens": 64}}}).encode() + b"\n\n")
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def anthropic(self, body: dict, stream: bool) -> None:
+        if not stream:
+            self._json({"content": [{"type": "text", "text": "".join(self.tokens())}],
+                        "usage": {"input_tokens": 100, "output_tokens": self.server.tokens}})
+            return
+        self._start("text/event-stream")
+
+        def ev(name: str, obj: dict) -> None:
+            self._chunk(f"event: {name}\ndata: ".encode() + json.dumps(obj).encode() + b"\n\n")
+
+        ev("message_start", {"type": "message_start", "message": {"usage": {
+            "input_tokens": 36, "cache_read_input_tokens": 64, "cache_creation_input_tokens": 0,
+            "output_tokens": 1}}})
+        ev("content_block_start", {"type": "content_block_start", "index": 0,
+                                   "content_block": {"type": "text", "text": ""}})
+        for i, t in enumerate(self.tokens()):
+            if i % 10 == 9:
+                ev("ping", {"type": "ping"})
+            ev("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                       "delta": {"type": "text_delta", "text": t}})
+        ev("content_block_stop", {"type": "content_block_stop", "index": 0})
+        ev("message_delta", {"type": "message_delta", "usage": {"output_tokens": self.server.tokens}})
+        ev("message_stop", {"type": "message_stop"})
+        self._chunk(b"")
+
+    def ollama(self, body: dict, stream: bool) -> None:
+        if not stream:
+            self._json({"response": "".join(self.tokens()), "done": True, "eval_count": self.server.tokens})
+            return
+        self._start("application/x-ndjson")
+        for t in self.tokens():
+            self._chunk(json.dumps({"response": t, "done": False}).encode() + b"\n")
+        self._chunk(json.dumps({"response": "", "done": True, "eval_count": self.server.tokens}).encode() + b"\n")
+        self._chunk(b"")
+
+    def ollama_chat(self, body: dict, stream: bool) -> None:
+        counts = {"prompt_eval_count": 100, "eval_count": self.server.tokens, "load_duration": 2_500_000,
+                  "prompt_eval_duration": 40_000_000, "eval_duration": 90_000_000}
+        if not body.get("messages"):    # load request (`kull warm`)
+            self._json({"message": {"role": "assistant", "content": ""}, "done": True, "done_reason": "load",
+                        "load_duration": 2_500_000})
+            return
+        if not stream:
+            self._json({"message": {"role": "assistant", "content": "".join(self.tokens())}, "done": True, **counts})
+            return
+        self._start("application/x-ndjson")
+        for t in self.tokens():
+            self._chunk(json.dumps({"message": {"role": "assistant", "content": t}, "done": False}).encode() + b"\n")
+        self._chunk(json.dumps({"message": {"role": "assistant", "content": ""}, "done": True, **counts}).encode()
+                    + b"\n")
+        self._chunk(b"")
+
+
+def start(port: int = 0, latency_ms: float = 0, tps: float = 0, tokens: int = 100) -> ThreadingHTTPServer:
+    """Serve in a daemon thread; the bound port is srv.server_address[1]."""
+    srv = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    srv.daemon_threads = True
+    srv.lock, srv.requests = threading.Lock(), 0
+    srv.latency, srv.tps, srv.tokens = latency_ms / 1000, tps, tokens
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--tps", type=float, default=0, help="tokens per second after the first (0 = unpaced)")
+    ap.add_argument("--tokens", type=int, default=100)
+    args = ap.parse_args()
+    srv = start(args.port, args.latency_ms, args.tps, args.tokens)
+    print(f"mock LLM on http://127.0.0.1:{srv.server_address[1]}", flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Benchmark suite: component and end-to-end throughput against a local mock LLM.
+
+    python benchmarks/suite.py [--mib 4] [--repeat 0.7] [--only redact,e2e]
+    python benchmarks/suite.py --save benchmarks/baseline.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json [--tolerance 0.25]
+
+No API calls are made: providers talk to benchmarks/mock_llm.py on a random
+port. Metrics ending in _mbps/_eps/_tps are higher-is-better, _ms lower-is-
+better. With --baseline, any metric more than --tolerance worse than the stored
+value is reported and the exit status is 1. Baselines are machine-specific;
+regenerate one with --save on the machine that runs the comparison.
+"""
+from __future__ import annotations
+import argparse, io, json, os, platform, subprocess, sys, tempfile, time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "src")
+sys.path.insert(0, SRC)
+import mock_llm, workloads  # noqa: E402
+
+HIGHER = ("_mbps", "_eps", "_tps")
+
+
+def best(fn, runs: int) -> float:
+    t = float("inf")
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        fn()
+        t = min(t, time.perf_counter() - t0)
+    return t
+
+
+class NullSink:
+    def write(self, b):
+        return len(b)
+
+    def flush(self):
+        pass
+
+
+def bench_tail_window(data: dict, runs: int) -> dict:
+    from ai_cli.stream import tail_window
+    out = {}
+    for kind, raw in data.items():
+        t = best(lambda: tail_window(128 << 10, src=io.BytesIO(raw), dst=NullSink()), runs)
+        out[f"tail_window.{kind}_mbps"] = len(raw) / t / 1e6
+    return out
+
+
+def bench_tail_file(data: dict, runs: int) -> dict:
+    import gzip
+    from ai_cli.stream import tail_file
+    raw = data["syslog"]
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, opener in (("plain", open), ("gz", gzip.open)):
+            path = os.path.join(tmp, "syslog." + name)
+            with opener(path, "wb") as f:
+                f.write(raw)
+            t = best(lambda: tail_file(path, 128 << 10, echo=False), runs)
+            out[f"tail_file.{name}_mbps"] = len(raw) / t / 1e6     # effective: plain reads only the window
+    return out
+
+
+def bench_redact(data: dict, runs: int) -> dict:
+    from ai_cli.redact import basic
+    out = {}
+    for kind, raw in data.items():
+        text = raw.decode()
+        out[f"redact.{kind}_mbps"] = len(raw) / best(lambda: basic(text), runs) / 1e6
+    return out
+
+
+def bench_prepare(data: dict, runs: int) -> dict:
+    from ai_cli.budget import select
+    from ai_cli.facts import LogFacts
+    from ai_cli.jsonlog import compact as json_compact
+    from ai_cli.templates import compact
+    text, journal = data["syslog"].decode(), data["journald"].decode()
+    return {"dedup.syslog_mbps": len(text) / best(lambda: compact(text), runs) / 1e6,
+            "budget.syslog_mbps": len(text) / best(lambda: select(text, 4000), runs) / 1e6,
+            "facts.syslog_mbps": len(text) / best(lambda: LogFacts().add(text), runs) / 1e6,
+            "json.journald_mbps": len(journal) / best(lambda: json_compact(journal), runs) / 1e6}
+
+
+def bench_scan(data: dict, runs: int) -> dict:
+    from ai_cli.scan import compact
+    text = "\n".join(f"open tcp {port} 10.{i >> 16}.{i >> 8 & 255}.{i & 255} 1700000000"
+                     for i in range(1 << 16) for port in ((80,) if i % 3 else (80, 443)))     # a /16 masscan -oL
+    return {"scan.masscan_mbps": len(text) / best(lambda: compact(text), runs) / 1e6}
+
+
+def bench_sse(data: dict, runs: int) -> dict:
+    import bench_sse
+    from ai_cli.stream import iter_sse
+    n = 50_000
+    raw = bench_sse.make_stream(n, crlf=False)
+    t = best(lambda: sum(1 for _ in iter_sse(bench_sse.response(raw), types=("content_block_delta",))), runs)
+    return {"sse.anthropic_eps": n / t}
+
+
+PROVIDERS = {"openai": ("ai_cli.providers.openai", "OpenAI", "/v1"),
+             "anthropic": ("ai_cli.providers.anthropic", "Anthropic", ""),
+             "ollama": ("ai_cli.providers.ollama", "Ollama", "")}
+
+
+def bench_providers(data: dict, runs: int) -> dict:
+    from importlib import import_module
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "bench")
+    tokens = 5000
+    srv = mock_llm.start(tokens=tokens)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    out = {}
+    try:
+        for name, (module, cls, suffix) in PROVIDERS.items():
+            prov = getattr(import_module(module), cls)(base_url=base + suffix)
+            t = best(lambda: sum(1 for _ in prov.stream("sys", "text", "m", tokens, 30)), runs)
+            out[f"provider.{name}_tps"] = tokens / t
+    finally:
+        srv.shutdown()
+    return out
+
+
+def bench_e2e(data: dict, runs: int) -> dict:
+    srv = mock_llm.start(tokens=200)
+    base = f"http://127.0.0.1:{srv.server_address[1]}"
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=SRC + os.pathsep + os.environ.get("PYTHONPATH", ""),
+                   OPENAI_API_KEY="bench", ANTHROPIC_API_KEY="bench", KULL_DAEMON="off", KULL_BREAKER="off",
+                   XDG_CONFIG_HOME=tmp, XDG_CACHE_HOME=tmp, XDG_STATE_HOME=tmp)
+        try:
+            for name, (_, _, suffix) in PROVIDERS.items():
+                for kind in ("syslog", "nginx"):
+                    walls, ttfts = [], []
+                    for _ in range(runs):
+                        t0 = time.perf_counter()
+                        r = subprocess.run([sys.executable, "-m", "ai_cli", "-sum", "--stream", "--no-cache", "--trace",
+                                            "-p", name, "-e", base + suffix, "-m", "m"],
+                                           input=data[kind], capture_output=True, env=env)
+                        walls.append((time.perf_counter() - t0) * 1000)
+                        if r.returncode != 0:
+                            raise RuntimeError(f"kull -p {name} failed: {r.stderr.decode()[-500:]}")
+                        trace = json.loads(r.stderr.decode().strip().splitlines()[-1])
+                        ttfts.append(trace["ttft_ms"])
+                    out[f"e2e.{name}.{kind}_ms"] = min(walls)
+                    out[f"e2e.{name}.{kind}.ttft_ms"] = min(ttfts)
+        finally:
+            srv.shutdown()
+    return out
+
+
+BENCHES = {"tail_window": bench_tail_window, "tail_file": bench_tail_file, "redact": bench_redact, "prepare": bench_prepare,
+           "scan": bench_scan, "sse": bench_sse, "providers": bench_providers, "e2e": bench_e2e}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    worse = []
+    print(f"{'metric':<34}{'value':>12}{'baseline':>12}{'change':>9}")
+    for k, v in results.items():
+        b = baseline.get(k)
+        if b is None:
+            print(f"{k:<34}{v:>12.1f}{'-':>12}")
+            continue
+        change = (v - b) / b if b else 0.0
+        bad = change < -tolerance if k.endswith(HIGHER) else change > tolerance
+        print(f"{k:<34}{v:>12.1f}{b:>12.1f}{change:>+8.0%}{'  REGRESSION' if bad else ''}")
+        if bad:
+            worse.append(k)
+    return worse
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--mib", type=float, default=4, help="size of each generated workload")
+    ap.add_argument("--repeat", type=float, default=0.7, help="fraction of templated lines in the workloads")
+    ap.add_argument("--runs", type=int, default=3, help="repetitions; the best run counts")
+    ap.add_argument("--only", default="", help="comma-separated subset of: " + ",".join(BENCHES))
+    ap.add_argument("--save", metavar="FILE", help="write the results as a new baseline")
+    ap.add_argument("--baseline", metavar="FILE", help="compare against a stored baseline")
+    ap.add_argument("--tolerance", type=float, default=0.25)
+    args = ap.parse_args()
+
+    size = int(args.mib * (1 << 20))
+    data = {kind: workloads.generate(kind, size, args.repeat) for kind in workloads.WORKLOADS}
+    only = [b for b in args.only.split(",") if b] or list(BENCHES)
+    results: dict = {}
+    for name in only:
+        results.update(BENCHES[name](data, args.runs))
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+    worse = compare(results, baseline, args.tolerance)
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump({"machine": platform.node(), "python": platform.python_version(), "mib": args.mib,
+                       "repeat": args.repeat, "results": {k: round(v, 2) for k, v in results.items()}},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+    if worse:
+        print(f"{len(worse)} metric(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Synthetic inputs for the benchmark suite.
+
+    python benchmarks/workloads.py syslog --mib 4 --repeat 0.8 > /tmp/syslog.log
+
+Each generator yields lines of one format. `repeat` is the fraction of lines
+that reuse one of a few dozen message templates with only the variable
+fields changed (what --dedup collapses); the rest are one-off messages.
+Output is deterministic for a given seed.
+"""
+from __future__ import annotations
+import argparse, json, random, sys
+from typing import Callable, Dict, Iterator
+
+HOSTS = ["web01", "web02", "db01", "cache01", "edge03"]
+UNITS = ["sshd", "nginx", "kernel", "systemd", "cron", "dockerd", "postgres"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+WORDS = ("alpha bravo charlie delta echo foxtrot golf hotel india juliet kilo lima mike november oscar "
+         "papa quebec romeo sierra tango uniform victor whiskey xray yankee zulu").split()
+TEMPLATES = [
+    "Accepted publickey for {user} from {ip} port {port} ssh2",
+    "Failed password for invalid user {user} from {ip} port {port} ssh2",
+    "Connection closed by {ip} port {port} [preauth]",
+    "Started Session {n} of user {user}.",
+    "upstream timed out (110: Connection timed out) while reading response header from upstream, client: {ip}",
+    "Out of memory: Killed process {n} ({user}) total-vm:{n}kB",
+    "CRON[{n}]: ({user}) CMD (/usr/local/bin/backup --quiet)",
+    "error: connect to {ip} port {port} failed: Connection refused",
+    "checkpoint complete: wrote {n} buffers ({pct}%); 0 WAL file(s) added",
+    "container {hex} exited with code {code}",
+    "password={secret} api_key={secret}",
+]
+
+
+class Gen:
+    def __init__(self, seed: int = 0, repeat: float = 0.7):
+        self.r = random.Random(seed)
+        self.repeat = repeat
+        self.t = 1_700_000_000
+
+    def fields(self) -> dict:
+        r = self.r
+        return {"user": r.choice(["root", "deploy", "admin", "www-data", "git"]),
+                "ip": f"10.{r.randrange(256)}.{r.randrange(256)}.{r.randrange(256)}",
+                "port": r.randrange(1024, 65535), "n": r.randrange(1, 10**6), "pct": r.randrange(100),
+                "hex": "%012x" % r.getrandbits(48), "code": r.choice([0, 1, 137, 143]),
+                "secret": "%024x" % r.getrandbits(96)}
+
+    def message(self) -> str:
+        if self.r.random() < self.repeat:
+            return self.r.choice(TEMPLATES).format(**self.fields())
+        return " ".join(self.r.choice(WORDS) for _ in range(self.r.randrange(4, 14))) + f" id={self.r.getrandbits(32)}"
+
+    def tick(self) -> int:
+        self.t += self.r.randrange(0, 3)
+        return self.t
+
+
+def syslog(g: Gen) -> Iterator[str]:
+    import time
+    while True:
+        tm = time.gmtime(g.tick())
+        yield (f"{MONTHS[tm.tm_mon - 1]} {tm.tm_mday:2d} {tm.tm_hour:02d}:{tm.tm_min:02d}:{tm.tm_sec:02d} "
+               f"{g.r.choice(HOSTS)} {g.r.choice(UNITS)}[{g.r.randrange(1, 65535)}]: {g.message()}")
+
+
+def journald(g: Gen) -> Iterator[str]:
+    while True:
+        unit = g.r.choice(UNITS)
+        yield json.dumps({"__REALTIME_TIMESTAMP": str(g.tick() * 1_000_000 + g.r.randrange(10**6)),
+                          "_HOSTNAME": g.r.choice(HOSTS), "PRIORITY": str(g.r.choice([3, 4, 6, 6, 6, 7])),
+                          "_SYSTEMD_UNIT": f"{unit}.service", "SYSLOG_IDENTIFIER": unit,
+                          "_PID": str(g.r.randrange(1, 65535)), "MESSAGE": g.message()})
+
+
+def nginx(g: Gen) -> Iterator[str]:
+    import time
+    paths = ["/", "/api/v1/items", "/api/v1/login", "/static/app.js", "/healthz", "/wp-login.php"]
+    while True:
+        f = g.fields()
+        tm = time.gmtime(g.tick())
+        path = g.r.choice(paths) if g.r.random() < g.repeat else f"/u/{g.r.getrandbits(40):x}"
+        yield (f'{f["ip"]} - - [{tm.tm_mday:02d}/{MONTHS[tm.tm_mon - 1]}/{tm.tm_year}:{tm.tm_hour:02d}:'
+               f'{tm.tm_min:02d}:{tm.tm_sec:02d} +0000] "GET {path}?id={f["n"]} HTTP/1.1" '
+               f'{g.r.choice([200, 200, 200, 301, 404, 500, 502])} {g.r.randrange(50, 90000)} "-" "curl/8.{f["code"]}"')
+
+
+def nmap(g: Gen) -> Iterator[str]:
+    services = [(22, "ssh", "OpenSSH 8.9p1"), (80, "http", "nginx 1.24.0"), (443, "https", "nginx 1.24.0"),
+                (3306, "mysql", "MySQL 8.0.36"), (5432, "postgresql", "PostgreSQL 15"), (6379, "redis", "Redis 7.2"),
+                (8080, "http-proxy", "Apache Tomcat"), (9200, "http", "Elasticsearch 8.11")]
+    yield "Starting Nmap 7.94 ( https://nmap.org ) at 2024-05-01 10:00 UTC"
+    while True:
+        f = g.fields()
+        yield f"Nmap scan report for host-{f['n']}.internal ({f['ip']})"
+        yield f"Host is up (0.{g.r.randrange(100, 999)}s latency)."
+        yield f"Not shown: {g.r.randrange(900, 999)} closed tcp ports (reset)"
+        yield "PORT     STATE    SERVICE    VERSION"
+        for port, svc, ver in g.r.sample(services, g.r.randrange(1, 5)):
+            state = "open" if g.r.random() < g.repeat else "filtered"
+            yield f"{f'{port}/tcp':<8} {state:<8} {svc:<10} {ver}"
+        yield ""
+
+
+WORKLOADS: Dict[str, Callable[[Gen], Iterator[str]]] = {
+    "syslog": syslog, "journald": journald, "nginx": nginx, "nmap": nmap,
+}
+
+
+def generate(kind: str, size: int, repeat: float = 0.7, seed: int = 0) -> bytes:
+    """About `size` bytes of `kind` log lines."""
+    out, n = [], 0
+    for line in WORKLOADS[kind](Gen(seed, repeat)):
+        b = line.encode() + b"\n"
+        out.append(b)
+        n += len(b)
+        if n >= size:
+            break
+    return b"".join(out)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("kind", choices=WORKLOADS)
+    ap.add_argument("--mib", type=float, default=1)
+    ap.add_argument("--repeat", type=float, default=0.7, help="fraction of templated (repeating) lines")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+    sys.stdout.buffer.write(generate(args.kind, int(args.mib * (1 << 20)), args.repeat, args.seed))
+
+
+if __name__ == "__main__":
+    main()
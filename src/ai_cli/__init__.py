@@ -1,8 +1,10 @@
-from .config import load_config, CONFIG_PATH, CONFIG_DIR
+from .config import load_config, CONFIG_PATH, CONFIG_DIR, CACHE_DIR, STATE_DIR
 
 __all__ = [
     "load_config",
     "CONFIG_PATH", 
     "CONFIG_DIR",
+    "CACHE_DIR",
+    "STATE_DIR",
 ]
 __version__ = "0.1.0"
\ No newline at end of file
@@ -0,0 +1,114 @@
+from __future__ import annotations
+import glob, json, os, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, List, Optional, Tuple
+
+# `kull batch`: one process for many files. Each file goes through the same
+# window -> redact -> prompt pipeline as stdin, requests run in a bounded
+# worker pool, and every file yields one JSON line carrying the ai-section
+# header fields. Records are appended as they finish, so a rerun with the same
+# output file skips everything that already succeeded.
+
+def expand(patterns: Iterable[str]) -> List[str]:
+    """Files named by paths, globs (** allowed) and directories (walked), in order, without repeats.
+    A pattern that names no file gets a warning on stderr."""
+    out: List[str] = []
+    seen = set()
+
+    def add(path: str) -> bool:
+        if not os.path.isfile(path):
+            return False
+        if path not in seen:
+            seen.add(path)
+            out.append(path)
+        return True
+
+    for pat in patterns:
+        matches = sorted(glob.glob(pat, recursive=True)) if glob.has_magic(pat) else [pat]
+        found = False
+        for path in matches:
+            if os.path.isdir(path):
+                for root, dirs, files in os.walk(path):
+                    dirs.sort()
+                    for name in sorted(files):
+                        found = add(os.path.join(root, name)) or found
+            else:
+                found = add(path) or found
+        if not found:
+            print(f"[kull] batch: {pat}: no such file", file=sys.stderr)
+    return out
+
+def read_window(path: str, limit: int, head: int = 0) -> Tuple[bytes, dict, os.stat_result]:
+    """The last `limit` bytes of a file as `kull -f` reads it: decompressed, from a line start."""
+    from .stream import tail_file
+    st = os.stat(path)
+    info: dict = {}
+    window = tail_file(path, limit, echo=False, info=info, head=head)
+    return window, info, st
+
+def file_id(path: str, st: os.stat_result) -> str:
+    return f"{os.path.abspath(path)}\0{st.st_size}\0{st.st_mtime_ns}"
+
+def completed(out_path: Optional[str], mode: str) -> set:
+    """file_ids with a successful record for `mode` in an earlier run's output."""
+    done = set()
+    if not out_path or not os.path.exists(out_path):
+        return done
+    with open(out_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue            # torn last line from a crash
+            if rec.get("mode") == mode and not rec.get("error") and "file_id" in rec:
+                done.add(rec["file_id"])
+    return done
+
+class Writer:
+    """Appends one JSON line per record with a single write(), so concurrent and crashed runs never interleave."""
+
+    def __init__(self, path: Optional[str]):
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644) if path else sys.stdout.fileno()
+        self.own = bool(path)
+        self.lock = threading.Lock()
+
+    def write(self, rec: dict) -> None:
+        line = (json.dumps(rec, ensure_ascii=False) + "\n").encode("utf-8")
+        with self.lock:
+            view = memoryview(line)
+            while view:
+                view = view[os.write(self.fd, view):]
+
+    def close(self) -> None:
+        if self.own:
+            os.close(self.fd)
+
+def run(files: List[str], analyze: Callable[[str], dict], writer: Writer, jobs: int = 4, log=None) -> int:
+    """analyze(path) -> record for every file with at most `jobs` in flight; returns the number of failures."""
+    log = log if log is not None else sys.stderr
+    jobs = max(1, jobs)
+    gate = threading.BoundedSemaphore(jobs * 2)
+    lock = threading.Lock()
+    counts = {"done": 0, "failed": 0}
+
+    def work(path: str) -> None:
+        try:
+            t0 = time.time()
+            try:
+                rec = analyze(path)
+            except Exception as e:
+                rec = {"path": path, "error": str(e) or e.__class__.__name__}
+            writer.write(rec)
+            with lock:
+                counts["done"] += 1
+                counts["failed"] += bool(rec.get("error"))
+                status = f"failed: {rec['error']}" if rec.get("error") else f"{int((time.time() - t0) * 1000)} ms"
+                print(f"[kull] batch {counts['done']}/{len(files)} {path} {status}", file=log, flush=True)
+        finally:
+            gate.release()
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        for path in files:
+            gate.acquire()
+            pool.submit(work, path)
+    return counts["failed"]
@@ -0,0 +1,96 @@
+from __future__ import annotations
+import re
+from typing import List
+
+# Token-budgeted input selection: keep the head, lines that look like trouble
+# (plus a little context), and the tail; everything else becomes an explicit
+# "[... N lines elided ...]" marker so the model knows the input was cut.
+
+PRIORITY = re.compile(
+    r"(?i)\b(?:emerg(?:ency)?|alert|crit(?:ical)?|err(?:or)?s?|warn(?:ing)?|fail(?:ed|ure|ing)?|fatal|panic|"
+    r"oops|segfault|denied|refused|unreachable|timed? ?out|traceback|exception|oom|killed|abort(?:ed)?|"
+    r"corrupt(?:ed|ion)?|cve-\d{4}-\d+)\b"
+)
+
+def approx_tokens(text: str) -> int:
+    """Cheap token estimate (~4 characters per token for English and log text)."""
+    return (len(text) + 3) // 4
+
+def _cost(line: str) -> int:
+    return approx_tokens(line) + 1
+
+def select(text: str, budget: int, head: str = "", skipped: int = 0, context: int = 2,
+           head_share: float = 0.15, tail_share: float = 0.35) -> str:
+    """Fit head + priority lines (with context) + tail into `budget` tokens.
+
+    `head` is the start of the input when the tail window did not cover it, and
+    `skipped` the number of bytes between the end of `head` and the start of `text`.
+    """
+    head_lines = head.splitlines()
+    lines: List[str] = head_lines + text.splitlines()
+    gap_at = len(head_lines) if (head_lines or skipped) else -1
+    total = sum(_cost(l) for l in lines)
+    if total <= budget and skipped <= 0:
+        return head + text
+
+    n = len(lines)
+    keep = [False] * n
+    spent = 0
+
+    def take(i: int) -> bool:
+        nonlocal spent
+        if keep[i]:
+            return True
+        c = _cost(lines[i])
+        if spent + c > budget:
+            return False
+        keep[i] = True
+        spent += c
+        return True
+
+    # 1) head
+    limit = int(budget * head_share)
+    for i in range(n):
+        if spent + _cost(lines[i]) > limit or not take(i):
+            break
+    # 2) tail
+    limit = spent + int(budget * tail_share)
+    for i in range(n - 1, -1, -1):
+        if keep[i]:
+            continue
+        if spent + _cost(lines[i]) > limit or not take(i):
+            break
+    # 3) priority lines with context, most recent first
+    for i in range(n - 1, -1, -1):
+        if keep[i] or not PRIORITY.search(lines[i]):
+            continue
+        lo, hi = max(0, i - context), min(n, i + context + 1)
+        if spent + sum(_cost(lines[j]) for j in range(lo, hi) if not keep[j]) > budget:
+            if not take(i):
+                continue
+        for j in range(lo, hi):
+            take(j)
+    # 4) leftover budget extends the tail backwards
+    for i in range(n - 1, -1, -1):
+        if not keep[i] and not take(i):
+            break
+
+    out: List[str] = []
+    dropped = 0
+    for i, line in enumerate(lines):
+        if i == gap_at:
+            if dropped:
+                out.append(f"[... {dropped} lines elided ...]")
+                dropped = 0
+            if skipped > 0:
+                out.append(f"[... {skipped} bytes of input elided ...]")
+        if keep[i]:
+            if dropped:
+                out.append(f"[... {dropped} lines elided ...]")
+                dropped = 0
+            out.append(line)
+        else:
+            dropped += 1
+    if dropped:
+        out.append(f"[... {dropped} lines elided ...]")
+    return "\n".join(out) + "\n"
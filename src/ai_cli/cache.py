@@ -0,0 +1,118 @@
+from __future__ import annotations
+import hashlib, json, os, tempfile, time
+from pathlib import Path
+from typing import Iterator, Optional
+from .config import CACHE_DIR
+
+# Content-addressed cache of AI sections. One JSON file per response. Its mtime
+# is the "created" time and never changes, so the TTL is the same whether get()
+# reads the entry or evict() only stats it; atime is bumped on every hit so
+# eviction can be LRU without a separate index. evict() stats every entry, so
+# put() runs it only every `evict_every` puts, after max_bytes/4 written, or
+# when no process has evicted for `evict_interval` seconds (a marker's mtime).
+
+def cache_key(window_sha: str, prompt: str, text: str, provider: str, model: str,
+              max_tokens: int, endpoint: str = "") -> str:
+    h = hashlib.sha256()
+    for part in (window_sha, prompt, text, provider, model, str(max_tokens), endpoint):
+        h.update(part.encode("utf-8", "surrogatepass"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class ResponseCache:
+    def __init__(self, root: Path | None = None, max_bytes: int = 64 * 1024 * 1024, ttl: int = 7 * 24 * 3600,
+                 evict_every: int = 256, evict_interval: float = 600.0):
+        self.root = Path(root) if root else CACHE_DIR / "responses"
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evict_every = evict_every
+        self.evict_interval = evict_interval
+        self._puts = self._written = 0      # since this process last evicted
+
+    def _path(self, key: str) -> Path:
+        return self.root / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> Optional[str]:
+        path = self._path(key)
+        try:
+            entry = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if self.ttl and time.time() - entry.get("created", 0) > self.ttl:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+            return None
+        try:
+            os.utime(path, (time.time(), entry.get("created", path.stat().st_mtime)))
+        except OSError:
+            pass
+        return entry.get("text")
+
+    def put(self, key: str, text: str, **meta) -> None:
+        path = self._path(key)
+        created = time.time()
+        data = json.dumps({"created": created, "text": text, **meta}).encode("utf-8")
+        tmp = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # a name of its own: threads of one process may put the same key at once
+            fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f"{key}.", suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.utime(tmp, (created, created))
+            os.replace(tmp, path)
+        except OSError:
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+            return
+        self._puts += 1
+        self._written += len(data)
+        if self._puts >= self.evict_every or self._written >= self.max_bytes // 4 or self._evict_due():
+            self.evict()
+
+    def _evict_due(self) -> bool:
+        try:
+            return time.time() - (self.root / ".evicted").stat().st_mtime > self.evict_interval
+        except OSError:
+            return True
+
+    def evict(self) -> None:
+        """Drop entries created longer than the TTL ago, then least-recently-used ones until under max_bytes."""
+        self._puts = self._written = 0
+        try:
+            (self.root / ".evicted").touch()
+        except OSError:
+            pass
+        entries = []
+        now = time.time()
+        for path in self.root.glob("*/*.tmp"):      # left behind by a killed put()
+            try:
+                if now - path.stat().st_mtime > 3600:
+                    path.unlink()
+            except OSError:
+                pass
+        for path in self.root.glob("*/*.json"):
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if self.ttl and now - st.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((st.st_atime, st.st_size, path))
+        total = sum(e[1] for e in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+def replay(text: str, chunk: int = 4096) -> Iterator[str]:
+    """Yield a cached answer the way a provider stream would."""
+    for i in range(0, len(text), chunk):
+        yield text[i:i + chunk]
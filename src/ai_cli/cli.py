@@ -1,14 +1,17 @@
 from __future__ import annotations
-import argparse, os, sys, time
+import argparse, os, stat, sys, time
+from collections import Counter
+from typing import Optional
 from .config import load_config, CONFIG_PATH
 from .prompts import build_prompt
+from .user import current_username
 from .redact import basic as redact_basic
-from .stream import divider, tail_window, sha256_hex
+from .stream import DISCARD, divider, tail_file, tail_window, sha256_hex
 from .providers import PROVIDERS
 
 VERSION = "0.1.0"
 
-def _add_flags(parser: argparse.ArgumentParser, cfg: dict) -> None:
+def _add_flags(parser: argparse.ArgumentParser, cfg: dict, out_help: str = "Write only the AI section to a file") -> None:
     m = parser.add_mutually_exclusive_group()
     m.add_argument("-sum", "--summary", action="store_true", help="Summarize the input")
     m.add_argument("-sol", "--solutions", action="store_true", help="Suggest fixes and next steps")
@@ -16,9 +19,10 @@ def _add_flags(parser: argparse.ArgumentParser, cfg: dict) -> None:
     m.add_argument("-scan", "--scan", action="store_true", help="Network scan analysis (nmap/masscan)")
     m.add_argument("-exp", "--explain", action="store_true", help="Explain terms in the input")  # Added
 
-    parser.add_argument("-o", "--out", help="Write only the AI section to a file")
+    parser.add_argument("-o", "--out", help=out_help)
     parser.add_argument("-p", "--provider",
-                        choices=sorted(PROVIDERS.keys()),
+                        choices=PROVIDERS, metavar="PROVIDER",
+                        help="openai, anthropic, openrouter, ollama, vllm, or an installed plugin",
                         default=cfg.get("provider", "openai"))
     parser.add_argument("-m", "--model", default=cfg.get("model", "gpt-4o-mini"))
     parser.add_argument("-e", "--endpoint", default=cfg.get("endpoint", ""),
@@ -28,19 +32,57 @@ def _add_flags(parser: argparse.ArgumentParser, cfg: dict) -> None:
     parser.add_argument("-T", "--maxtok", type=int, default=int(cfg.get("max_tokens", 400)),
                         help="Max output tokens from the model")
     parser.add_argument("--stream", action="store_true", help="Stream AI output via SSE")
-    parser.add_argument("-t", "--timeout", type=int, default=None, help="HTTP timeout (seconds)")
+    parser.add_argument("-t", "--timeout", type=int, default=None, help="HTTP read timeout (seconds); connecting is bounded by connect_timeout")
     parser.add_argument("-q", "--quiet", action="store_true", help="Do not print AI section to stdout")
+    parser.add_argument("-D", "--dedup", action="store_true", default=cfg.get("dedup", "off") == "on",
+                        help="Collapse repeated lines into templates with counts before sending")
+    parser.add_argument("-B", "--budget", type=int, default=int(cfg.get("budget_tokens", 0)),
+                        help="Token budget for the input: keep head, error/warn lines with context, "
+                             "and tail; elide the rest (0 = send the whole window)")
+    parser.add_argument("--no-facts", dest="facts", action="store_false", default=cfg.get("facts", "on") == "on",
+                        help="-sum/-ser: do not prepend the locally counted log facts (lines, severities, codes, units)")
+    parser.add_argument("--priority", metavar="LEVEL", default=cfg.get("json_priority", "") or None,
+                        help="JSON log input: drop entries less severe than LEVEL (0-7 or emerg, alert, crit, err, "
+                             "warning, notice, info, debug)")
+    parser.add_argument("--full", action="store_true",
+                        help="Analyze the whole input: map the mode prompt over chunks, then reduce")
+    parser.add_argument("--chunk-bytes", type=int, default=int(cfg.get("full_chunk_bytes", 96 * 1024)),
+                        help="--full: bytes of input per chunk")
+    parser.add_argument("--overlap", type=int, default=int(cfg.get("full_overlap", 2048)),
+                        help="--full: bytes shared by consecutive chunks")
+    parser.add_argument("-j", "--jobs", type=int, default=int(cfg.get("full_jobs", 4)),
+                        help="--full / batch: concurrent provider requests")
+    parser.add_argument("-F", "--follow", action="store_true",
+                        help="Never wait for EOF: emit an AI section for the new lines every --every seconds")
+    parser.add_argument("--every", type=float, default=float(cfg.get("follow_seconds", 60)),
+                        help="--follow: seconds between updates (0 = only by line count)")
+    parser.add_argument("--every-lines", type=int, default=int(cfg.get("follow_lines", 0)),
+                        help="--follow: also update after this many new lines (0 = off)")
+    parser.add_argument("--race", default=cfg.get("race", ""), metavar="P[:MODEL],...",
+                        help="Send the request to several providers and stream the first to answer")
+    parser.add_argument("--hedge", type=int, default=int(cfg.get("race_hedge_ms", 0)), metavar="MS",
+                        help="--race: start each further provider only after MS without a first token")
+    parser.add_argument("--trace", action="store_const", const="-", default="",
+                        help="Print per-stage timings, sizes and token estimates as one JSON line on stderr")
+    parser.add_argument("--trace-file", dest="trace", metavar="FILE",
+                        help="Like --trace, but append the JSON line to FILE")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the response cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached answers but store the new one")
     parser.add_argument("--version", action="version", version=f"kull {VERSION}")
 
 EXIT_NO_MODE = 1
 EXIT_AI_FAIL = 2
 EXIT_NO_INPUT = 3
 
+TITLES = {"sum": "ai summary", "sol": "ai solutions", "ser": "ai deepsearch", "scan": "ai scan", "exp": "ai explain"}
+
+HEAD_BYTES = 16 * 1024  # start of the input kept for --budget when the tail window does not reach it
+
 def _pick_mode(args: argparse.Namespace) -> str:
     # If no mode selected:
     if not (args.summary or args.solutions or args.search or args.scan):
-        # If interactive (no piped input), show help/exit; else default to summary
-        if sys.stdin.isatty():
+        # If interactive (no piped input or -f), show help/exit; else default to summary
+        if sys.stdin.isatty() and not getattr(args, "file", None):
             return ""  # main() prints help
         args.summary = True
     if args.summary:
@@ -55,7 +97,518 @@ def _pick_mode(args: argparse.Namespace) -> str:
         return "exp"
     return "sum"    # Add 'if args.exp: return "exp"' if implementing exp mode. Note exp support requires adding an -exp flag
 
+def _read_input(args: argparse.Namespace, info: dict, limit: Optional[int] = None) -> bytes:
+    """The window to analyze: the tail of stdin or -f, or the --since/--until slice of it;
+    `limit` (default -L) caps its size."""
+    head = HEAD_BYTES if args.budget else 0
+    limit = args.limit if limit is None else limit
+    try:
+        if args.since is not None or args.until is not None:
+            from .timeslice import select_file, select_stream
+            if args.file:
+                return select_file(args.file, args.since, args.until, limit, echo=not args.no_echo,
+                                   info=info, head=head)
+            return select_stream(sys.stdin.buffer, args.since, args.until, limit,
+                                 None if args.no_echo else sys.stdout.buffer, info, head)
+        if args.file:
+            return tail_file(args.file, limit, echo=not args.no_echo, info=info, head=head)
+    except (OSError, EOFError, ValueError) as e:     # EOFError: truncated .gz/.xz/.bz2
+        print(f"[kull] cannot read {args.file or 'stdin'}: {e}", file=sys.stderr)
+        sys.exit(EXIT_NO_INPUT)
+    if args.no_echo:
+        return tail_window(limit, src=sys.stdin.buffer, dst=DISCARD, info=info, head=head)
+    return tail_window(limit, info=info, head=head)
+
+def _prepare_text(window: bytes, info: dict, args: argparse.Namespace, cfg: dict, trace=None,
+                  facts: bool = True, counted=None) -> str:
+    """Turn the raw window into the text sent to the provider. facts=False leaves out the
+    "Log facts" block (--full counts them over the whole input instead); `counted` is a
+    LogFacts already counted over the raw lines (--follow), used instead of the window's."""
+    from .trace import NULL
+    tr = trace or NULL
+    with tr.stage("decode"):
+        text = window.decode("utf-8", errors="replace")
+    scan = None
+    if getattr(args, "scan", False) and cfg.get("scan_parse", "on") == "on":
+        from .scan import compact
+        with tr.stage("scan_parse"):
+            table, scan = compact(text)
+        if scan is not None:
+            info["scan"] = {"hosts": len(scan.hosts), "open_ports": sum(len(h.ports) for h in scan.hosts.values()),
+                            "formats": scan.formats, "bytes": len(window)}
+            text = table
+        elif len(window) > info.get("scan_limit", len(window)):
+            # not a scan we can parse: back to the plain -L tail window
+            window = window[-info["scan_limit"]:]
+            info["aligned"] = False
+            text = window.decode("utf-8", errors="replace")
+    jlog = None
+    if scan is None and not getattr(args, "scan", False) and cfg.get("json_logs", "on") == "on":
+        from .jsonlog import compact as json_compact
+        with tr.stage("json"):
+            rendered, jlog = json_compact(text, getattr(args, "priority", None),
+                                          partial_first=info.get("bytes_in", 0) > len(window) and not info.get("aligned"))
+        if jlog is not None:
+            info["json"] = {"entries": len(jlog.entries), "kind": jlog.kind, "bytes": len(window),
+                            "hidden": sum(jlog.hidden.values())}
+            text = rendered
+    head, skipped, covered = "", 0, len(window)
+    if scan is None and jlog is None and args.budget and info.get("bytes_in", 0) > len(window):
+        before = info["bytes_in"] - len(window)     # input bytes the window does not cover
+        raw_head = info.get("head", b"")[:before]
+        skipped = before - len(raw_head)
+        if skipped > 0:
+            head = raw_head.decode("utf-8", errors="replace")
+            if "\n" in head:
+                head = head[:head.rfind("\n") + 1]
+            if not info.get("aligned"):
+                text = text[text.find("\n") + 1:]   # first window line is partial
+        else:                                       # head and window meet: the input is whole
+            text = (raw_head + window).decode("utf-8", errors="replace")
+            covered = info["bytes_in"]
+    if cfg.get("redact", "basic") == "basic":
+        with tr.stage("redact"):
+            hits = info.setdefault("redactions", Counter())
+            text = redact_basic(text, hits)
+            head = redact_basic(head, hits) if head else head
+    block = ""
+    if facts and args.facts and (args.summary or args.search):
+        from .facts import LogFacts
+        with tr.stage("facts"):
+            if counted is not None:
+                block = counted.render("the new lines since the last update")
+            else:
+                scope = (f"last {covered} of {info['bytes_in']} input bytes"
+                         if info.get("bytes_in", 0) > covered else None)
+                block = (jlog.facts() if jlog is not None else LogFacts().add(text)).render(scope)
+    if info.get("time_window"):
+        block = "Time window (--since/--until): {} → {}\n".format(*info["time_window"]) + block
+    # a JSON rendering is grouped: line dedup/select would drop its [headers], it budgets itself
+    if args.dedup and jlog is None:
+        from .templates import compact
+        with tr.stage("dedup"):
+            text = compact(text)
+    if args.budget:
+        from .budget import approx_tokens, select
+        with tr.stage("budget"):
+            budget = max(args.budget - approx_tokens(block), 1)     # the block counts against --budget
+            if jlog is not None:
+                text = jlog.render(budget)
+                text = redact_basic(text) if cfg.get("redact", "basic") == "basic" else text
+            else:
+                text = select(text, budget, head=head, skipped=skipped)
+    return block + text
+
+def _section_meta(args: argparse.Namespace, mode: str, window_bytes: int, window_sha: str,
+                  elapsed: int, ttft_ms: int | None = None) -> dict:
+    """Fields of the "ai-section v1" header."""
+    meta = {"provider": args.provider, "model": args.model, "mode": mode, "window_bytes": window_bytes,
+            "sha256": window_sha, "tokens": args.maxtok, "elapsed_ms": elapsed}
+    if ttft_ms is not None:
+        meta["ttft_ms"] = ttft_ms
+    meta["timestamp"] = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    return meta
+
+def _section_header(args: argparse.Namespace, mode: str, window_bytes: int, window_sha: str,
+                    elapsed: int, ttft_ms: int | None = None, pad: int = 0) -> str:
+    """The "ai-section v1" header; `pad` leaves room to rewrite elapsed_ms in place."""
+    m = _section_meta(args, mode, window_bytes, window_sha, elapsed, ttft_ms)
+    ttft = f" ttft_ms={ttft_ms}" if ttft_ms is not None else ""
+    return (f"# ai-section v1\n"
+            f"provider={m['provider']} model={m['model']} mode={mode} "
+            f"window_bytes={window_bytes} sha256={window_sha}\n"
+            f"tokens<={m['tokens']} elapsed_ms={elapsed:<{pad}}{ttft}\n"
+            f"timestamp={m['timestamp']}\n---\n")
+
+def _write_section(args: argparse.Namespace, mode: str, window_bytes: int, window_sha: str,
+                   elapsed: int, ai_text: str, append: bool = False, ttft_ms: int | None = None) -> None:
+    """Write the AI section with its "ai-section v1" header to args.out."""
+    header = _section_header(args, mode, window_bytes, window_sha, elapsed, ttft_ms)
+    try:
+        with open(args.out, "a" if append else "w", encoding="utf-8") as f:
+            f.write(header); f.write(ai_text)
+            if not ai_text.endswith("\n"):
+                f.write("\n")
+    except Exception as e:
+        if not args.quiet:
+            print(f"[kull] failed to write {args.out}: {e}", file=sys.stderr)
+
+class _SectionSink:
+    """args.out as a Renderer sink for --stream. The file is opened and the header written with
+    the first bytes: the Renderer flushes those at once, on the calling thread, so the provider
+    that answered (a thread's `winner`) and ttft_ms are known. elapsed_ms goes into a padded
+    slot that close() fills in."""
+
+    def __init__(self, args: argparse.Namespace, mode: str, window_bytes: int, window_sha: str, prov,
+                 start: float, append: bool = False):
+        self.args, self.mode, self.window_bytes, self.window_sha = args, mode, window_bytes, window_sha
+        self.prov, self.start, self.append = prov, start, append
+        self.f = None
+        self.slot = -1          # file offset of the elapsed_ms value
+        self.last = b"\n"
+
+    def write(self, b: bytes) -> None:
+        if self.f is None:
+            self._open()
+        self.f.write(b)
+        self.last = b[-1:]
+
+    def _open(self) -> None:
+        winner = getattr(self.prov, "winner", None)
+        if winner is not None:
+            self.args.provider, self.args.model = winner.name, winner.model
+        elapsed = int((time.time() - self.start) * 1000)
+        header = _section_header(self.args, self.mode, self.window_bytes, self.window_sha, elapsed,
+                                 ttft_ms=elapsed, pad=10).encode("utf-8")
+        try:
+            self.f = open(self.args.out, "ab" if self.append else "wb")
+        except OSError as e:
+            if not self.args.quiet:
+                print(f"[kull] failed to write {self.args.out}: {e}", file=sys.stderr)
+            raise ValueError(e)             # the Renderer drops this sink
+        self.slot = self.f.tell() + header.index(b"elapsed_ms=") + len("elapsed_ms=")
+        self.f.write(header)
+
+    def flush(self) -> None:
+        if self.f is not None:
+            self.f.flush()
+
+    def close(self) -> None:
+        if self.f is None:
+            return
+        try:
+            if self.last != b"\n":
+                self.f.write(b"\n")
+            self.f.close()
+            if os.path.isfile(self.args.out):
+                with open(self.args.out, "r+b") as f:
+                    f.seek(self.slot)
+                    f.write(str(int((time.time() - self.start) * 1000))[:10].encode())
+        except OSError as e:
+            if not self.args.quiet:
+                print(f"[kull] failed to write {self.args.out}: {e}", file=sys.stderr)
+        self.f = None
+
+def _renderer(args: argparse.Namespace, cfg: dict, section: Optional[_SectionSink] = None):
+    """Coalescing writer for --stream deltas (see render.py), to stdout and the -o section."""
+    from .render import Renderer
+    sinks = [] if args.quiet else [sys.stdout.buffer]
+    if section is not None:
+        sinks.append(section)
+    return Renderer(sinks, interval=int(cfg.get("render_interval_ms", 30)) / 1000,
+                    max_bytes=int(cfg.get("render_bytes", 4096)))
+
+def _run_follow(mode: str, args: argparse.Namespace, cfg: dict) -> None:
+    """--follow: echo forever, emitting an AI section per --every seconds / --every-lines lines."""
+    from .follow import Follower, run
+    prov = _make_provider(args, cfg)
+    prompt = build_prompt(mode, username=current_username())
+
+    def analyze(update: str, counted) -> None:
+        raw = update.encode("utf-8")
+        text = _prepare_text(raw, {}, args, cfg, counted=counted)
+        if not args.quiet:
+            sys.stdout.write(divider(f"{TITLES[mode]} @ {time.strftime('%H:%M:%S')}"))
+            sys.stdout.flush()
+        start = time.time()
+        try:
+            if args.stream:
+                section = _SectionSink(args, mode, len(raw), sha256_hex(raw), prov, start,
+                                       append=True) if args.out else None
+                try:
+                    with _renderer(args, cfg, section) as out:
+                        for delta in prov.stream(prompt, text, args.model, args.maxtok, args.timeout):
+                            out.write(delta)
+                finally:
+                    if section is not None:
+                        section.close()
+            else:
+                ai_text = prov.complete(prompt, text, args.model, args.maxtok, args.timeout)
+                if not args.quiet:
+                    sys.stdout.write(ai_text)
+            if not args.quiet:
+                sys.stdout.write("\n\n")
+                sys.stdout.flush()
+        except Exception as e:
+            print(f"[kull] error: {e}", file=sys.stderr)
+            return
+        winner = getattr(prov, "winner", None)
+        if winner is not None:
+            args.provider, args.model = winner.name, winner.model
+        if args.out and not args.stream:
+            _write_section(args, mode, len(raw), sha256_hex(raw), int((time.time() - start) * 1000),
+                           ai_text, append=True)
+
+    follower = Follower(every=args.every, every_lines=args.every_lines, limit=args.limit,
+                        facts=args.facts and mode in ("sum", "ser"))
+    run(follower, analyze, echo=not args.no_echo)
+
+def _provider_label(args: argparse.Namespace) -> str:
+    """Provider name used in cache keys: a race is keyed by its contender list."""
+    return f"race:{args.race}" if args.race else args.provider
+
+def _answered(args: argparse.Namespace, prov, key: str, window_sha: str, prompt: str, text: str) -> tuple:
+    """(cache key, provider, model) for the answer `prov` just gave. A fallback answer is stored
+    under the provider that gave it, not the primary's key; a race stays keyed by its contender list."""
+    winner = getattr(prov, "winner", None)
+    if winner is None:
+        return key, args.provider, args.model
+    if key is not None and not args.race and (winner.name, winner.model, winner.endpoint) != (args.provider, args.model, args.endpoint):
+        from .cache import cache_key
+        key = cache_key(window_sha, prompt, text, winner.name, winner.model, args.maxtok, winner.endpoint)
+    return key, winner.name, winner.model
+
+def _new_provider(name: str, endpoint: str, cfg: dict, args: argparse.Namespace):
+    if cfg.get("daemon", "auto") == "auto":
+        from .daemon import connect
+        remote = connect(name, endpoint)
+        if remote is not None:
+            return remote
+    # in-process only: a daemon client never imports requests or the provider modules
+    _configure_providers(cfg, name, args.jobs, max(args.limit, args.chunk_bytes) if args.full else args.limit,
+                         args.maxtok)
+    return PROVIDERS[name](base_url=endpoint or None)
+
+def _configure_providers(cfg: dict, name: Optional[str] = None, jobs: int = 1,
+                         window: Optional[int] = None, maxtok: Optional[int] = None) -> None:
+    """Pool settings, and config for backend `name` (None: all of them, for the daemon).
+    Only the named backend is imported."""
+    from .providers.base import Provider
+    Provider.configure_pool(pool_size=max(int(cfg.get("pool_size", 10)), jobs),
+                            connect_timeout=float(cfg.get("connect_timeout", 10)))
+    if name in (None, "openai", "openrouter", "vllm"):
+        PROVIDERS["openai"].configure(stream_usage=cfg.get("stream_usage", "auto"))
+    if name in (None, "ollama"):
+        PROVIDERS["ollama"].configure(keep_alive=cfg.get("ollama_keep_alive", "30m"),
+                                      num_ctx=int(cfg.get("ollama_num_ctx", 0)),
+                                      num_ctx_max=int(cfg.get("ollama_num_ctx_max", 32768)),
+                                      window=int(cfg.get("window_bytes", 128 * 1024)) if window is None else window,
+                                      max_tokens=int(cfg.get("max_tokens", 400)) if maxtok is None else maxtok)
+
+def _make_provider(args: argparse.Namespace, cfg: dict):
+    try:
+        if args.race:
+            return _make_race(args, cfg)
+        return _make_fallback(args, cfg)
+    except Exception as e:
+        if not args.quiet:
+            sys.stdout.write(f"AI init failed: {e}\n"); sys.stdout.flush()
+        print(f"[kull] provider init failed: {e}", file=sys.stderr)
+        sys.exit(EXIT_AI_FAIL)
+
+def _make_fallback(args: argparse.Namespace, cfg: dict):
+    """-p followed by the config's fallback list, behind the shared circuit breaker."""
+    from .fallback import Breaker, Choice, FallbackProvider
+    from .race import parse_providers
+    chain = [Choice(args.provider, args.model, args.endpoint)]
+    for name, model in parse_providers(cfg.get("fallback", ""), args.model):
+        if name not in PROVIDERS:
+            raise ValueError(f"unknown provider in fallback: {name}")
+        if name != args.provider:
+            chain.append(Choice(name, model))
+    breaker = None
+    if cfg.get("breaker", "on") == "on":
+        breaker = Breaker(threshold=int(cfg.get("breaker_threshold", 2)),
+                          cooldown=float(cfg.get("breaker_cooldown", 30)))
+    elif len(chain) == 1:
+        return _new_provider(args.provider, args.endpoint, cfg, args)
+    return FallbackProvider(chain, lambda name, endpoint: _new_provider(name, endpoint, cfg, args), breaker)
+
+def _make_race(args: argparse.Namespace, cfg: dict):
+    from .race import Contender, RaceProvider, parse_providers
+    contenders = []
+    for name, model in parse_providers(args.race, args.model):
+        if name not in PROVIDERS:
+            raise ValueError(f"unknown provider in --race: {name}")
+        try:
+            # -e belongs to -p; the other contenders use their default endpoints
+            prov = _new_provider(name, args.endpoint if name == args.provider else "", cfg, args)
+        except Exception as e:
+            print(f"[kull] race: {name} unavailable: {e}", file=sys.stderr)
+            continue
+        contenders.append(Contender(name, model, prov))
+    return RaceProvider(contenders, hedge=args.hedge / 1000)
+
+def _run_warm(args: argparse.Namespace, cfg: dict) -> int:
+    """`kull warm`: have the server load the model now, sized for a full window, so the first run does not wait."""
+    _configure_providers(cfg, args.provider, window=args.limit, maxtok=args.maxtok)
+    if not hasattr(PROVIDERS[args.provider], "warm"):
+        print(f"[kull] warm: nothing to load for {args.provider}", file=sys.stderr)
+        return 0
+    try:
+        prov = PROVIDERS[args.provider](base_url=args.endpoint or None)
+    except Exception as e:
+        print(f"[kull] warm: provider init failed: {e}", file=sys.stderr)
+        return EXIT_AI_FAIL
+    try:
+        r = prov.warm(args.model, timeout=args.timeout)
+    except Exception as e:
+        print(f"[kull] warm: {args.provider} {args.model} failed: {e}", file=sys.stderr)
+        return EXIT_AI_FAIL
+    print(f"[kull] warm: {args.provider} {r['model']} loaded in {r['load_ms']} ms "
+          f"(num_ctx={r['num_ctx']}, keep_alive={r['keep_alive']})", file=sys.stderr)
+    return 0
+
+def _open_cache(args: argparse.Namespace, cfg: dict):
+    if cfg.get("cache", "on") != "on" or args.no_cache:
+        return None
+    from .cache import ResponseCache
+    return ResponseCache(max_bytes=int(cfg.get("cache_max_bytes")), ttl=int(cfg.get("cache_ttl")))
+
+def _run_full(mode: str, args: argparse.Namespace, cfg: dict, cache) -> tuple[str, str, int, str]:
+    """--full: map the mode prompt over the whole input, return (reduce prompt, reduce text, bytes, sha256)."""
+    import hashlib, io
+    from .cache import cache_key
+    from .facts import LogFacts
+    from .jsonlog import JsonFacts, detect as json_detect
+    from .mapreduce import MapReduce, iter_chunks
+    from .stream import open_input
+    prov = _make_provider(args, cfg)
+    username = current_username()
+    prompt = build_prompt(mode, username=username)
+
+    def call(system: str, text: str) -> str:
+        sha = sha256_hex(text.encode("utf-8"))
+        key = cache_key(sha, system, text, _provider_label(args), args.model,
+                        args.maxtok, args.endpoint) if cache is not None else None
+        out = cache.get(key) if key and not args.refresh else None
+        if out is None:
+            out = prov.complete(system, text, args.model, args.maxtok, args.timeout)
+            if key and out.strip():
+                key, provider, model = _answered(args, prov, key, sha, system, text)
+                cache.put(key, out, provider=provider, model=model, mode=mode)
+        return out
+
+    class Tally:
+        def __init__(self):
+            self.sha, self.n = hashlib.sha256(), 0
+            self.facts = LogFacts() if args.facts and mode in ("sum", "ser") else None
+        def update(self, b: bytes) -> None:
+            if not self.n and self.facts is not None and cfg.get("json_logs", "on") == "on" \
+                    and json_detect(b[:65536].decode("utf-8", errors="replace")):
+                self.facts = JsonFacts(args.priority)   # counted over the parsed entries, as _prepare_text does
+            self.sha.update(b); self.n += len(b)
+            if self.facts is not None:
+                self.facts.feed(b)
+
+    src = open_input(args.file) if args.file else sys.stdin.buffer
+    total = None
+    try:
+        st = os.fstat(src.fileno())
+        # a compressed file's size says nothing about how much text it holds
+        total = st.st_size if stat.S_ISREG(st.st_mode) and isinstance(src, io.BufferedReader) else None
+    except (OSError, ValueError, AttributeError):
+        pass
+    tally = Tally()
+    mr = MapReduce(call, jobs=args.jobs)
+    chunks = iter_chunks(src, max(args.chunk_bytes, 1024), max(args.overlap, 0),
+                         echo=None if args.no_echo else sys.stdout.buffer, digest=tally)
+    try:
+        partials = mr.map(prompt, chunks, lambda chunk: _prepare_text(chunk, {}, args, cfg, facts=tally.facts is None),
+                          total=total)
+    finally:
+        if args.file:
+            src.close()
+    if not partials:
+        return prompt, "", 0, tally.sha.hexdigest()
+    reduce_prompt = build_prompt(mode, username=username, reduce=True)
+    text = mr.reduce_input(reduce_prompt, partials, max(args.chunk_bytes, 1024))
+    if tally.facts is not None:
+        text = tally.facts.close().render("whole input") + text
+    if hasattr(prov, "pool_stats"):
+        pool = prov.pool_stats()
+        print(f"[kull] http: {pool['requests']} requests over {pool['connections']} connections", file=sys.stderr)
+    return reduce_prompt, text, tally.n, tally.sha.hexdigest()
+
+def _run_batch(mode: str, args: argparse.Namespace, cfg: dict) -> int:
+    """kull batch: analyze every file named on the command line, one JSONL record per file."""
+    from . import batch
+    from .cache import cache_key
+    files = batch.expand(args.paths)
+    if not files:
+        print("[kull] batch: no input files", file=sys.stderr)
+        sys.exit(EXIT_NO_INPUT)
+    done = batch.completed(args.out, mode) if args.out and not args.no_resume else set()
+    todo = []
+    for path in files:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        if batch.file_id(path, st) not in done:
+            todo.append(path)
+    if len(todo) < len(files):
+        print(f"[kull] batch: {len(files) - len(todo)} of {len(files)} files already done in {args.out}", file=sys.stderr)
+    if not todo:
+        return 0
+    cache = _open_cache(args, cfg)
+    prov = _make_provider(args, cfg)
+    prompt = build_prompt(mode, username=current_username())
+
+    def analyze(path: str) -> dict:
+        from .trace import Trace
+        tr = Trace()
+        with tr.stage("read"):
+            window, info, st = batch.read_window(path, args.limit, HEAD_BYTES if args.budget else 0)
+        rec = {"path": path, "file_id": batch.file_id(path, st), "format": "ai-section v1"}
+        if not window:
+            rec["skipped"] = "empty file"
+            return rec
+        window_sha = sha256_hex(window)
+        text = _prepare_text(window, info, args, cfg, tr)
+        key = cache_key(window_sha, prompt, text, _provider_label(args), args.model, args.maxtok,
+                        args.endpoint) if cache is not None else None
+        t0 = time.time()
+        out = cache.get(key) if key and not args.refresh else None
+        provider, model = args.provider, args.model
+        tr.set(path=path, mode=mode, cache="off" if key is None else "hit" if out is not None else "miss")
+        try:
+            if out is None:
+                with tr.stage("generate"):
+                    out = prov.complete(prompt, text, args.model, args.maxtok, args.timeout)
+                key, provider, model = _answered(args, prov, key, window_sha, prompt, text)
+                if key and out.strip():
+                    cache.put(key, out, provider=provider, model=model, mode=mode)
+        except Exception as e:
+            tr.set(provider=provider, model=model, status="error", error=str(e))
+            tr.emit(args.trace, cfg.get("metrics_log"))
+            raise
+        elapsed = int((time.time() - t0) * 1000)
+        rec.update(_section_meta(args, mode, len(window), window_sha, elapsed))
+        rec["provider"], rec["model"] = provider, model
+        if info.get("redactions"):
+            rec["redactions"] = dict(info["redactions"])
+        rec["text"] = out
+        tr.set(provider=provider, model=model, status="ok", bytes_in=info["bytes_in"], window_bytes=len(window),
+               text_bytes=len(text.encode("utf-8")), ttft_ms=elapsed, out_bytes=len(out.encode("utf-8")))
+        tr.emit(args.trace, cfg.get("metrics_log"))
+        return rec
+
+    writer = batch.Writer(args.out)
+    try:
+        return batch.run(todo, analyze, writer, jobs=args.jobs)
+    finally:
+        writer.close()
+
+def _emit_trace(tr, args: argparse.Namespace, cfg: dict) -> None:
+    """Finish the run's trace record (pool figures, token usage) and write it where --trace / metrics_log say."""
+    if not args.trace and not cfg.get("metrics_log"):
+        return
+    base = sys.modules.get(__package__ + ".providers.base")    # never import requests just for this
+    if base is not None:
+        pool = base.Provider.pool_stats()
+        tr.set(http_requests=pool["requests"], http_connections=pool["connections"])
+    from .trace import USAGE
+    if USAGE:
+        tr.set(usage=dict(USAGE))
+        if USAGE["input_tokens"] and "cached_tokens" in USAGE:
+            # prefix-cache hit rate: cached prompt tokens over all prompt tokens
+            tr.set(cache_hit_rate=round(USAGE["cached_tokens"] / USAGE["input_tokens"], 3))
+    tr.emit(args.trace, cfg.get("metrics_log"))
+
 def main() -> None:
+    from .trace import Trace
+    tr = Trace()
     cfg = load_config()
 
     ap = argparse.ArgumentParser(
@@ -67,99 +620,223 @@ def main() -> None:
 
     # init subcommand (delegates to the wizard)
     initp = sub.add_parser("init", help="Interactive setup and config writer")
+    servep = sub.add_parser("serve", help="Keep providers and connections warm behind a unix socket")
+    servep.add_argument("--socket", help="Socket path (default: $XDG_RUNTIME_DIR/kullexai.sock)")
+    warmp = sub.add_parser("warm", help="Load the configured Ollama model now, sized for a full window")
+    warmp.add_argument("-p", "--provider", choices=PROVIDERS, metavar="PROVIDER", default=cfg.get("provider", "openai"))
+    warmp.add_argument("-m", "--model", default=cfg.get("model", "gpt-4o-mini"))
+    warmp.add_argument("-e", "--endpoint", default=cfg.get("endpoint", ""))
+    warmp.add_argument("-L", "--limit", type=int, default=int(cfg.get("window_bytes", 128 * 1024)),
+                       help="Window size the context is sized for")
+    warmp.add_argument("-T", "--maxtok", type=int, default=int(cfg.get("max_tokens", 400)))
+    warmp.add_argument("-t", "--timeout", type=int, default=None, help="HTTP read timeout (seconds)")
+    batchp = sub.add_parser("batch", help="Analyze many files through a worker pool, one JSONL record per file")
+    _add_flags(batchp, cfg, out_help="Append JSONL records to this file (default: stdout); "
+                                     "files already recorded there are skipped")
+    batchp.add_argument("--no-resume", action="store_true", help="Redo files that already have a record in -o")
+    batchp.add_argument("paths", nargs="+", metavar="PATH", help="Files, directories or globs (quote ** globs)")
     _add_flags(ap, cfg)
+    ap.add_argument("-f", "--file", metavar="PATH",
+                    help="Read PATH instead of stdin: only its tail is read; .gz/.xz/.bz2 are decompressed on the fly")
+    ap.add_argument("--no-echo", action="store_true", help="Do not copy the input to stdout")
+    ap.add_argument("--since", metavar="WHEN", help="Only lines stamped at or after WHEN: 15m, 2h, 1d (ago), "
+                                                    "10:30 (today), 2024-05-01T10:30; echo shows only those lines")
+    ap.add_argument("--until", metavar="WHEN", help="Only lines stamped at or before WHEN (same forms as --since)")
     args = ap.parse_args()
+    if getattr(args, "priority", None) is not None:
+        from .jsonlog import parse_priority
+        try:
+            args.priority = parse_priority(args.priority)
+        except ValueError as e:
+            ap.error(str(e))
+    if args.since is not None or args.until is not None:
+        from .timeslice import parse_when
+        try:
+            now = time.time()
+            args.since = parse_when(args.since, now) if args.since is not None else None
+            args.until = parse_when(args.until, now) if args.until is not None else None
+        except ValueError as e:
+            ap.error(str(e))
+        if args.follow or args.full:
+            ap.error("--since/--until do not support --follow or --full")
 
     if args.subcmd == "init":
         from .kull_init import run_init
         run_init()
         return
+    if args.subcmd == "serve":
+        from .daemon import serve
+        _configure_providers(cfg)
+        sys.exit(serve(cfg, PROVIDERS, args.socket))
+    if args.subcmd == "warm":
+        sys.exit(_run_warm(args, cfg))
+
+    if args.subcmd == "batch":
+        if args.follow or args.full:
+            batchp.error("batch does not support --follow or --full")
+        # files, not stdin: no mode flag means summary even on a terminal
+        sys.exit(EXIT_AI_FAIL if _run_batch(_pick_mode(args) or "sum", args, cfg) else 0)
 
     mode = _pick_mode(args)
     if not mode:
         ap.print_help()
         sys.exit(EXIT_NO_MODE)
 
-    window = tail_window(args.limit)
-    if not window:
-        print("[kull] No input on stdin", file=sys.stderr)
-        sys.exit(EXIT_NO_INPUT)
+    if args.follow:
+        if args.file:
+            ap.error("--follow reads stdin; pipe the file in (tail -F PATH | kull -F)")
+        _run_follow(mode, args, cfg)
+        return
 
-    text = window.decode("utf-8", errors="replace")
-    if cfg.get("redact", "basic") == "basic":
-        text = redact_basic(text)
+    cache = _open_cache(args, cfg)
+    tr.set(provider=_provider_label(args), model=args.model, mode=mode, stream=args.stream)
+    if args.full:
+        try:
+            with tr.stage("map_reduce"):
+                prompt, text, window_bytes, window_sha = _run_full(mode, args, cfg, cache)
+        except Exception as e:
+            print(f"[kull] error: {e}", file=sys.stderr)
+            tr.set(status="error", error=str(e))
+            _emit_trace(tr, args, cfg)
+            sys.exit(EXIT_AI_FAIL)
+        if not window_bytes:
+            print("[kull] No input on stdin", file=sys.stderr)
+            sys.exit(EXIT_NO_INPUT)
+        tr.set(bytes_in=window_bytes)
+    else:
+        info: dict = {}
+        limit = args.limit
+        if mode == "scan" and cfg.get("scan_parse", "on") == "on" and not (args.since or args.until):
+            # the parsed table is what must fit the context, so read (nearly) the whole scan; -L
+            # still sizes the window of an unparsable one and the provider's context
+            info["scan_limit"], limit = args.limit, max(args.limit, int(cfg.get("scan_window_bytes", 64 << 20)))
+        with tr.stage("read"):      # includes echoing the input to stdout
+            window = _read_input(args, info, limit)
+        if not window:
+            if info.get("time_range"):
+                print(f"[kull] No lines between {info['time_range']}"
+                      + (f" (input covers {info['file_range']})" if info.get("file_range") else ""), file=sys.stderr)
+            else:
+                print(f"[kull] No input {'in ' + args.file if args.file else 'on stdin'}", file=sys.stderr)
+            sys.exit(EXIT_NO_INPUT)
+        if info.get("time_window"):
+            tr.set(time_window=" → ".join(info["time_window"]))
+        with tr.stage("digest"):
+            window_bytes, window_sha = len(window), sha256_hex(window)
+
+        text = _prepare_text(window, info, args, cfg, tr)
+        if info.get("redactions"):
+            print("[kull] redacted: " + ", ".join(f"{k}={v}" for k, v in info["redactions"].most_common()),
+                  file=sys.stderr)
+            tr.set(redactions=dict(info["redactions"]))
+        if info.get("scan"):
+            sc = info["scan"]
+            print(f"[kull] scan: {sc['hosts']} hosts, {sc['open_ports']} open ports ({', '.join(sc['formats'])}); "
+                  f"{sc['bytes']} → {len(text.encode('utf-8'))} bytes", file=sys.stderr)
+            tr.set(scan_hosts=sc["hosts"], scan_open_ports=sc["open_ports"], scan_formats=sc["formats"])
+        if info.get("json"):
+            js = info["json"]
+            hidden = f"; {js['hidden']} below --priority dropped" if js["hidden"] else ""
+            print(f"[kull] json: {js['entries']} entries ({js['kind']}){hidden}; "
+                  f"{js['bytes']} → {len(text.encode('utf-8'))} bytes", file=sys.stderr)
+            tr.set(json_entries=js["entries"], json_kind=js["kind"], json_hidden=js["hidden"])
+        elif args.priority is not None:
+            print("[kull] --priority applies to JSON log input only; ignored", file=sys.stderr)
+        tr.set(bytes_in=info.get("bytes_in", window_bytes))
+
+        # Build the system prompt. os.getlogin() fails without a controlling terminal (cron, CI)
+        with tr.stage("prompt"):
+            prompt = build_prompt(mode, username=current_username())
 
-    # Build the system prompt (username injection happens inside build_prompt if you added it)
-    # If you implemented username handling in prompts: from .user import current_username
-    # prompt = build_prompt(mode, current_username())
-    prompt = build_prompt(mode, username=os.getlogin() or "user")
+    from .budget import approx_tokens
+    tr.set(window_bytes=window_bytes, text_bytes=len(text.encode("utf-8")),
+           prompt_bytes=len(prompt.encode("utf-8")), tokens_in_est=approx_tokens(prompt) + approx_tokens(text))
 
     # Visual divider before AI section (unless quiet/file-only)
 
-    title = {"sum": "ai summary", "sol": "ai solutions", "ser": "ai deepsearch", "scan": "ai scan", "exp": "ai explain"}[mode]
+    title = TITLES[mode]
     if not args.quiet:
         sys.stdout.write(divider(title))
         sys.stdout.flush()
 
+    # Response cache: a byte-identical request replays the stored answer
+    key = cached = None
+    if cache is not None:
+        from .cache import cache_key
+        with tr.stage("cache"):
+            key = cache_key(window_sha, prompt, text, _provider_label(args), args.model, args.maxtok, args.endpoint)
+            if not args.refresh:
+                cached = cache.get(key)
+    tr.set(cache="off" if cache is None else "hit" if cached is not None else "miss")
+
     # Provider instance (endpoint override is optional)
-    ProviderClass = PROVIDERS[args.provider]
-    try:
-        prov = ProviderClass(base_url=args.endpoint or None)
-    except Exception as e:
-        if not args.quiet:
-            sys.stdout.write(f"AI init failed: {e}\n"); sys.stdout.flush()
-        print(f"[kull] provider init failed: {e}", file=sys.stderr)
-        sys.exit(EXIT_AI_FAIL)
+    with tr.stage("provider_init"):
+        prov = _make_provider(args, cfg) if cached is None else None
 
     # Call AI
     start = time.time()
     ai_text = ""
+    ttft = None
     try:
-        if args.stream:
-            parts: list[str] = []
-            for delta in prov.stream(prompt, text, args.model, args.maxtok, args.timeout):
+        with tr.stage("generate"):
+            if args.stream:
+                if cached is not None:
+                    from .cache import replay
+                    deltas = replay(cached)
+                else:
+                    deltas = prov.stream(prompt, text, args.model, args.maxtok, args.timeout)
+                section = _SectionSink(args, mode, window_bytes, window_sha, prov, start) if args.out else None
+                try:
+                    with _renderer(args, cfg, section) as out:
+                        for delta in deltas:
+                            out.write(delta)
+                finally:
+                    if section is not None:
+                        section.close()
+                ai_text, ttft = out.text, out.ttft_ms
+                if not ai_text.strip() and not args.quiet:
+                    print("AI output truncated or empty", file=sys.stderr)
+            else:
+                if cached is not None:
+                    ai_text = cached
+                else:
+                    ai_text = prov.complete(prompt, text, args.model, args.maxtok, args.timeout)
+                if not ai_text.strip() and not args.quiet:
+                    print("AI output truncated or empty", file=sys.stderr)
                 if not args.quiet:
-                    sys.stdout.write(delta)
-                parts.append(delta)
-            ai_text = "".join(parts)
-            if not ai_text.strip() and not args.quiet:
-                print("AI output truncated or empty", file=sys.stderr)
-        else:
-            ai_text = prov.complete(prompt, text, args.model, args.maxtok, args.timeout)
-            if not ai_text.strip() and not args.quiet:
-                print("AI output truncated or empty", file=sys.stderr)
-            if not args.quiet:
-                sys.stdout.write(ai_text)
-                sys.stdout.flush()
+                    sys.stdout.write(ai_text)
+                    sys.stdout.flush()
     except Exception as e:
         if not args.quiet:
             sys.stdout.write(f"AI failed: {e}\n")
             sys.stdout.flush()
         print(f"[kull] error: {e}", file=sys.stderr)
+        tr.set(status="error", error=str(e))
+        _emit_trace(tr, args, cfg)
         sys.exit(EXIT_AI_FAIL)
     finally:
         elapsed = int((time.time() - start) * 1000)
-        #print(f"[kull] provider={args.provider} model={args.model} mode={mode} "
-        #    f"tokens<={args.maxtok} elapsed_ms={elapsed}", file=sys.stderr)
 
+    # --race / fallback: the header and cache entry name the provider that actually answered
+    if prov is not None and getattr(prov, "winner", None) is not None:
+        key, args.provider, args.model = _answered(args, prov, key, window_sha, prompt, text)
+        tr.set(provider=args.provider, model=args.model)
 
-    # Optional file output
+    if cache is not None and cached is None and ai_text.strip():
+        cache.put(key, ai_text, provider=args.provider, model=args.model, mode=mode)
+
+    # Optional file output (--stream wrote it as the deltas arrived)
+    if args.out and not args.stream:
+        with tr.stage("write_out"):
+            _write_section(args, mode, window_bytes, window_sha, elapsed, ai_text, ttft_ms=ttft)
+
+    first = ttft if ttft is not None else elapsed       # without --stream the first token arrives with the last
+    tokens_out = approx_tokens(ai_text)
+    gen_s = (elapsed - first) / 1000 if args.stream else elapsed / 1000
+    tr.set(status="ok", ttft_ms=first, out_bytes=len(ai_text.encode("utf-8")), tokens_out_est=tokens_out,
+           tokens_per_s=round(tokens_out / gen_s, 1) if gen_s > 0 else None)
+    _emit_trace(tr, args, cfg)
 
-    if args.out:
-        header = (f"# ai-section v1\n"
-                  f"provider={args.provider} model={args.model} mode={mode} "
-                  f"window_bytes={len(window)} sha256={sha256_hex(window)}\n"
-                  f"tokens<={args.maxtok} elapsed_ms={elapsed}\n"
-                  f"timestamp={time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())}\n---\n")
-        try:
-            with open(args.out, "w", encoding="utf-8") as f:
-                f.write(header); f.write(ai_text)
-                if not ai_text.endswith("\n"):
-                    f.write("\n")
-        except Exception as e:
-            if not args.quiet:
-                print(f"[kull] failed to write {args.out}: {e}", file=sys.stderr)
-    
 
 if __name__ == "__main__":
     main()
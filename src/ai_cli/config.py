@@ -5,6 +5,8 @@ from pathlib import Path
 APP_NAME = "kullexai"
 CONFIG_DIR = Path(os.getenv("XDG_CONFIG_HOME", Path.home()/".config")) / APP_NAME
 CONFIG_PATH = CONFIG_DIR / "config.toml"
+CACHE_DIR = Path(os.getenv("XDG_CACHE_HOME", Path.home()/".cache")) / APP_NAME
+STATE_DIR = Path(os.getenv("XDG_STATE_HOME", Path.home()/".local"/"state")) / APP_NAME
 
 DEFAULTS = {
     "provider": os.getenv("KULL_PROVIDER", "openai"),
@@ -13,6 +15,37 @@ DEFAULTS = {
     "window_bytes": int(os.getenv("KULL_WINDOW_BYTES", 128*1024)),
     "max_tokens": int(os.getenv("KULL_MAX_TOKENS", 400)),
     "redact": os.getenv("KULL_REDACT", "basic"), # "basic" | "off"
+    "dedup": os.getenv("KULL_DEDUP", "off"), # "on" | "off": collapse repeated lines into templates
+    "budget_tokens": int(os.getenv("KULL_BUDGET_TOKENS", 0)), # 0 = send the whole window
+    "json_logs": os.getenv("KULL_JSON_LOGS", "on"), # "on": JSON-lines input (journalctl -o json, Docker, app logs) is sent as a grouped table
+    "json_priority": os.getenv("KULL_JSON_PRIORITY", ""), # e.g. "warning": drop less severe JSON entries ("" = keep all)
+    "facts": os.getenv("KULL_FACTS", "on"), # "on": -sum/-ser prepend locally counted lines, severities, error codes, units and time span
+    "scan_parse": os.getenv("KULL_SCAN_PARSE", "on"), # "on": -scan sends a host/port table parsed from nmap/masscan output | "off"
+    "scan_window_bytes": int(os.getenv("KULL_SCAN_WINDOW_BYTES", 64*1024*1024)), # -scan input read for parsing; unparsed input keeps -L
+    "full_chunk_bytes": int(os.getenv("KULL_FULL_CHUNK_BYTES", 96*1024)),
+    "full_overlap": int(os.getenv("KULL_FULL_OVERLAP", 2048)),
+    "full_jobs": int(os.getenv("KULL_FULL_JOBS", 4)),
+    "follow_seconds": float(os.getenv("KULL_FOLLOW_SECONDS", 60)),
+    "follow_lines": int(os.getenv("KULL_FOLLOW_LINES", 0)),
+    "pool_size": int(os.getenv("KULL_POOL_SIZE", 10)), # keep-alive connections per host
+    "connect_timeout": float(os.getenv("KULL_CONNECT_TIMEOUT", 10)), # seconds; -t/--timeout bounds reads
+    "daemon": os.getenv("KULL_DAEMON", "auto"), # "auto": use `kull serve` when it is running | "off"
+    "fallback": os.getenv("KULL_FALLBACK", ""), # e.g. "ollama:llama3,openrouter": tried in order when the provider fails
+    "breaker": os.getenv("KULL_BREAKER", "on"), # "on": skip providers that failed recently (shared by all kull processes)
+    "breaker_threshold": int(os.getenv("KULL_BREAKER_THRESHOLD", 2)), # consecutive failures before a provider is skipped
+    "breaker_cooldown": float(os.getenv("KULL_BREAKER_COOLDOWN", 30)), # seconds before a skipped provider is probed again
+    "race": os.getenv("KULL_RACE", ""), # e.g. "ollama:llama3,openai": stream whichever answers first
+    "race_hedge_ms": int(os.getenv("KULL_RACE_HEDGE_MS", 0)), # start the next contender only after this long without a token
+    "metrics_log": os.getenv("KULL_METRICS_LOG", ""), # append one JSON trace line per run to this file ("" = off)
+    "render_interval_ms": int(os.getenv("KULL_RENDER_INTERVAL_MS", 30)), # --stream: max delay before tokens are flushed
+    "render_bytes": int(os.getenv("KULL_RENDER_BYTES", 4096)), # --stream: flush early once this much is pending
+    "stream_usage": os.getenv("KULL_STREAM_USAGE", "auto"), # OpenAI-style --stream usage chunk: "on" | "off" | "auto" (api.openai.com, openrouter.ai only)
+    "ollama_keep_alive": os.getenv("KULL_OLLAMA_KEEP_ALIVE", "30m"), # how long Ollama keeps the model loaded ("-1" = forever)
+    "ollama_num_ctx": int(os.getenv("KULL_OLLAMA_NUM_CTX", 0)), # 0 = sized once from window_bytes (-L) and max_tokens (-T)
+    "ollama_num_ctx_max": int(os.getenv("KULL_OLLAMA_NUM_CTX_MAX", 32768)), # upper bound for the sized num_ctx
+    "cache": os.getenv("KULL_CACHE", "on"), # "on" | "off"
+    "cache_max_bytes": int(os.getenv("KULL_CACHE_MAX_BYTES", 64*1024*1024)),
+    "cache_ttl": int(os.getenv("KULL_CACHE_TTL", 7*24*3600)), # seconds
 }
 
 ENV_KEYS = {
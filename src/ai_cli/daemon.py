@@ -0,0 +1,174 @@
+from __future__ import annotations
+import json, os, signal, socket, socketserver, stat, sys, threading
+from pathlib import Path
+from typing import Iterator, Optional
+from .trace import collect_usage, record_usage
+
+# `kull serve` keeps provider instances (and their warm keep-alive pools) and the
+# parsed config resident behind a per-user unix socket. The normal `kull` entry
+# point still reads, echoes and prepares the window itself, then hands the
+# provider call to the daemon when one is listening.
+#
+# Wire format: newline-delimited JSON. The client sends one request object; the
+# daemon answers with {"delta": ...} lines and a final {"done": true, "usage":
+# {...}} or {"error": ...}.
+
+def socket_path() -> Path:
+    override = os.getenv("KULL_SOCKET")
+    if override:
+        return Path(override)
+    runtime = os.getenv("XDG_RUNTIME_DIR")
+    if runtime and os.path.isdir(runtime):
+        return Path(runtime) / "kullexai.sock"
+    return Path(f"/tmp/kullexai-{os.getuid()}.sock")
+
+def _owned(path: Path) -> bool:
+    """True when `path` is a socket of ours that only we can use: in /tmp anyone
+    could have created it first and would then see every prompt and log window."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    if stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid() and not st.st_mode & 0o077:
+        return True
+    print(f"[kull] ignoring daemon socket {path}: not a 0600 socket owned by this user", file=sys.stderr)
+    return False
+
+def _connect(path: Path) -> Optional[socket.socket]:
+    if not os.path.lexists(path) or not _owned(path):
+        return None
+    s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        s.connect(str(path))
+    except OSError:
+        s.close()
+        return None
+    return s
+
+class RemoteProvider:
+    """Client-side stand-in for a Provider whose calls run inside `kull serve`."""
+
+    def __init__(self, path: Path, provider: str, endpoint: str = ""):
+        self.path = path
+        self.name = provider
+        self.endpoint = endpoint
+
+    def _call(self, op: str, prompt, text, model, max_tokens, timeout) -> Iterator[dict]:
+        s = _connect(self.path)
+        if s is None:
+            raise ConnectionError(f"kull daemon at {self.path} went away")
+        req = {"op": op, "provider": self.name, "endpoint": self.endpoint, "prompt": prompt,
+               "text": text, "model": model, "max_tokens": max_tokens, "timeout": timeout}
+        with s, s.makefile("rb") as rf:
+            s.sendall(json.dumps(req).encode("utf-8") + b"\n")
+            for line in rf:
+                msg = json.loads(line)
+                if "error" in msg:
+                    err = RuntimeError(msg["error"])
+                    err.transient = msg.get("transient", True)  # see fallback.transient
+                    raise err
+                if msg.get("done"):
+                    record_usage(**msg.get("usage", {}))
+                    return
+                yield msg
+
+    def stream(self, prompt, text, model, max_tokens, timeout):
+        for msg in self._call("stream", prompt, text, model, max_tokens, timeout):
+            yield msg["delta"]
+
+    def complete(self, prompt, text, model, max_tokens, timeout) -> str:
+        return "".join(m["delta"] for m in self._call("complete", prompt, text, model, max_tokens, timeout))
+
+def connect(provider: str, endpoint: str = "") -> Optional[RemoteProvider]:
+    """A RemoteProvider if a daemon is listening on the socket, else None (run in-process)."""
+    path = socket_path()
+    s = _connect(path)
+    if s is None:
+        return None
+    s.close()
+    return RemoteProvider(path, provider, endpoint)
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            req = json.loads(line)
+            prov = self.server.provider(req["provider"], req.get("endpoint") or "")
+            args = (req["prompt"], req["text"], req["model"], int(req["max_tokens"]), req.get("timeout"))
+            with collect_usage() as usage:
+                if req.get("op") == "stream":
+                    for delta in prov.stream(*args):
+                        self._send({"delta": delta})
+                else:
+                    self._send({"delta": prov.complete(*args)})
+            self._send({"done": True, "usage": dict(usage)})
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        except Exception as e:
+            from .fallback import transient
+            try:
+                self._send({"error": str(e) or e.__class__.__name__, "transient": transient(e)})
+            except OSError:
+                pass
+
+    def _send(self, msg: dict) -> None:
+        self.wfile.write(json.dumps(msg).encode("utf-8") + b"\n")
+        self.wfile.flush()
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, providers: dict):
+        self._providers = providers     # name -> Provider class
+        self._instances: dict = {}
+        self._lock = threading.Lock()
+        super().__init__(str(path), _Handler)
+
+    def provider(self, name: str, endpoint: str):
+        key = (name, endpoint)
+        with self._lock:
+            prov = self._instances.get(key)
+            if prov is None:
+                if name not in self._providers:
+                    raise ValueError(f"unknown provider: {name}")
+                prov = self._providers[name](base_url=endpoint or None)
+                self._instances[key] = prov
+            return prov
+
+def serve(cfg: dict, providers: dict, path: Optional[Path] = None) -> int:
+    path = Path(path) if path else socket_path()
+    if os.path.lexists(path):
+        if not _owned(path):
+            return 1
+        probe = _connect(path)
+        if probe is not None:
+            probe.close()
+            print(f"[kull] a daemon is already listening on {path}", file=sys.stderr)
+            return 1
+        path.unlink()                   # stale socket from a crashed daemon
+    path.parent.mkdir(parents=True, exist_ok=True)
+    old_umask = os.umask(0o077)         # socket is 0600: only this user may connect
+    try:
+        srv = Server(path, providers)
+    finally:
+        os.umask(old_umask)
+    # Build the configured provider up front so the first client doesn't pay for it
+    try:
+        srv.provider(cfg.get("provider", "openai"), cfg.get("endpoint", ""))
+    except Exception as e:
+        print(f"[kull] warning: {cfg.get('provider')} init failed: {e}", file=sys.stderr)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=srv.shutdown, daemon=True).start())
+    print(f"[kull] serving on {path}", file=sys.stderr)
+    try:
+        srv.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        srv.server_close()
+        try:
+            path.unlink()
+        except OSError:
+            pass
+    return 0
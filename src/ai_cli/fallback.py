@@ -0,0 +1,210 @@
+from __future__ import annotations
+import json, os, sys, threading, time
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional, Tuple
+from .config import STATE_DIR
+
+# Provider fallback with a circuit breaker shared by every kull process on the
+# host. State lives in one small JSON file under $XDG_STATE_HOME, updated under
+# an flock. A provider that failed `threshold` times in a row is skipped for
+# `cooldown` seconds; after that exactly one process gets to probe it
+# (half-open). A successful probe closes the circuit, a failed one reopens it
+# with twice the cooldown.
+
+class Breaker:
+    def __init__(self, path: Optional[Path] = None, threshold: int = 2, cooldown: float = 30.0,
+                 max_cooldown: float = 600.0):
+        self.path = Path(path) if path else STATE_DIR / "breaker.json"
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+
+    def _update(self, fn: Callable[[dict, float], object]):
+        """Run fn(state, now) under the lock; the state is written back if fn changed it."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(".lock"), "a") as lock:
+            try:
+                import fcntl
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            try:
+                with open(self.path, encoding="utf-8") as f:
+                    state = json.load(f)
+            except (OSError, ValueError):
+                state = {}
+            before = json.dumps(state, sort_keys=True)
+            out = fn(state, time.time())
+            if json.dumps(state, sort_keys=True) != before:
+                tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(state, f)
+                os.replace(tmp, self.path)
+            return out
+
+    def allow(self, key: str) -> Tuple[bool, float]:
+        """(may call the provider now, seconds until it may be probed again)."""
+        def check(state: dict, now: float):
+            st = state.get(key)
+            if not st or st["failures"] < self.threshold:
+                return True, 0.0
+            reopen = st["opened"] + st["cooldown"]
+            if now < reopen:
+                return False, reopen - now
+            if st.get("probe", 0) > now:            # another process is probing it right now
+                return False, st["probe"] - now
+            st["probe"] = now + max(self.cooldown, 60.0)   # lease; expires if the prober dies
+            return True, 0.0
+        return self._update(check)
+
+    def success(self, key: str) -> None:
+        self._update(lambda state, now: state.pop(key, None))
+
+    def release(self, key: str) -> None:
+        """Give up a probe lease without a verdict (a 4xx, or the caller stopped reading)."""
+        self._update(lambda state, now: (state.get(key) or {}).pop("probe", None))
+
+    def failure(self, key: str) -> None:
+        def record(state: dict, now: float):
+            st = state.setdefault(key, {"failures": 0, "opened": 0.0, "cooldown": self.cooldown})
+            probing = st.pop("probe", 0) > 0
+            st["failures"] += 1
+            if st["failures"] >= self.threshold:
+                st["cooldown"] = min(st["cooldown"] * 2, self.max_cooldown) if probing else self.cooldown
+                st["opened"] = now
+        self._update(record)
+
+def transient(e: Exception) -> bool:
+    """True for failures of the endpoint itself (unreachable, timed out, 5xx, 429):
+    those trip the breaker and fall back. A 4xx or a bad request is the caller's
+    to fix and would fail the same way on the next provider, so it is raised as is."""
+    flag = getattr(e, "transient", None)        # set where only a message survives (daemon, SSE error events)
+    if flag is not None:
+        return bool(flag)
+    status = getattr(getattr(e, "response", None), "status_code", None)
+    if status is not None:
+        return status == 429 or status >= 500
+    requests = sys.modules.get("requests")      # never imported just to classify an error
+    if requests is not None and isinstance(e, requests.RequestException):
+        return isinstance(e, (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError))
+    return isinstance(e, (ConnectionError, TimeoutError))
+
+class Choice(NamedTuple):
+    name: str
+    model: str
+    endpoint: str = ""
+
+    @property
+    def key(self) -> str:
+        return f"{self.name}@{self.endpoint}" if self.endpoint else self.name
+
+class FallbackProvider:
+    """Try each provider in order, skipping open circuits; `model` arguments are ignored (each choice has its own).
+
+    `winner` is the choice that answered this thread's last call (calls overlap under --full and batch -j).
+    """
+
+    def __init__(self, chain: List[Choice], factory: Callable[[str, str], object],
+                 breaker: Optional[Breaker] = None, log=None):
+        self.chain = chain
+        self.factory = factory          # (name, endpoint) -> provider instance
+        self.breaker = breaker
+        self.log = log if log is not None else sys.stderr
+        self._instances: dict = {}
+        self._local = threading.local()
+
+    @property
+    def winner(self) -> Optional[Choice]:
+        return getattr(self._local, "winner", None)
+
+    def _note(self, msg: str) -> None:
+        if len(self.chain) > 1:         # with a single provider the final error says it all
+            print(f"[kull] {msg}", file=self.log, flush=True)
+
+    def _candidates(self, errors: list) -> Iterator[Tuple[Choice, object]]:
+        for choice in self.chain:
+            prov = self._instances.get(choice)
+            if prov is None:
+                try:
+                    prov = self._instances[choice] = self.factory(choice.name, choice.endpoint)
+                except Exception as e:
+                    errors.append((choice, e))
+                    self._note(f"{choice.name} unavailable: {e}")
+                    continue
+            if self.breaker is not None:
+                ok, wait = self.breaker.allow(choice.key)
+                if not ok:
+                    msg = f"{choice.name} skipped: failed recently, next probe in {wait:.0f}s"
+                    errors.append((choice, RuntimeError(msg)))
+                    self._note(msg)
+                    continue
+            yield choice, prov
+
+    def _failed(self, choice: Choice, e: Exception, errors: list) -> None:
+        errors.append((choice, e))
+        if self.breaker is not None:
+            self.breaker.failure(choice.key)
+        if choice is not self.chain[-1]:
+            self._note(f"{choice.name} failed: {e}; falling back")
+
+    def _give_up(self, errors: list):
+        if len(errors) == 1:
+            return errors[0][1]
+        return RuntimeError("no provider answered: " + "; ".join(f"{c.name}: {e}" for c, e in errors))
+
+    def _release(self, choice: Choice) -> None:
+        if self.breaker is not None:
+            self.breaker.release(choice.key)
+
+    def stream(self, prompt, text, model, max_tokens, timeout) -> Iterator[str]:
+        errors: list = []
+        self._local.winner = None
+        for choice, prov in self._candidates(errors):
+            started = False
+            try:
+                for delta in prov.stream(prompt, text, choice.model, max_tokens, timeout):
+                    if not started:
+                        started, self._local.winner = True, choice
+                    yield delta
+            except Exception as e:
+                if not transient(e):
+                    self._release(choice)
+                    raise
+                self._failed(choice, e, errors)
+                if started:
+                    raise           # part of the answer is already out; don't mix in another model
+                continue
+            except BaseException:   # the caller closed the stream, ^C: no verdict, but free the probe
+                self._release(choice)
+                raise
+            if self.breaker is not None:
+                self.breaker.success(choice.key)
+            self._local.winner = choice
+            return
+        raise self._give_up(errors)
+
+    def complete(self, prompt, text, model, max_tokens, timeout) -> str:
+        errors: list = []
+        self._local.winner = None
+        for choice, prov in self._candidates(errors):
+            try:
+                out = prov.complete(prompt, text, choice.model, max_tokens, timeout)
+            except Exception as e:
+                if not transient(e):
+                    self._release(choice)
+                    raise
+                self._failed(choice, e, errors)
+                continue
+            except BaseException:
+                self._release(choice)
+                raise
+            if self.breaker is not None:
+                self.breaker.success(choice.key)
+            self._local.winner = choice
+            return out
+        raise self._give_up(errors)
+
+    @staticmethod
+    def pool_stats() -> dict:
+        from .providers.base import Provider
+        return Provider.pool_stats()
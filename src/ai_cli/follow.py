@@ -0,0 +1,161 @@
+from __future__ import annotations
+import os, select, sys, threading, time
+from collections import deque
+from typing import Callable, Optional
+from .facts import LogFacts
+from .templates import TemplateMiner
+
+# --follow: keep echoing a never-ending stdin (journalctl -f, tail -F) and emit a
+# fresh AI section every N seconds or N new lines. Each update sends only the
+# lines that arrived since the previous one, plus a short template summary of
+# everything before them, so the token cost per update stays bounded. The log
+# facts of an update are counted on the raw lines as they arrive, not on that
+# rewritten text.
+
+class Follower:
+    def __init__(self, every: float = 60.0, every_lines: int = 0, limit: int = 128 * 1024,
+                 summary_templates: int = 15, max_templates: int = 2000, facts: bool = False):
+        self.every = every
+        self.every_lines = every_lines
+        self.limit = limit
+        self.summary_templates = summary_templates
+        self.max_templates = max_templates
+        self.miner = TemplateMiner()
+        self.first_ts = ""
+        self.pending: deque[str] = deque()
+        self.pending_bytes = 0
+        self.pending_lines = 0          # including lines dropped to stay under `limit`
+        self.last_run = time.monotonic()
+        self.facts = LogFacts() if facts else None     # over the lines of the next update, dropped ones too
+        self.taken: Optional[LogFacts] = None           # ... and of the last take()
+
+    def add(self, line: str) -> None:
+        if self.facts is not None:
+            self.facts.add(line)
+        self.pending.append(line)
+        self.pending_bytes += len(line) + 1
+        self.pending_lines += 1
+        while self.pending_bytes > self.limit and len(self.pending) > 1:
+            old = self.pending.popleft()
+            self.pending_bytes -= len(old) + 1
+            self._remember(old)     # too old to send verbatim; still counted in the summary
+
+    def _remember(self, line: str) -> None:
+        c = self.miner.add(line)
+        if c is not None and not self.first_ts and c.first_ts:
+            self.first_ts = c.first_ts
+
+    def due(self, now: float) -> bool:
+        if not self.pending_lines:
+            return False
+        if self.every_lines and self.pending_lines >= self.every_lines:
+            return True
+        return bool(self.every) and now - self.last_run >= self.every
+
+    def wait_time(self, now: float) -> Optional[float]:
+        # nothing pending: block until input arrives (a zero timeout would spin on select)
+        if not self.every or not self.pending_lines:
+            return None
+        return max(0.0, self.every - (now - self.last_run))
+
+    def summary(self) -> str:
+        if not self.miner.lines:
+            return ""
+        since = f" since {self.first_ts}" if self.first_ts else ""
+        out = [f"[kull] earlier input, summarized (context only): {self.miner.lines} lines{since}; "
+               f"most frequent templates:"]
+        for c in self.miner.top(self.summary_templates):
+            span = f" {c.first_ts} .. {c.last_ts}" if c.first_ts else ""
+            out.append(f"[x{c.count}{span}] {c.template}")
+        return "\n".join(out) + "\n"
+
+    def take(self) -> str:
+        """Text for the next update; the new lines then move into the rolling summary and
+        their facts into `taken`."""
+        lines = list(self.pending)
+        dropped = self.pending_lines - len(lines)
+        head = self.summary()
+        if head:
+            head += "\n"
+        head += f"[kull] new lines since the last analysis ({self.pending_lines}):\n"
+        if dropped:
+            head += f"[... {dropped} lines elided ...]\n"
+        for line in lines:
+            self._remember(line)
+        self.miner.prune(self.max_templates)
+        self.pending.clear()
+        self.pending_bytes = self.pending_lines = 0
+        self.last_run = time.monotonic()
+        if self.facts is not None:
+            self.taken, self.facts = self.facts, LogFacts()
+        return head + "\n".join(lines) + "\n"
+
+def run(follower: Follower, analyze: Callable[[str, Optional[LogFacts]], None], in_fd: Optional[int] = None,
+        out_fd: Optional[int] = None, read_size: int = 65536, echo: bool = True) -> None:
+    """Echo in_fd to out_fd (unless echo is False) and call analyze(text, facts) whenever an
+    update is due, until EOF; facts is Follower.taken. analyze runs on a worker thread, one at
+    a time: input is read and echoed meanwhile (whole lines, so they do not split a line of
+    the section), and lines that arrive during an analysis wait for the next update."""
+    in_fd = sys.stdin.fileno() if in_fd is None else in_fd
+    out_fd = sys.stdout.fileno() if out_fd is None else out_fd
+    sys.stdout.flush()
+    done_r, done_w = os.pipe()      # the worker's "finished" wakes the select below
+
+    def work(text: str, facts: Optional[LogFacts]) -> None:
+        try:
+            analyze(text, facts)
+            sys.stdout.flush()
+        finally:
+            try:
+                os.write(done_w, b".")
+            except OSError:         # run() is gone already (^C)
+                pass
+
+    worker: Optional[threading.Thread] = None
+    partial = held = b""
+    eof = False
+    try:
+        while True:
+            if worker is None:
+                if follower.due(time.monotonic()) or (eof and follower.pending_lines):
+                    text = follower.take()
+                    worker = threading.Thread(target=work, args=(text, follower.taken), name="kull-follow",
+                                              daemon=True)
+                    worker.start()
+                elif eof:
+                    break
+            timeout = None if worker is not None else follower.wait_time(time.monotonic())
+            ready, _, _ = select.select([done_r] if eof else [in_fd, done_r], [], [], timeout)
+            if done_r in ready:
+                os.read(done_r, 1)
+                worker.join()
+                worker = None
+            if echo and held and worker is None:
+                _write_all(out_fd, held)
+                held = b""
+            if in_fd not in ready:
+                continue
+            data = os.read(in_fd, read_size)
+            if not data:
+                eof = True
+                if partial:
+                    follower.add(partial.decode("utf-8", errors="replace"))
+                continue
+            if echo:
+                held += data
+                cut = len(held) if worker is None else held.rfind(b"\n") + 1
+                _write_all(out_fd, held[:cut])
+                held = held[cut:]
+            *lines, partial = (partial + data).split(b"\n")
+            for line in lines:
+                follower.add(line.decode("utf-8", errors="replace"))
+        if held:
+            _write_all(out_fd, held)
+    finally:
+        os.close(done_r)
+        os.close(done_w)
+
+def _write_all(fd: int, data: bytes) -> None:
+    mv = memoryview(data)
+    while mv:
+        mv = mv[os.write(fd, mv):]
@@ -0,0 +1,308 @@
+from __future__ import annotations
+import json, time
+from typing import Dict, List, Optional, Tuple
+
+# JSON-lines input: `journalctl -o json`, Docker json-file and structured app
+# logs (zap, logrus, bunyan, pino, Kubernetes collectors). Each line is parsed
+# on its own; entries are grouped by unit/container and priority, fields that
+# are the same for the whole group move to its header, journald's trusted and
+# bookkeeping fields are dropped, and each entry becomes one short row:
+#
+#   [nginx.service | err | 245 entries | host=web01]
+#   22:13:21 [4121] upstream timed out (110: Connection timed out) ...
+#
+# Plain journalctl text repeats "host unit[pid]:" on every line; this does not.
+
+PRIORITIES = ("emerg", "alert", "crit", "err", "warning", "notice", "info", "debug")
+_LEVEL_NAMES = {"emerg": 0, "emergency": 0, "panic": 0, "alert": 1, "fatal": 2, "crit": 2, "critical": 2,
+                "dpanic": 2, "err": 3, "error": 3, "warn": 4, "warning": 4, "notice": 5, "info": 6,
+                "information": 6, "debug": 7, "trace": 7, "verbose": 7}
+
+_TIME_KEYS = ("__REALTIME_TIMESTAMP", "@timestamp", "timestamp", "time", "ts", "t")
+_LEVEL_KEYS = ("PRIORITY", "level", "severity", "lvl", "loglevel", "log.level")
+_MSG_KEYS = ("MESSAGE", "msg", "message", "log", "short_message")
+_HOST_KEYS = ("_HOSTNAME", "hostname", "host")
+_PID_KEYS = ("_PID", "pid")
+# journald fields without a leading underscore that are still bookkeeping
+_SKIP = {"SYSLOG_FACILITY", "SYSLOG_IDENTIFIER", "SYSLOG_PID", "SYSLOG_TIMESTAMP", "SYSLOG_RAW", "CODE_FILE",
+         "CODE_LINE", "CODE_FUNC", "MESSAGE_ID", "INVOCATION_ID", "TID", "stream", "kubernetes", "docker",
+         "caller", "logger", "name", "v", "hostname", "host", "pid"}
+_USED = set(_TIME_KEYS + _LEVEL_KEYS + _MSG_KEYS + _HOST_KEYS + _PID_KEYS)
+_LOG_KEYS = frozenset(_TIME_KEYS + _LEVEL_KEYS + _MSG_KEYS)
+_EXTRA_MAX = 80
+_EXTRAS_PER_ROW = 6
+
+def parse_priority(spec: str) -> int:
+    """0-7 or a syslog/app level name ("err", "warning", "error", ...) -> 0-7."""
+    s = spec.strip().lower()
+    if s.isdigit() and int(s) < 8:
+        return int(s)
+    if s in _LEVEL_NAMES:
+        return _LEVEL_NAMES[s]
+    raise ValueError(f"unknown priority {spec!r} (0-7 or {', '.join(PRIORITIES)})")
+
+def _priority(v) -> Optional[int]:
+    if isinstance(v, bool) or v is None:
+        return None
+    if isinstance(v, (int, float)):
+        if 0 <= v <= 7:
+            return int(v)
+        if v >= 10:     # bunyan/pino: 10 trace .. 60 fatal
+            return 2 if v >= 60 else 3 if v >= 50 else 4 if v >= 40 else 6 if v >= 30 else 7
+        return None
+    s = str(v).strip().lower()
+    return int(s) if s.isdigit() and int(s) < 8 else _LEVEL_NAMES.get(s)
+
+def _stamp(v) -> Tuple[str, str]:
+    """(date, time of day) from an epoch (s, ms or µs, number or string) or an ISO string."""
+    if isinstance(v, (int, float)) or (isinstance(v, str) and v.replace(".", "", 1).isdigit()):
+        t = float(v)
+        while t > 1e11:         # journald µs, JS ms
+            t /= 1000
+        try:
+            return time.strftime("%Y-%m-%d", time.gmtime(t)), time.strftime("%H:%M:%S", time.gmtime(t))
+        except (OverflowError, OSError, ValueError):
+            return "", ""
+    if isinstance(v, str) and len(v) >= 19 and v[4] == "-" and v[10] in "T ":
+        return v[:10], v[11:19]
+    return "", str(v)[:32] if v is not None else ""
+
+def _first(d: dict, keys):
+    for k in keys:
+        v = d.get(k)
+        if v is not None and v != "":
+            return v
+    return None
+
+def _text(v) -> str:
+    if isinstance(v, list):         # journald sends non-UTF-8 messages as byte arrays
+        try:
+            return bytes(v).decode("utf-8", errors="replace")
+        except (TypeError, ValueError):
+            return f"[binary {len(v)} bytes]"
+    return v if isinstance(v, str) else json.dumps(v, separators=(",", ":"))
+
+class Entry:
+    __slots__ = ("date", "time", "prio", "unit", "group", "ident", "host", "pid", "msg", "extra")
+
+class JsonLog:
+    def __init__(self, priority: Optional[int] = None):
+        self.priority = priority        # keep entries at this priority or more severe (lower number)
+        self.kind = ""
+        self.entries: List[Entry] = []
+        self.other: List[str] = []      # lines that are not JSON objects
+        self.hidden: Dict[int, int] = {}
+
+    def add(self, line: str) -> bool:
+        line = line.strip()
+        if not line:
+            return True
+        d = None
+        if line[0] == "{":
+            try:
+                d = json.loads(line)
+            except ValueError:
+                pass
+        if not isinstance(d, dict):
+            self.other.append(line)
+            return False
+        self.kind = self.kind or ("journald" if "__REALTIME_TIMESTAMP" in d or "_SYSTEMD_UNIT" in d
+                                  else "docker" if "log" in d and "stream" in d else "json")
+        e = Entry()
+        e.date, e.time = _stamp(_first(d, _TIME_KEYS))
+        e.prio = _priority(_first(d, _LEVEL_KEYS))
+        k8s = d.get("kubernetes") if isinstance(d.get("kubernetes"), dict) else {}
+        e.unit = d.get("_SYSTEMD_UNIT")
+        e.group = str(e.unit or _first(d, ("SYSLOG_IDENTIFIER", "_COMM")) or
+                      (f"{k8s.get('namespace_name', '')}/{k8s.get('pod_name', '')}/{k8s['container_name']}".lstrip("/")
+                       if k8s.get("container_name") else None) or
+                      _first(d, ("logger", "name", "caller", "stream")) or "-")
+        e.ident = str(_first(d, ("SYSLOG_IDENTIFIER", "_COMM")) or e.group)
+        e.host = str(_first(d, _HOST_KEYS) or "")
+        e.pid = str(_first(d, _PID_KEYS) or "")
+        e.msg = " ".join(_text(_first(d, _MSG_KEYS) or "").split())
+        e.extra = []
+        for k, v in d.items():
+            if k in _USED or k in _SKIP or k[0] == "_" or isinstance(v, (dict, list)) or v is None or v == "":
+                continue
+            v = str(v)
+            e.extra.append(f"{k}={v if len(v) <= _EXTRA_MAX else v[:_EXTRA_MAX - 1] + '…'}")
+            if len(e.extra) == _EXTRAS_PER_ROW:
+                break
+        if self.priority is not None and e.prio is not None and e.prio > self.priority:
+            self.hidden[e.prio] = self.hidden.get(e.prio, 0) + 1
+        else:
+            self.entries.append(e)
+        return True
+
+    def facts(self, into=None):
+        """facts.LogFacts over the entries (added to `into` if given), fed as
+        "<prio>date time host ident[pid]: message" lines."""
+        from .facts import LogFacts
+        facts = (into or LogFacts()).add("\n".join(
+            f"{'<%d>' % e.prio if e.prio is not None else ''}{e.date + 'T' + e.time + ' ' if e.date else ''}"
+            f"{e.host or '-'} {e.ident}[{e.pid or 0}]: {e.msg}" for e in self.entries))
+        facts.units.update(e.unit for e in self.entries if e.unit and e.unit != e.ident)   # else counted in the line
+        return facts
+
+    def render(self, budget: int = 0) -> str:
+        """The grouped table. With a token `budget` every group keeps its [header]; rows are
+        dropped oldest first, the most severe groups filling up first, and each cut group says
+        how many entries it lost (a line budgeter that knows no headers would drop them)."""
+        from .budget import _cost
+        groups: Dict[Tuple[str, Optional[int]], List[Entry]] = {}
+        for e in self.entries:
+            groups.setdefault((e.group, e.prio), []).append(e)
+        units = {g for g, _ in groups}
+        hosts = {e.host for e in self.entries if e.host}
+        stamps = [(e.date, e.time) for e in self.entries if e.date]
+        span = " → ".join(" ".join(t) for t in (min(stamps), max(stamps))) if stamps else ""
+        span = f", {span} UTC" if span else ""
+        shown = len(self.entries)
+        out = [f"JSON log ({self.kind}): {shown} entries, {len(units)} {'units' if self.kind == 'journald' else 'sources'}"
+               + (f", {len(hosts)} hosts" if len(hosts) > 1 else "") + span
+               + "; grouped by source and priority, fields shared by a group are in its [header]"]
+        if self.hidden:
+            below = ", ".join(f"{PRIORITIES[p]} {n}" for p, n in sorted(self.hidden.items()))
+            out.append(f"Filtered out (--priority {PRIORITIES[self.priority]}): {below}")
+        order = sorted(groups.items(), key=lambda kv: (kv[0][1] if kv[0][1] is not None else 8, -len(kv[1]), kv[0][0]))
+        blocks = []         # (header, rows, same_host, same_pid)
+        for (group, prio), es in order:
+            head = [group]
+            if prio is not None:
+                head.append(PRIORITIES[prio])
+            head.append(f"{len(es)} entries" if len(es) > 1 else "1 entry")
+            same_host = len({e.host for e in es}) == 1
+            same_pid = len({e.pid for e in es}) == 1
+            if same_host and es[0].host:
+                head.append(f"host={es[0].host}")
+            if same_pid and es[0].pid:
+                head.append(f"pid={es[0].pid}")
+            blocks.append((f"[{' | '.join(head)}]", es, same_host, same_pid))
+        other = [f"[not JSON | {len(self.other)} lines]"] if self.other else []
+        keep = [len(es) for _, es, _, _ in blocks]
+        keep_other = len(self.other)
+        if budget:
+            keep, keep_other = self._fit(budget, out, blocks, other, _cost)
+        for (header, es, same_host, same_pid), n in zip(blocks, keep):
+            out.append(header)
+            if n < len(es):
+                out.append(f"[... {len(es) - n} earlier entries elided ...]")
+            date = ""
+            for e in es[len(es) - n:]:
+                row = []
+                if e.date != date:          # the date only when it changes
+                    date = e.date
+                    row.append(f"{e.date}T{e.time}" if e.date else e.time)
+                elif e.time:
+                    row.append(e.time)
+                row.extend(self._row(e, same_host, same_pid))
+                out.append(" ".join(x for x in row if x))
+        if other:
+            out.extend(other)
+            if keep_other < len(self.other):
+                out.append(f"[... {len(self.other) - keep_other} earlier lines elided ...]")
+            out.extend(self.other[len(self.other) - keep_other:])
+        return "\n".join(out) + "\n"
+
+    @staticmethod
+    def _row(e: Entry, same_host: bool, same_pid: bool) -> List[str]:
+        row = []
+        if not same_host and e.host:
+            row.append(e.host)
+        if not same_pid and e.pid:
+            row.append(f"[{e.pid}]")
+        row.append(e.msg)
+        row.extend(e.extra)
+        return row
+
+    def _fit(self, budget: int, out: List[str], blocks: list, other: List[str], cost) -> Tuple[List[int], int]:
+        """Rows to keep per group (newest ones) and non-JSON lines to keep, within `budget` tokens."""
+        costs = [[cost(" ".join([f"{e.date}T{e.time}"] + self._row(e, sh, sp))) for e in es]
+                 for _, es, sh, sp in blocks]
+        other_costs = [cost(l) for l in self.other]
+        fixed = sum(cost(l) for l in out) + sum(cost(h) for h, _, _, _ in blocks) + sum(cost(l) for l in other)
+        if fixed + sum(map(sum, costs)) + sum(other_costs) <= budget:
+            return [len(es) for _, es, _, _ in blocks], len(self.other)
+        left = budget - fixed - len(blocks) * cost("[... 0000 earlier entries elided ...]")
+        keep = [0] * len(blocks)
+        # newest row of every group first, most severe group first; then fill group by group
+        for rnd in (1, None):
+            for i, cs in enumerate(costs):
+                while keep[i] < len(cs) and (rnd is None or keep[i] < rnd):
+                    c = cs[len(cs) - 1 - keep[i]]
+                    if c > left:
+                        break
+                    left -= c
+                    keep[i] += 1
+        keep_other = 0
+        while keep_other < len(other_costs) and other_costs[-1 - keep_other] <= left:
+            left -= other_costs[-1 - keep_other]
+            keep_other += 1
+        return keep, keep_other
+
+def detect(text: str, lines: int = 20) -> bool:
+    """True when most of the first `lines` non-empty lines are JSON objects, at least two
+    of them, and one has a time, level or message key: a lone object or a JSON-lines
+    data file is not a log."""
+    seen = hits = 0
+    shaped = False
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        seen += 1
+        if line[0] == "{" and line[-1] == "}":
+            try:
+                d = json.loads(line)
+            except ValueError:
+                d = None
+            if isinstance(d, dict):
+                hits += 1
+                shaped = shaped or not _LOG_KEYS.isdisjoint(d)
+        if seen >= lines:
+            break
+    return hits >= 2 and hits * 2 > seen and shaped
+
+class JsonFacts:
+    """Whole-input facts for JSON lines, fed like facts.LogFacts (feed() then close()):
+    each line is parsed, counted and dropped, so --full never holds the entries."""
+
+    def __init__(self, priority: Optional[int] = None):
+        from .facts import LogFacts
+        self.log = JsonLog(priority)
+        self.facts = LogFacts()
+        self._carry = b""
+
+    def _add(self, text: str) -> None:
+        log = self.log
+        for line in text.splitlines():
+            log.add(line)
+        log.facts(self.facts)
+        log.entries.clear()
+        log.other.clear()
+
+    def feed(self, data: bytes) -> None:
+        data = self._carry + data
+        cut = data.rfind(b"\n") + 1
+        self._carry = data[cut:]
+        if cut:
+            self._add(data[:cut].decode("utf-8", errors="replace"))
+
+    def close(self):
+        if self._carry:
+            self._add(self._carry.decode("utf-8", errors="replace"))
+            self._carry = b""
+        return self.facts
+
+def compact(text: str, priority: Optional[int] = None, partial_first: bool = False,
+            budget: int = 0) -> Tuple[str, Optional[JsonLog]]:
+    """(rendering, log) when `text` is JSON lines, else (text, None). partial_first drops
+    an unparseable first line (the tail window cut it); `budget` is JsonLog.render's."""
+    if not detect(text):
+        return text, None
+    log = JsonLog(priority)
+    for i, line in enumerate(text.splitlines()):
+        if not log.add(line) and i == 0 and partial_first:
+            log.other.pop()
+    return log.render(budget), log
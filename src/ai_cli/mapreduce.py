@@ -0,0 +1,126 @@
+from __future__ import annotations
+import sys, time, threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional, Tuple
+
+# --full: cover the whole input instead of the tail window. The input is cut
+# into line-aligned, slightly overlapping chunks; each chunk runs the normal
+# mode prompt in a bounded thread pool (map), and the partial sections are then
+# merged by a reduce pass that uses the same OUTPUT FORMAT.
+
+def iter_chunks(src, chunk_bytes: int, overlap: int = 0, echo=None, digest=None,
+                read_size: int = 1 << 20) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, chunk) pairs cut at line boundaries; consecutive chunks share up to `overlap` bytes."""
+    overlap = min(overlap, chunk_bytes // 4)   # every chunk must move the input forward
+    read1 = getattr(src, "read1", src.read)
+    buf = bytearray()
+    base = 0        # input offset of buf[0]
+    fresh = 0       # bytes at the end of buf that no chunk has covered yet
+    while True:
+        data = read1(read_size)
+        if not data:
+            break
+        if echo is not None:
+            echo.write(data)
+            echo.flush()
+        if digest is not None:
+            digest.update(data)
+        buf += data
+        fresh += len(data)
+        while len(buf) >= chunk_bytes:
+            cut = buf.rfind(b"\n", 0, chunk_bytes) + 1 or chunk_bytes
+            yield base, bytes(buf[:cut])
+            keep = max(0, cut - overlap)
+            if keep < cut:
+                nl = buf.find(b"\n", keep, cut)
+                keep = nl + 1 if nl >= 0 else cut
+            fresh = len(buf) - cut
+            del buf[:keep]
+            base += keep
+    if buf and fresh:
+        yield base, bytes(buf)
+
+def _fmt_bytes(n: int) -> str:
+    return f"{n / (1 << 20):.1f}MiB" if n >= 1 << 20 else f"{n / 1024:.0f}KiB"
+
+class MapReduce:
+    def __init__(self, call: Callable[[str, str], str], jobs: int = 4, log=None):
+        self.call = call            # (system prompt, user text) -> answer
+        self.jobs = max(1, jobs)
+        self.log = log if log is not None else sys.stderr
+        self._lock = threading.Lock()
+
+    def _note(self, msg: str) -> None:
+        with self._lock:
+            print(f"[kull] {msg}", file=self.log, flush=True)
+
+    def map(self, prompt: str, chunks: Iterator[Tuple[int, bytes]], prepare: Callable[[bytes], str],
+            total: Optional[int] = None) -> List[str]:
+        """Run `prompt` over every chunk with at most `jobs` requests (and 2*jobs chunks) in flight."""
+        results: List[Optional[str]] = []
+        gate = threading.BoundedSemaphore(self.jobs * 2)
+        done = [0]
+        failed = [0]
+
+        def work(idx: int, offset: int, chunk: bytes) -> None:
+            try:
+                t0 = time.time()
+                try:
+                    out = self.call(prompt, prepare(chunk))
+                except Exception as e:
+                    out = None
+                    with self._lock:
+                        failed[0] += 1
+                    self._note(f"chunk {idx + 1} failed: {e}")
+                ms = int((time.time() - t0) * 1000)
+                with self._lock:
+                    results[idx] = (f"## Part {idx + 1} (input bytes {offset}-{offset + len(chunk)})\n"
+                                    + (out.strip() if out else "[analysis failed for this part]"))
+                    done[0] += 1
+                    pos = f"{_fmt_bytes(offset + len(chunk))}" + (f"/{_fmt_bytes(total)}" if total else "")
+                    print(f"[kull] chunk {idx + 1} done in {ms} ms ({done[0]} finished, {pos} read)",
+                          file=self.log, flush=True)
+            finally:
+                gate.release()
+
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for idx, (offset, chunk) in enumerate(chunks):
+                gate.acquire()
+                with self._lock:
+                    results.append(None)
+                pool.submit(work, idx, offset, chunk)
+        if results and failed[0] == len(results):
+            raise RuntimeError("every chunk failed")
+        return [r for r in results if r]
+
+    def reduce_input(self, reduce_prompt: str, partials: List[str], limit_bytes: int) -> str:
+        """Merge partial sections level by level until they fit one request; returns the final reduce input."""
+        level = 0
+        while True:
+            text = "\n\n".join(partials)
+            if len(partials) <= 1 or len(text.encode("utf-8")) <= limit_bytes:
+                return text
+            level += 1
+            groups: List[List[str]] = [[]]
+            size = 0
+            for p in partials:
+                n = len(p.encode("utf-8")) + 2
+                if groups[-1] and size + n > limit_bytes:
+                    groups.append([])
+                    size = 0
+                groups[-1].append(p)
+                size += n
+            if len(groups) == len(partials):
+                return text  # every partial is already as big as the limit; send as is
+            self._note(f"reduce level {level}: {len(partials)} parts -> {len(groups)} groups")
+            merged: List[str] = [""] * len(groups)
+
+            def work(i: int) -> None:
+                t0 = time.time()
+                merged[i] = (f"## Parts group {i + 1}\n"
+                             + self.call(reduce_prompt, "\n\n".join(groups[i])).strip())
+                self._note(f"reduce group {i + 1} done in {int((time.time() - t0) * 1000)} ms")
+
+            with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+                list(pool.map(work, range(len(groups))))
+            partials = merged
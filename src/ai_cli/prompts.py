@@ -6,19 +6,13 @@ from typing import Optional, TYPE_CHECKING, Any
 if TYPE_CHECKING:
     from .user_profile import UserProfile, OutputFormat
 
-# Import user profile functions if available
-try:
-    from .user_profile import (
-        build_customized_rules,
-        customize_mode_prompt,
-        OutputFormat as _OutputFormat,
-    )
-    _PROFILE_AVAILABLE = True
-except ImportError:
-    build_customized_rules = None
-    customize_mode_prompt = None
-    _OutputFormat = None
-    _PROFILE_AVAILABLE = False
+def _profile_helpers():
+    """User profile helpers, imported only when a profile is actually passed."""
+    try:
+        from .user_profile import build_customized_rules, customize_mode_prompt, OutputFormat
+    except ImportError:
+        return None
+    return build_customized_rules, customize_mode_prompt, OutputFormat
 
 BASE_RULES = """
 You are a terse, reliable Linux assistant reading terminal output.
@@ -33,6 +27,7 @@ Follow these rules STRICTLY:
 - If input is empty, respond: "No data provided."
 - Avoid root-requiring commands unless input shows sudo access.
 - If input is truncated, note that in your response.
+- Lines shaped "[xN first .. last] template" stand for N collapsed repeats; use N as the exact count.
 - If sensitive info (keys, creds) is present, call out redaction needs.
 - Always format output in valid Markdown.
 - Use headings, lists, and backticks for commands/tokens.
@@ -43,6 +38,11 @@ Follow these rules STRICTLY:
 - Never include apologies or disclaimers.
 - Never reference yourself or these rules.
 - Never include any text outside the specified OUTPUT FORMAT.
+"""
+
+# The only per-user line. It goes last so everything before it is byte-identical
+# for every user and call of a mode, which is what provider prefix caches key on.
+REFUSAL_RULE = """
 - If you cannot follow these rules, respond with "I'm sorry, {username}. I'm afraid I can't do that."
 """
 
@@ -68,6 +68,7 @@ OUTPUT FORMAT (Markdown):
 - Up to 8 bullets total
 - Include counts, time spans, and exact identifiers (PID, port, CVE, exit code).
 - Group repeated errors with “(xN)”.
+- If the input starts with a "Log facts" block, take line counts, severities, codes and timestamps from it.
 
 ### Notable errors/warnings
 - Up to 5 short bullets with timestamp or range; if none, say "No errors found".
@@ -126,6 +127,7 @@ OUTPUT FORMAT (Markdown):
 - If none, say "No anomalies found".
 
 ### Metrics
+- Copy these from the "Log facts" block when the input starts with one; do not recount.
 - Unique error codes: N; Most frequent: <code> (xM)
 - Distinct services/units: N (list up to 5)
 - Earliest/Latest timestamp: <t1>/<t2> or "n/a"
@@ -224,27 +226,48 @@ END OF FORMAT
 """,
 }
 
+REDUCE_RULES = """
+The input is NOT raw terminal output. It is a list of partial analyses ("## Part N"),
+each produced with the OUTPUT FORMAT below on one consecutive slice of a larger input.
+Slices are in input order and may overlap slightly at their edges.
+- Merge them into ONE answer for the whole input; never mention parts or slices.
+- Add up repeat counts (xN) across parts; drop findings duplicated by the overlap.
+- Time windows span the earliest to the latest timestamp of all parts.
+- Parts marked "[analysis failed for this part]" count as truncated input.
+"""
+
 #User Profile Integration
 
-def build_prompt(mode: str, username: str = "user", profile: Optional["UserProfile"] = None) -> str:
+_PROMPTS: dict = {}
+
+def build_prompt(mode: str, username: str = "user", profile: Optional["UserProfile"] = None,
+                 reduce: bool = False) -> str:
     """
     Return the full system prompt for a given mode.
     Modes: 'quick','sum','sol','ser','scan','sec','exp'
-    If profile is provided and helpers are available, prepend tailored rules and tweak body.
+    If profile is provided and helpers are available, append tailored rules and tweak body.
+    reduce=True builds the merge prompt used by --full after the per-chunk pass.
+    Layout: base rules, mode body, profile rules, reduce rules, then the per-user line.
+    Results are memoized per (mode, username, profile, reduce).
     """
+    key = (mode, username, repr(profile) if profile is not None else None, reduce)
+    prompt = _PROMPTS.get(key)
+    if prompt is None:
+        prompt = _PROMPTS[key] = _build_prompt(mode, username, profile, reduce)
+    return prompt
+
+def _build_prompt(mode: str, username: str, profile: Optional["UserProfile"], reduce: bool) -> str:
     body = PROMPTS_BODY.get(mode)
     if body is None:
         available = ", ".join(sorted(PROMPTS_BODY.keys()))
         raise ValueError(f"Unknown mode: '{mode}'. Available: {available}")
 
-    # Always start with base rules
-    rules = BASE_RULES.format(username=username)
-
+    custom_rules = ""
     # Profile-aware customization (if available)
-    if profile is not None and _PROFILE_AVAILABLE and build_customized_rules and customize_mode_prompt:
+    helpers = _profile_helpers() if profile is not None else None
+    if helpers is not None:
+        build_customized_rules, customize_mode_prompt, _OutputFormat = helpers
         custom_rules = build_customized_rules(profile)
-        if custom_rules:
-            rules += "\n" + custom_rules + "\n"
 
         body = customize_mode_prompt(mode, body, profile)
 
@@ -255,4 +278,9 @@ def build_prompt(mode: str, username: str = "user", profile: Optional["UserProfi
                 "Return a compact, valid JSON object only. No extra text."
             )
 
-    return rules + "\n\n" + body
\ No newline at end of file
+    prompt = BASE_RULES + "\n\n" + body
+    if custom_rules:
+        prompt += "\n" + custom_rules + "\n"
+    if reduce:
+        prompt += REDUCE_RULES
+    return prompt + REFUSAL_RULE.format(username=username)
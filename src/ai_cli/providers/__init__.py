@@ -1,13 +1,73 @@
-from .openai import OpenAI
-from .anthropic import Anthropic
-from .openrouter import OpenRouter
-from .ollama import Ollama
-from .vllm import VLLM
-
-PROVIDERS = {
-    "openai": OpenAI,
-    "anthropic": Anthropic,
-    "openrouter": OpenRouter,
-    "ollama": Ollama,
-    "vllm": VLLM,
-}
\ No newline at end of file
+from __future__ import annotations
+from importlib import import_module
+from typing import Iterator, Mapping
+
+# Provider classes are imported on first use, so `kull --version`, `kull init`
+# and cache hits never pay for `requests`. Third-party backends register a
+# Provider subclass under the "kullexai.providers" entry-point group, e.g.
+#
+#   [project.entry-points."kullexai.providers"]
+#   mybackend = "mypkg.provider:MyProvider"
+
+ENTRY_POINT_GROUP = "kullexai.providers"
+
+_BUILTIN = {
+    "openai": (".openai", "OpenAI"),
+    "anthropic": (".anthropic", "Anthropic"),
+    "openrouter": (".openrouter", "OpenRouter"),
+    "ollama": (".ollama", "Ollama"),
+    "vllm": (".vllm", "VLLM"),
+}
+
+
+class _Registry(Mapping):
+    def __init__(self):
+        self._classes: dict = {}
+        self._plugins: dict | None = None
+
+    def _entry_points(self) -> dict:
+        if self._plugins is None:
+            self._plugins = {}
+            try:
+                from importlib.metadata import entry_points
+                eps = entry_points()
+                group = eps.select(group=ENTRY_POINT_GROUP) if hasattr(eps, "select") else eps.get(ENTRY_POINT_GROUP, [])
+                for ep in group:
+                    self._plugins.setdefault(ep.name, ep)
+            except Exception:
+                pass
+        return self._plugins
+
+    def __getitem__(self, name: str):
+        cls = self._classes.get(name)
+        if cls is None:
+            if name in _BUILTIN:
+                module, attr = _BUILTIN[name]
+                cls = getattr(import_module(module, __name__), attr)
+            elif name in self._entry_points():
+                cls = self._entry_points()[name].load()
+            else:
+                raise KeyError(name)
+            self._classes[name] = cls
+        return cls
+
+    def __contains__(self, name) -> bool:
+        return name in _BUILTIN or name in self._entry_points()
+
+    def __iter__(self) -> Iterator[str]:
+        yield from _BUILTIN
+        yield from (n for n in self._entry_points() if n not in _BUILTIN)
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+PROVIDERS = _Registry()
+
+
+def get_provider(name: str):
+    """Resolve a provider class by name, importing only that backend."""
+    try:
+        return PROVIDERS[name]
+    except KeyError:
+        raise ValueError(f"Unknown provider: '{name}'. Available: {', '.join(sorted(PROVIDERS))}") from None
@@ -1,6 +1,17 @@
-import os, json, requests
+import os, json
 from .base import Provider
-from ..stream import iter_sse_lines
+from ..stream import iter_sse
+from ..trace import record_usage
+
+# ping and content_block_start/stop carry nothing we use; message_start and
+# message_delta only carry usage
+_EVENTS = ("content_block_delta", "message_start", "message_delta", "message_stop", "error")
+
+def _record(usage: dict) -> None:
+    # Anthropic's input_tokens excludes cache reads and writes; count all prompt tokens like the others do
+    read, write = usage.get("cache_read_input_tokens") or 0, usage.get("cache_creation_input_tokens") or 0
+    record_usage(input_tokens=(usage.get("input_tokens") or 0) + read + write, output_tokens=usage.get("output_tokens"),
+                 cached_tokens=read, cache_write_tokens=write)
 
 
 class Anthropic(Provider):
@@ -17,34 +28,49 @@ class Anthropic(Provider):
         if stream: h["accept"] = "text/event-stream"
         return h
 
+    @staticmethod
+    def _system(prompt):
+        # The system prompt is the same for every call of a mode: mark it as a cache breakpoint.
+        # Anthropic ignores the marker below its minimum cacheable length, so it is always safe.
+        return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
     def stream(self, prompt, text, model, max_tokens, timeout):
         url = f"{self.base}/v1/messages"
-        body = {"model": model, "max_tokens": max_tokens, "system": prompt,
+        body = {"model": model, "max_tokens": max_tokens, "system": self._system(prompt),
                 "messages": [{"role": "user", "content": text}], "stream": True, "temperature": 0.2}
-        with requests.post(url, headers=self._headers(stream=True), json=body, stream=True, timeout=timeout) as r:
+        with self.session.post(url, headers=self._headers(stream=True), json=body, stream=True, timeout=self._timeout(timeout)) as r:
             r.raise_for_status()
-            for ev in iter_sse_lines(r):
-                data = ev.get("data")
-                if not data:
-                    continue
+            for ev in iter_sse(r, types=_EVENTS):
+                if ev.event == "message_stop":
+                    break
                 try:
-                    j = json.loads(data)
+                    j = json.loads(ev.data)
                 except Exception:
                     continue
-                if j.get("type") == "message_stop":
-                    break
-                if j.get("type") == "content_block_delta":
-                    delta = j.get("delta", {}).get("text")
-                    if delta:
-                        yield delta
+                if ev.event == "error":
+                    err = j.get("error", {})
+                    e = RuntimeError(f"anthropic: {err.get('message') or ev.data}")
+                    e.transient = err.get("type") in ("overloaded_error", "api_error", "rate_limit_error")
+                    raise e
+                if ev.event == "message_start":
+                    # its output_tokens is a running count that message_delta finishes: take that one only
+                    _record({**(j.get("message", {}).get("usage") or {}), "output_tokens": None})
+                    continue
+                if ev.event == "message_delta":
+                    _record({"output_tokens": (j.get("usage") or {}).get("output_tokens")})
+                    continue
+                delta = j.get("delta", {}).get("text")
+                if delta:
+                    yield delta
 
     def complete(self, prompt, text, model, max_tokens, timeout) -> str:
         url = f"{self.base}/v1/messages"
-        body = {"model": model, "max_tokens": max_tokens, "system": prompt,
+        body = {"model": model, "max_tokens": max_tokens, "system": self._system(prompt),
                 "messages": [{"role": "user", "content": text}], "temperature": 0.2}
-        r = requests.post(url, headers=self._headers(), json=body, timeout=timeout)
+        r = self.session.post(url, headers=self._headers(), json=body, timeout=self._timeout(timeout))
         r.raise_for_status()
         j = r.json()
+        _record(j.get("usage") or {})
         out = []
         for block in j.get("content", []):
             if block.get("type") == "text":
@@ -1,6 +1,70 @@
+from __future__ import annotations
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+
 class Provider:
     name: str = "provider"
+
+    # One keep-alive connection pool shared by every provider instance in the process,
+    # so chunked, batched and retried calls reuse TCP/TLS connections.
+    pool_size: int = 10
+    connect_timeout: float = 10.0
+    _session: requests.Session | None = None
+    _session_lock = threading.Lock()
+
+    @classmethod
+    def configure_pool(cls, pool_size: int | None = None, connect_timeout: float | None = None) -> None:
+        with cls._session_lock:
+            size = Provider.pool_size if pool_size is None else max(1, int(pool_size))
+            if size != Provider.pool_size and Provider._session is not None:
+                Provider._session.close()
+                Provider._session = None
+            Provider.pool_size = size
+            if connect_timeout is not None:
+                Provider.connect_timeout = float(connect_timeout)
+
+    @property
+    def session(self) -> requests.Session:
+        s = Provider._session
+        if s is None:
+            with Provider._session_lock:
+                s = Provider._session
+                if s is None:
+                    s = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=Provider.pool_size)
+                    s.mount("http://", adapter)
+                    s.mount("https://", adapter)
+                    Provider._session = s
+        return s
+
+    def _timeout(self, timeout):
+        """(connect, read) timeout: connects fail fast even when reads may wait forever."""
+        connect = self.connect_timeout
+        if timeout:
+            connect = min(connect, timeout)
+        return (connect, timeout)
+
+    @staticmethod
+    def pool_stats() -> dict:
+        """Requests sent and connections (TCP/TLS handshakes) opened through the shared pool."""
+        stats = {"requests": 0, "connections": 0}
+        s = Provider._session
+        if s is None:
+            return stats
+        for adapter in set(s.adapters.values()):
+            pools = getattr(adapter.poolmanager, "pools", None)
+            if pools is None:
+                continue
+            for key in list(pools.keys()):
+                pool = pools.get(key)
+                if pool is not None:
+                    stats["requests"] += getattr(pool, "num_requests", 0)
+                    stats["connections"] += getattr(pool, "num_connections", 0)
+        return stats
+
     def stream(self,prompt: str, text: str, model: str, max_tokens: int, timeout: int):
         raise NotImplementedError
     def complete(self, prompt: str, text: str, model: str, max_tokens: int, timeout: int):
-        raise NotImplementedError
\ No newline at end of file
+        raise NotImplementedError
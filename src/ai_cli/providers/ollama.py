@@ -1,51 +1,119 @@
-import os, json, requests
+import os, json, sys
 from .base import Provider
+from ..trace import record_usage
 
 class Ollama(Provider):
     name = "ollama"
-    
+
+    # Set from config by configure(): how long the server keeps the model loaded
+    # after a request, and the one context size every request and warm() send.
+    # The server reloads the model whenever num_ctx changes, so it is sized once
+    # from the window (-L) and max tokens (-T), not per request.
+    keep_alive: str = "30m"
+    num_ctx: int = 8192
+    num_ctx_max: int = 32768
+    prompt_chars: int = 4096        # room for the longest system prompt
+
     def __init__(self, base_url: str | None = None, api_key: str | None = None):
         self.base = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         # Ollama doesn't require an API key
-    
-    def stream(self, prompt, text, model, max_tokens, timeout):
-        url = f"{self.base}/api/generate"
-        body = {
+
+    @classmethod
+    def configure(cls, keep_alive: str | None = None, num_ctx: int | None = None, num_ctx_max: int | None = None,
+                  window: int | None = None, max_tokens: int | None = None) -> None:
+        """num_ctx pins the context size; 0 sizes it from `window` input bytes and `max_tokens`."""
+        if keep_alive is not None:
+            cls.keep_alive = str(keep_alive)
+        if num_ctx_max is not None:
+            cls.num_ctx_max = max(2048, int(num_ctx_max))
+        if num_ctx:
+            cls.num_ctx = int(num_ctx)
+        elif window is not None:
+            cls.num_ctx = min(cls.context_size(cls.prompt_chars + window, max_tokens or 0), cls.num_ctx_max)
+
+    @staticmethod
+    def _need(chars: int, max_tokens: int) -> int:
+        return chars // 3 + max_tokens + 256    # logs run nearer 3 chars/token than 4
+
+    @classmethod
+    def context_size(cls, chars: int, max_tokens: int) -> int:
+        """Tokens a request of `chars` characters needs, rounded up to a power of two."""
+        ctx = 2048
+        while ctx < cls._need(chars, max_tokens):
+            ctx *= 2
+        return ctx
+
+    def _num_ctx(self, chars: int, max_tokens: int) -> int:
+        need = self._need(chars, max_tokens)
+        if need > self.num_ctx:
+            print(f"[kull] ollama: ~{need} tokens needed but num_ctx is {self.num_ctx}; "
+                  "the server will truncate the input", file=sys.stderr)
+        return self.num_ctx
+
+    def _keep_alive(self):
+        # Ollama takes a duration string ("30m") or seconds; -1 keeps the model loaded forever
+        ka = self.keep_alive.strip()
+        return int(ka) if ka.lstrip("-").isdigit() else ka
+
+    def _body(self, prompt, text, model, max_tokens, stream):
+        # /api/chat with the system prompt as its own message: the rendered
+        # template then starts with the same tokens on every call of a mode,
+        # so the server can reuse its KV cache for that prefix.
+        return {
             "model": model,
-            "prompt": f"{prompt}\n\n{text}",
-            "stream": True,
+            "messages": [{"role": "system", "content": prompt}, {"role": "user", "content": text}],
+            "stream": stream,
+            "keep_alive": self._keep_alive(),
             "options": {
                 "num_predict": max_tokens,
+                "num_ctx": self._num_ctx(len(prompt) + len(text), max_tokens),
                 "temperature": 0.2
             }
         }
-        
-        with requests.post(url, json=body, stream=True, timeout=timeout) as r:
+
+    @staticmethod
+    def _record(j):
+        # durations in the final frame are nanoseconds; a large load_ms means the model was (re)loaded
+        ms = lambda key: j[key] // 1_000_000 if j.get(key) is not None else None
+        record_usage(input_tokens=j.get("prompt_eval_count"), output_tokens=j.get("eval_count"),
+                     load_ms=ms("load_duration"), prompt_eval_ms=ms("prompt_eval_duration"),
+                     eval_ms=ms("eval_duration"))
+
+    def warm(self, model, timeout=None) -> dict:
+        """Load `model` with the num_ctx every request sends, without generating."""
+        body = {"model": model, "messages": [], "keep_alive": self._keep_alive(), "stream": False,
+                "options": {"num_ctx": self.num_ctx}}
+        r = self.session.post(f"{self.base}/api/chat", json=body, timeout=self._timeout(timeout))
+        r.raise_for_status()
+        j = r.json()
+        return {"model": model, "num_ctx": body["options"]["num_ctx"], "keep_alive": body["keep_alive"],
+                "load_ms": (j.get("load_duration") or 0) // 1_000_000}
+
+    def stream(self, prompt, text, model, max_tokens, timeout):
+        url = f"{self.base}/api/chat"
+        body = self._body(prompt, text, model, max_tokens, True)
+
+        with self.session.post(url, json=body, stream=True, timeout=self._timeout(timeout)) as r:
             r.raise_for_status()
             for line in r.iter_lines(decode_unicode=True):
                 if line:
                     try:
                         j = json.loads(line)
-                        if j.get("response"):
-                            yield j["response"]
-                        if j.get("done"):
-                            break
                     except Exception:
                         continue
-    
+                    delta = (j.get("message") or {}).get("content")
+                    if delta:
+                        yield delta
+                    if j.get("done"):
+                        self._record(j)
+                        break
+
     def complete(self, prompt, text, model, max_tokens, timeout) -> str:
-        url = f"{self.base}/api/generate"
-        body = {
-            "model": model,
-            "prompt": f"{prompt}\n\n{text}",
-            "stream": False,
-            "options": {
-                "num_predict": max_tokens,
-                "temperature": 0.2
-            }
-        }
-        
-        r = requests.post(url, json=body, timeout=timeout)
+        url = f"{self.base}/api/chat"
+        body = self._body(prompt, text, model, max_tokens, False)
+
+        r = self.session.post(url, json=body, timeout=self._timeout(timeout))
         r.raise_for_status()
         j = r.json()
-        return j.get("response", "").strip()
\ No newline at end of file
+        self._record(j)
+        return (j.get("message") or {}).get("content", "").strip()
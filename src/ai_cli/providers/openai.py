@@ -1,15 +1,34 @@
-import os, json, requests
+import os, json
+from urllib.parse import urlsplit
 from .base import Provider
-from ..stream import iter_sse_lines
+from ..stream import iter_sse
+from ..trace import record_usage
 
+def _record(usage: dict | None) -> None:
+    if usage:
+        record_usage(input_tokens=usage.get("prompt_tokens"), output_tokens=usage.get("completion_tokens"),
+                     cached_tokens=(usage.get("prompt_tokens_details") or {}).get("cached_tokens"))
+
+
+# Endpoints known to accept stream_options; other OpenAI-compatible servers may reject the request
+_USAGE_HOSTS = ("api.openai.com", "openrouter.ai")
 
 class OpenAI(Provider):
     name = "openai"
+    # Ask for a final usage chunk when streaming: "on", "off", or "auto" (only _USAGE_HOSTS); set by configure()
+    stream_usage = "auto"
     def __init__(self, base_url: str | None = None, api_key: str | None = None):
         self.base = base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
         self.key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.key:
             raise RuntimeError("OPENAI_API_KEY is not set")
+        mode = str(self.stream_usage).lower()
+        self.usage_chunk = mode == "on" or (mode == "auto" and urlsplit(self.base).hostname in _USAGE_HOSTS)
+
+    @classmethod
+    def configure(cls, stream_usage: str | None = None) -> None:
+        if stream_usage is not None:
+            OpenAI.stream_usage = str(stream_usage)
 
     def _headers(self, stream=False):
         h = {"Authorization": f"Bearer {self.key}", "Content-Type": "application/json"}
@@ -21,18 +40,21 @@ class OpenAI(Provider):
         body = {"model": model,
                 "messages": [{"role": "system", "content": prompt}, {"role": "user", "content": text}],
                 "stream": True, "temperature": 0.2, "max_tokens": max_tokens}
-        with requests.post(url, headers=self._headers(stream=True), json=body, stream=True, timeout=timeout) as r:
+        if self.usage_chunk:
+            body["stream_options"] = {"include_usage": True}
+        with self.session.post(url, headers=self._headers(stream=True), json=body, stream=True, timeout=self._timeout(timeout)) as r:
             r.raise_for_status()
-            for ev in iter_sse_lines(r):
-                data = ev.get("data")
-                if not data:
+            for ev in iter_sse(r):
+                data = ev.data
+                if '"content"' not in data and '"prompt_tokens"' not in data:     # role-only chunks, [DONE]
+                    if data.strip() == "[DONE]":
+                        break
                     continue
-                if data.strip() == "[DONE]":
-                    break
                 try:
                     j = json.loads(data)
                 except Exception:
                     continue
+                _record(j.get("usage"))
                 for ch in j.get("choices", []):
                     delta = ch.get("delta", {}).get("content")
                     if delta:
@@ -42,7 +64,8 @@ class OpenAI(Provider):
         body = {"model": model,
                 "messages": [{"role": "system", "content": prompt}, {"role": "user", "content": text}],
                 "stream": False, "temperature": 0.2, "max_tokens": max_tokens}
-        r = requests.post(url, headers=self._headers(), json=body, timeout=timeout)
+        r = self.session.post(url, headers=self._headers(), json=body, timeout=self._timeout(timeout))
         r.raise_for_status()
         j = r.json()
+        _record(j.get("usage"))
         return j["choices"][0]["message"]["content"].strip()
\ No newline at end of file
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import queue, sys, threading, time
+from typing import Iterator, List, Optional, Tuple
+
+# --race: send the same request to several providers and stream whichever
+# produces the first token. With a hedge delay the next contender is only
+# started if nobody has produced a token by then, so a fast local model costs
+# no cloud tokens. Losers are cancelled: their generator is closed (which
+# closes the HTTP response) as soon as their worker regains control.
+
+def parse_providers(spec: str, default_model: str) -> List[Tuple[str, str]]:
+    """"ollama:llama3,openai" -> [("ollama", "llama3"), ("openai", default_model)]"""
+    out = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        name, _, model = item.partition(":")
+        out.append((name.strip(), model.strip() or default_model))
+    return out
+
+class Contender:
+    __slots__ = ("name", "model", "provider")
+
+    def __init__(self, name: str, model: str, provider):
+        self.name, self.model, self.provider = name, model, provider
+
+    @property
+    def label(self) -> str:
+        return f"{self.name}:{self.model}"
+
+class _Entry:
+    """One contender within one stream() call: calls overlap under --full and batch -j."""
+    __slots__ = ("c", "started", "first", "state")
+
+    def __init__(self, c: Contender):
+        self.c = c
+        self.started: Optional[float] = None
+        self.first: Optional[float] = None
+        self.state = "not started"
+
+    def ttft(self) -> str:
+        if self.first is None:
+            return self.state
+        ms = f"{int((self.first - self.started) * 1000)}ms"
+        return ms if self.state in ("won", "done") else f"{ms} ({self.state})"
+
+class RaceProvider:
+    """Provider facade over several contenders; `model` arguments are ignored (each contender has its own).
+
+    `winner` is the contender that answered this thread's last call.
+    """
+
+    def __init__(self, contenders: List[Contender], hedge: float = 0.0, log=None):
+        if not contenders:
+            raise ValueError("--race needs at least one provider")
+        self.contenders = contenders
+        self.hedge = max(0.0, hedge)
+        self.log = log if log is not None else sys.stderr
+        self._local = threading.local()
+
+    @property
+    def winner(self) -> Optional[Contender]:
+        return getattr(self._local, "winner", None)
+
+    def _run(self, idx: int, e: _Entry, q: queue.Queue, cancel: threading.Event, args: tuple) -> None:
+        try:
+            for delta in e.c.provider.stream(args[0], args[1], e.c.model, args[2], args[3]):
+                if not delta:
+                    continue
+                if e.first is None:
+                    e.first = time.monotonic()
+                if cancel.is_set():
+                    return                  # leaving the loop closes the stream
+                q.put((idx, "delta", delta))
+            q.put((idx, "done", None))
+        except Exception as ex:
+            q.put((idx, "error", ex))
+
+    def stream(self, prompt, text, model, max_tokens, timeout) -> Iterator[str]:
+        # everything mutable belongs to this call: a provider is shared by concurrent
+        # and consecutive calls (--full, batch, --follow)
+        q: queue.Queue = queue.Queue()
+        es = [_Entry(c) for c in self.contenders]
+        cancel = [threading.Event() for _ in es]
+        running = [0]   # contenders started so far
+        args = (prompt, text, max_tokens, timeout)
+        won: Optional[_Entry] = None
+
+        def start_next() -> None:
+            i = running[0]
+            e = es[i]
+            e.started, e.state = time.monotonic(), "running"
+            threading.Thread(target=self._run, args=(i, e, q, cancel[i], args),
+                             name=f"kull-race-{e.c.name}", daemon=True).start()
+            running[0] += 1
+
+        self._local.winner = None
+        try:
+            start_next()
+            next_at = time.monotonic() + self.hedge
+            first = None
+            while first is None:
+                now = time.monotonic()
+                if running[0] < len(es) and now >= next_at:
+                    start_next()
+                    next_at = now + self.hedge
+                    continue
+                try:
+                    idx, kind, val = q.get(timeout=None if running[0] == len(es) else next_at - now)
+                except queue.Empty:
+                    continue
+                e = es[idx]
+                if kind == "delta":
+                    won, first = e, val
+                    e.state = "won"
+                    self._local.winner = e.c
+                    break
+                e.state = "failed" if kind == "error" else "empty"
+                print(f"[kull] race: {e.c.label} {e.state}" + (f": {val}" if kind == "error" else ""),
+                      file=self.log, flush=True)
+                if all(x.state in ("failed", "empty") for x in es[:running[0]]):
+                    if running[0] == len(es):
+                        raise RuntimeError("every --race contender failed")
+                    next_at = 0.0           # nobody left running: start the next one now
+            for i, e in enumerate(es):
+                if e is not won and e.state == "running":
+                    e.state = "cancelled"
+                    cancel[i].set()
+            yield first
+            win = es.index(won)
+            while True:
+                idx, kind, val = q.get()
+                if idx != win:
+                    continue
+                if kind == "delta":
+                    yield val
+                elif kind == "error":
+                    raise val
+                else:
+                    break
+        finally:
+            for i, e in enumerate(es):
+                if e.state == "running" and e is not won:
+                    e.state = "cancelled"
+                cancel[i].set()
+            if won is not None:
+                print(f"[kull] race: winner {won.c.label}; ttft "
+                      + " ".join(f"{e.c.label}={e.ttft()}" for e in es), file=self.log, flush=True)
+
+    def complete(self, prompt, text, model, max_tokens, timeout) -> str:
+        return "".join(self.stream(prompt, text, model, max_tokens, timeout)).strip()
@@ -1,8 +1,160 @@
+from __future__ import annotations
 import re
+from collections import Counter
+from functools import lru_cache
+from typing import List, NamedTuple, Optional, Tuple, Union
 
+# Every rule is anchored on a short trigger literal. One case-folded copy of the
+# window is scanned for the triggers with str.find (C speed, no per-character
+# regex work), and the precompiled rule regex is only tried where a trigger
+# occurs. Windows without secrets cost little more than a few memchr passes.
+# (One alternation of all the rule patterns, scanned with finditer, redacts the
+# same text at ~1/20 the speed: most rules cannot skip ahead on a literal.)
 
-def basic(text: str) -> str:
-    text = re.sub(r"(?i)(api[_-]?key|token|secret)\s*[:=]\s*([A-Za-z0-9_\-]{12,})", r"\1=[REDACTED]", text)
-    text = re.sub(r"(?i)password\s*[:=]\s*\S+", "password=[REDACTED]", text)
-    text = re.sub(r"AKIA[0-9A-Z]{16}", "AKIA****************", text)
-    return text
\ No newline at end of file
+class Rule(NamedTuple):
+    name: str
+    triggers: Tuple[str, ...]   # lowercase literals; a match starts at one of them
+    pattern: str                # anchored at the trigger (or at `back` chars before it)
+    replacement: str            # re template; reference inner groups by name
+    back: str = ""              # characters the match may extend over to the left of the trigger
+
+RULES: Tuple[Rule, ...] = (
+    Rule("pem_private_key", ("-----begin ",),
+         r"-----BEGIN (?P<kind>[A-Z0-9 ]*)PRIVATE KEY-----[\s\S]*?-----END [A-Z0-9 ]*PRIVATE KEY-----",
+         r"-----BEGIN \g<kind>PRIVATE KEY-----[REDACTED]-----END \g<kind>PRIVATE KEY-----"),
+    Rule("aws_access_key", ("akia", "asia"), r"\b(?P<prefix>AKIA|ASIA)[0-9A-Z]{16}\b", r"\g<prefix>****************"),
+    Rule("jwt", ("eyj",), r"\beyJ[A-Za-z0-9_-]{8,}\.eyJ[A-Za-z0-9_-]{8,}\.[A-Za-z0-9_-]{8,}", "[REDACTED_JWT]"),
+    Rule("bearer", ("bearer",), r"(?P<kw>(?i:bearer))\s+(?=[A-Za-z._~+/-]*\d)[A-Za-z0-9._~+/-]{12,}=*",
+         r"\g<kw> [REDACTED]"),
+    Rule("github_token", ("gh",), r"\b(?:gh[pousr]_[A-Za-z0-9]{36,}|github_pat_[A-Za-z0-9_]{22,})",
+         "[REDACTED_GITHUB_TOKEN]"),
+    Rule("slack_token", ("xox",), r"\bxox[abeoprs]-[A-Za-z0-9-]{10,}", "[REDACTED_SLACK_TOKEN]"),
+    Rule("slack_webhook", ("https://hooks.slack.com/",), r"https://hooks\.slack\.com/services/[A-Za-z0-9/_-]+",
+         "https://hooks.slack.com/services/[REDACTED]"),
+    # the password runs to the last @ before the host: p@ss in scheme://user:p@ss@host is not the host;
+    # the user may be empty (redis://:pass@host)
+    Rule("connection_string", ("://",), r"(?P<user>[A-Za-z][A-Za-z0-9+.-]*://[^\s:/@]*:)[^\s/]+@",
+         r"\g<user>[REDACTED]@", back="abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789+.-"),
+    Rule("api_key", ("api", "token", "secret"), r"(?P<name>(?i:api[_-]?key|token|secret))\s*[:=]\s*[A-Za-z0-9_\-]{12,}",
+         r"\g<name>=[REDACTED]"),
+    Rule("password", ("password",), r"(?i:password)(?P<sep>[\"']?\s*[:=]\s*)(?:\"[^\"\n]*\"?|'[^'\n]*'?|\S+)",
+         r"password\g<sep>[REDACTED]"),
+)
+
+Text = Union[str, bytes]
+
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+@lru_cache(maxsize=None)
+def _compiled(rule: Rule, as_bytes: bool):
+    if as_bytes:
+        return (re.compile(rule.pattern.encode()), rule.replacement.encode(),
+                tuple(t.encode() for t in rule.triggers), frozenset(rule.back.encode()))
+    return re.compile(rule.pattern), rule.replacement, rule.triggers, frozenset(rule.back)
+
+class Redactor:
+    def __init__(self, rules: Tuple[Rule, ...] = RULES):
+        self.rules = tuple(rules)
+        self.hits: Counter = Counter()
+
+    def matches(self, text: Text) -> List[Tuple[int, int, str, "re.Match"]]:
+        """Non-overlapping rule matches as (start, end, rule name, match), leftmost first."""
+        as_bytes = isinstance(text, bytes)
+        low = text.lower()
+        if len(low) != len(text):       # a few non-ASCII code points change length when lowered
+            low = text.translate(_ASCII_LOWER)
+        found = []
+        for order, rule in enumerate(self.rules):
+            rx, _, triggers, back = _compiled(rule, as_bytes)
+            match = rx.match
+            for trig in triggers:
+                find = low.find
+                i = find(trig)
+                while i >= 0:
+                    start = i
+                    if back:
+                        while start and text[start - 1] in back:
+                            start -= 1
+                    m = match(text, start)
+                    if m is not None:
+                        found.append((start, order, m.end(), rule.name, m))
+                    i = find(trig, i + 1)
+        found.sort()
+        out, last = [], 0
+        for start, _, end, name, m in found:
+            if start >= last:
+                out.append((start, end, name, m))
+                last = end
+        return out
+
+    def redact(self, text: Text) -> Text:
+        return self._apply(text, self.matches(text))
+
+    def _apply(self, text: Text, found) -> Text:
+        if not found:
+            return text
+        as_bytes = isinstance(text, bytes)
+        templates = {r.name: _compiled(r, as_bytes)[1] for r in self.rules}
+        parts, pos = [], 0
+        for start, end, name, m in found:
+            parts.append(text[pos:start])
+            parts.append(m.expand(templates[name]))
+            self.hits[name] += 1
+            pos = end
+        parts.append(text[pos:])
+        return text[:0].join(parts)
+
+class StreamRedactor:
+    """Redact byte chunks as they arrive. The last `hold` bytes wait for the next chunk, so a
+    secret up to that long is seen whole even when a chunk edge splits it; so does a match
+    that reaches into them, and an open PEM private key block (up to `max_hold` bytes)."""
+
+    def __init__(self, redactor: Optional[Redactor] = None, hold: int = 4096, max_hold: int = 64 * 1024):
+        self.redactor = redactor or Redactor()
+        self.hold = hold
+        self.max_hold = max_hold
+        self._buf = bytearray()
+
+    @property
+    def hits(self) -> Counter:
+        return self.redactor.hits
+
+    def feed(self, chunk: bytes) -> bytes:
+        self._buf += chunk
+        cut = len(self._buf) - self.hold
+        if cut <= 0:
+            return b""
+        data = bytes(self._buf)
+        # cut after whitespace if there is some nearby: \b and a scheme before :// then see
+        # the same text on both sides
+        near = max(0, cut - 256)
+        cut = max(data.rfind(b"\n", near, cut), data.rfind(b" ", near, cut)) + 1 or cut
+        found = self.redactor.matches(data)
+        begin = data.rfind(b"-----BEGIN ", 0, cut + 10)     # the last one starting before the cut
+        if begin >= 0 and b"PRIVATE KEY-----" in data[begin:begin + 64] and len(data) - begin <= self.max_hold \
+                and not any(start <= begin < end for start, end, _, _ in found):
+            cut = begin                 # its END line has not arrived yet
+        for start, end, _, _ in found:
+            if start < cut < end:       # may still grow with the next chunk, unless it is huge already
+                cut = start if len(data) - start <= self.max_hold else end
+                break
+        if cut <= 0:
+            return b""
+        out = self.redactor._apply(data[:cut], [f for f in found if f[1] <= cut])
+        del self._buf[:cut]
+        return out
+
+    def flush(self) -> bytes:
+        out = self.redactor.redact(bytes(self._buf)) if self._buf else b""
+        self._buf.clear()
+        return out
+
+_default = Redactor()
+
+def basic(text: str, hits: Optional[Counter] = None) -> str:
+    """Scrub secrets from text; per-rule match counts are added to `hits` when given."""
+    r = Redactor() if hits is not None else _default
+    out = r.redact(text)
+    if hits is not None:
+        hits.update(r.hits)
+    return out
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import threading, time
+from typing import BinaryIO, List, Optional
+
+# Streamed deltas are a few bytes each. Writing and flushing every one costs a
+# syscall per token on a TTY, and not flushing leaves a pipe (less, tee) empty
+# until exit. The Renderer coalesces: the first bytes after an idle period go
+# out at once, later ones wait until `interval` has passed since the previous
+# flush or `max_bytes` are pending, whichever comes first. A background thread
+# enforces the deadline when the model stalls between deltas.
+
+class Renderer:
+    def __init__(self, sinks: List[BinaryIO], interval: float = 0.03, max_bytes: int = 4096):
+        self.sinks = list(sinks)        # binary files (sys.stdout.buffer, ...)
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.data = bytearray()         # everything rendered, for -o and the cache
+        self.flushes = 0
+        self.t0 = time.monotonic()
+        self.first_visible: Optional[float] = None  # seconds from t0 until the first bytes reached the sinks
+        self._pending = bytearray()
+        self._last = 0.0
+        self._cv = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+
+    @property
+    def ttft_ms(self) -> Optional[int]:
+        return None if self.first_visible is None else int(self.first_visible * 1000)
+
+    @property
+    def text(self) -> str:
+        return self.data.decode("utf-8")
+
+    def write(self, s: str) -> None:
+        b = s.encode("utf-8")
+        if not b:
+            return
+        with self._cv:
+            self.data += b
+            self._pending += b
+            now = time.monotonic()
+            if len(self._pending) >= self.max_bytes or now - self._last >= self.interval:
+                self._flush(now)
+            elif self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="kull-render", daemon=True)
+                self._thread.start()
+            else:
+                self._cv.notify()
+
+    def _flush(self, now: float) -> None:
+        if not self._pending:
+            return
+        out = bytes(self._pending)
+        self._pending.clear()
+        for sink in list(self.sinks):
+            try:
+                sink.write(out)
+                sink.flush()
+            except (BrokenPipeError, ValueError):   # reader went away / sink closed
+                self.sinks.remove(sink)
+        self._last = now
+        self.flushes += 1
+        if self.first_visible is None:
+            self.first_visible = now - self.t0
+
+    def _run(self) -> None:
+        with self._cv:
+            while not self._closed:
+                if not self._pending:
+                    self._cv.wait()
+                    continue
+                delay = self._last + self.interval - time.monotonic()
+                if delay > 0:
+                    self._cv.wait(delay)
+                    continue
+                self._flush(time.monotonic())
+
+    def close(self) -> None:
+        with self._cv:
+            self._closed = True
+            self._flush(time.monotonic())
+            self._cv.notify()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "Renderer":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
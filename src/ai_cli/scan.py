@@ -0,0 +1,364 @@
+from __future__ import annotations
+import json, re, socket
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+# -scan input compaction: parse nmap (normal, -oG, -oX) and masscan (-oL,
+# -oJ, stdout) output into one host -> open port/service/version table.
+# Hosts with the same open services share a row, with consecutive addresses
+# folded into ranges, so a /16 sweep becomes a few lines. Closed
+# and filtered ports are only counted. Script output and banners are kept
+# only where they say something (certificates, titles, anonymous logins,
+# VULNERABLE/CVE lines), deduplicated across hosts.
+
+class Port(NamedTuple):
+    port: int
+    proto: str
+    service: str
+    version: str
+
+class Host:
+    __slots__ = ("addr", "names", "ports", "notes", "info")
+
+    def __init__(self, addr: str):
+        self.addr = addr
+        self.names: List[str] = []
+        self.ports: Dict[Tuple[int, str], Port] = {}
+        self.notes: List[Tuple[str, str]] = []      # (port/proto or "", text)
+        self.info: List[str] = []                   # OS / Service Info lines
+
+    def add_port(self, port: int, proto: str, service: str = "", version: str = "") -> None:
+        old = self.ports.get((port, proto))
+        if old is None or (not old.version and version) or (not old.service and service):
+            self.ports[(port, proto)] = Port(port, proto, service or (old.service if old else ""),
+                                             version or (old.version if old else ""))
+
+class Scan:
+    def __init__(self):
+        self.hosts: Dict[str, Host] = {}
+        self.formats: List[str] = []
+        self.down = 0
+        self.not_open = 0       # closed/filtered ports seen or summarised ("Not shown: 998 closed")
+
+    def host(self, addr: str) -> Host:
+        h = self.hosts.get(addr)
+        if h is None:
+            h = self.hosts[addr] = Host(addr)
+        return h
+
+_OPEN = ("open", "open|filtered")
+_NOTE_IDS = re.compile(r"ssl-cert|http-title|http-server-header|ftp-anon|smb-os-discovery|"
+                       r"rdp-ntlm-info|vuln|banner", re.I)
+_NOTE_TEXT = re.compile(r"VULNERABLE|CVE-\d{4}-\d+|anonymous|commonName=|default (?:cred|pass)|"
+                        r"backdoor|not valid after|expired|self-signed|SSLv[23]|TLSv1\.0", re.I)
+_NOTE_MAX = 160
+
+def _note(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= _NOTE_MAX else text[:_NOTE_MAX - 1] + "…"
+
+def _keep_note(script_id: str, text: str) -> bool:
+    return bool(_NOTE_IDS.search(script_id) or _NOTE_TEXT.search(text))
+
+# nmap normal: "22/tcp   open  ssh     OpenSSH 8.9p1 Ubuntu 3ubuntu0.6 (protocol 2.0)"
+_PORT_LINE = re.compile(r"(\d+)/(tcp|udp|sctp)\s+(\S+)(?:\s+(\S+))?(?:\s+(.*))?")
+# nmap -oG Ports field entries: "22/open/tcp//ssh//OpenSSH 8.9p1/"
+_GREP_PORT = re.compile(r"(\d+)/([^/,]*)/([^/,]*)/[^/,]*/([^/,]*)/[^/,]*/([^/]*)/")
+# masscan stdout: "Discovered open port 80/tcp on 10.0.0.1" / "Banner on port 80/tcp on 10.0.0.1: [http] ..."
+_MASSCAN_OUT = re.compile(r"(?:Discovered open|Banner on) port (\d+)/(\w+) on ([0-9a-fA-F.:]*[0-9a-fA-F])"
+                          r"(?:: \[([^\]]*)\] ?(.*))?")
+_REPORT = re.compile(r"^Nmap scan report for (?:(\S+) \(([^)]+)\)|(\S+))")
+_NOT_SHOWN = re.compile(r"^Not shown: (\d+)")
+_DONE = re.compile(r"^Nmap done: (\d+) IP addresses? \((\d+) hosts? up\)")
+_SCRIPT = re.compile(r"^\|[_ ]([a-z][a-z0-9-]+):(.*)$")
+
+def _parse_normal(text: str, scan: Scan) -> None:
+    host: Optional[Host] = None
+    where = ""                  # port/proto the script output belongs to ("" = host scripts)
+    script: List[str] = []      # [id, lines...] of the script being read
+
+    def flush() -> None:
+        if host is not None and script and _keep_note(script[0], " ".join(script[1:])):
+            host.notes.append((where, _note(f"{script[0]}: " + " ".join(script[1:]))))
+        script.clear()
+
+    for line in text.splitlines():
+        if line.startswith("|"):
+            m = _SCRIPT.match(line)
+            if m:
+                flush()
+                script.extend((m[1], m[2].strip()))
+            elif script:
+                script.append(line[2:].strip())
+            if line.startswith("|_"):
+                flush()
+            continue
+        flush()
+        if line.startswith("Nmap scan report for "):
+            m = _REPORT.match(line)
+            host = scan.host(m[2] or m[3]) if m else None
+            if host is not None and m[1] and m[1] not in host.names:
+                host.names.append(m[1])
+            where = ""
+        elif line.startswith("Nmap done: "):
+            m = _DONE.match(line)
+            if m:
+                scan.down += int(m[1]) - int(m[2])
+        elif host is None:
+            continue
+        elif line[:1].isdigit() and "/" in line[:7]:
+            m = _PORT_LINE.match(line)
+            if m is None:
+                continue
+            where = f"{m[1]}/{m[2]}"
+            if m[3] in _OPEN:
+                host.add_port(int(m[1]), m[2], (m[4] or "").rstrip("?"), (m[5] or "").strip())
+            else:
+                scan.not_open += 1
+        elif line.startswith("Host script results"):
+            where = ""
+        elif line.startswith(("Service Info:", "OS details:", "Running:")):
+            host.info.append(_note(line))
+        else:
+            m = _NOT_SHOWN.match(line)
+            if m:
+                scan.not_open += int(m[1])
+    flush()
+
+def _parse_grepable(text: str, scan: Scan) -> None:
+    for line in text.splitlines():
+        if not line.startswith("Host: "):
+            continue
+        fields = line.split("\t")
+        addr, _, name = fields[0][6:].partition(" ")
+        host = scan.host(addr)
+        name = name.strip("() ")
+        if name and name not in host.names:
+            host.names.append(name)
+        for f in fields[1:]:
+            key, _, value = f.partition(": ")
+            if key == "Status" and value.strip() == "Down":
+                scan.down += 1
+                del scan.hosts[addr]
+                break
+            if key == "Ports":
+                for e in _GREP_PORT.finditer(value):
+                    if e[2] in _OPEN:
+                        host.add_port(int(e[1]), e[3], e[4].rstrip("?"), e[5].strip().replace("|", "/"))
+                    else:
+                        scan.not_open += 1
+            elif key == "Ignored State":
+                m = re.search(r"\((\d+)\)", value)
+                scan.not_open += int(m[1]) if m else 0
+            elif key == "OS":
+                host.info.append(_note("OS: " + value))
+
+def _parse_xml(text: str, scan: Scan) -> None:
+    """nmap -oX; a window that starts or ends mid-document still yields its complete <host> elements."""
+    import xml.etree.ElementTree as ET
+    start = text.find("<host")
+    while start >= 0 and text[start + 5:start + 6] not in (" ", ">"):
+        start = text.find("<host", start + 1)      # skip <hosthint>
+    if start < 0:
+        return
+    parser = ET.XMLPullParser(events=("end",))
+    parser.feed("<nmaprun>")
+    try:
+        for i in range(start, len(text), 1 << 16):
+            parser.feed(text[i:i + (1 << 16)])
+            _xml_hosts(parser, scan)
+    except ET.ParseError:
+        pass
+    _xml_hosts(parser, scan)
+
+def _xml_hosts(parser, scan: Scan) -> None:
+    for _, el in parser.read_events():
+        if el.tag != "host":
+            continue
+        status = el.find("status")
+        if status is not None and status.get("state") != "up":
+            scan.down += 1
+            el.clear()
+            continue
+        addrs = [a for a in el.findall("address") if a.get("addrtype") in ("ipv4", "ipv6")]
+        if not addrs:
+            el.clear()
+            continue
+        host = scan.host(addrs[0].get("addr"))
+        for hn in el.iter("hostname"):
+            name = hn.get("name")
+            if name and name not in host.names:
+                host.names.append(name)
+        for extra in el.iter("extraports"):
+            scan.not_open += int(extra.get("count", 0))
+        for p in el.iter("port"):
+            state = p.find("state")
+            label = f"{p.get('portid')}/{p.get('protocol')}"
+            if state is None or state.get("state") not in _OPEN:
+                scan.not_open += 1
+                continue
+            svc = p.find("service")
+            name = version = ""
+            if svc is not None:
+                name = svc.get("name", "")
+                if svc.get("tunnel"):
+                    name = f"{svc.get('tunnel')}/{name}"
+                version = " ".join(v for v in (svc.get("product"), svc.get("version")) if v)
+                if svc.get("extrainfo"):
+                    version += f" ({svc.get('extrainfo')})"
+            host.add_port(int(p.get("portid")), p.get("protocol"), name, version)
+            for script in p.iter("script"):
+                out = script.get("output", "")
+                if _keep_note(script.get("id", ""), out):
+                    host.notes.append((label, _note(f"{script.get('id')}: {out}")))
+        for osm in el.iter("osmatch"):
+            host.info.append(_note(f"OS: {osm.get('name')} ({osm.get('accuracy')}%)"))
+            break
+        el.clear()
+
+def _masscan_banner(host: Host, port: str, proto: str, service: str, banner: str) -> None:
+    banner = re.sub(r"(?:\\x0[da])+", " ", banner).strip()     # -oL escapes CR/LF
+    if banner:
+        host.notes.append((f"{port}/{proto}", _note(f"{service}: {banner}")))
+    host.add_port(int(port), proto, service)
+
+def _parse_masscan(text: str, scan: Scan) -> None:
+    for line in text.splitlines():
+        if line.startswith(("open ", "closed ", "banner ")):
+            # -oL: "open tcp 80 10.0.0.1 1700000000" / "banner tcp 80 10.0.0.1 1700000000 http <text>"
+            f = line.split(" ", 6)
+            if len(f) < 5 or not f[2].isdigit():
+                continue
+            if f[0] == "banner":
+                if len(f) > 5:
+                    _masscan_banner(scan.host(f[3]), f[2], f[1], f[5], f[6] if len(f) > 6 else "")
+            elif f[0] == "open":
+                scan.host(f[3]).add_port(int(f[2]), f[1])
+            else:
+                scan.not_open += 1
+        elif line.startswith(("Discovered open port", "Banner on port")):
+            m = _MASSCAN_OUT.match(line)
+            if m is None:
+                continue
+            if m[4] is not None:
+                _masscan_banner(scan.host(m[3]), m[1], m[2], m[4], m[5] or "")
+            else:
+                scan.host(m[3]).add_port(int(m[1]), m[2])
+
+def _parse_masscan_json(text: str, scan: Scan) -> None:
+    """masscan -oJ writes one object per line with trailing commas; parse line by line."""
+    for line in text.splitlines():
+        line = line.strip().rstrip(",")
+        if not line.startswith("{") or '"ip"' not in line:
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        host = scan.host(rec["ip"])
+        for p in rec.get("ports", []):
+            svc = p.get("service") or {}
+            if svc.get("banner"):
+                _masscan_banner(host, str(p["port"]), p.get("proto", "tcp"), svc.get("name", ""), svc["banner"])
+            elif p.get("status", "open") == "open":
+                host.add_port(int(p["port"]), p.get("proto", "tcp"))
+            else:
+                scan.not_open += 1
+
+_FORMATS = (
+    ("nmap-xml", lambda t: "<port " in t and ("<host" in t or "<nmaprun" in t), _parse_xml),
+    ("nmap-grepable", lambda t: "\tPorts: " in t or ("Host: " in t and "Status: " in t), _parse_grepable),
+    ("masscan-json", lambda t: '"ip"' in t and '"ports"' in t, _parse_masscan_json),
+    ("masscan", lambda t: re.search(r"(?m)^(?:open|banner) (?:tcp|udp|sctp) \d+ |^Discovered open port ", t),
+     _parse_masscan),
+    ("nmap", lambda t: "Nmap scan report for " in t, _parse_normal),
+)
+
+def parse(text: str) -> Optional[Scan]:
+    """A Scan for every recognised format in `text`; None when nothing recognisable is found."""
+    scan = Scan()
+    for name, test, fn in _FORMATS:
+        if test(text):
+            fn(text, scan)
+            scan.formats.append(name)
+    return scan if scan.hosts else None
+
+def _sort_key(addr: str) -> Tuple[int, int, object]:
+    for family, version in ((socket.AF_INET, 4), (socket.AF_INET6, 6)):
+        try:
+            return (0, version, int.from_bytes(socket.inet_pton(family, addr), "big"))
+        except OSError:
+            pass
+    return (1, 0, addr)
+
+def _fold(hosts: List[Tuple[tuple, Host]], limit: int) -> str:
+    """(sort key, host) pairs as a host list with runs of consecutive addresses folded
+    into ranges, at most `limit` entries. Hostnames are kept only on short lists."""
+    named = len(hosts) <= 8
+    items: List[str] = []
+    run: list = []          # [first addr, last addr, last key] of the current run
+
+    def close_run() -> None:
+        if run:
+            items.append(run[0] if run[0] == run[1] else f"{run[0]}-{run[1]}")
+            run.clear()
+
+    for key, h in hosts:
+        if (named and h.names) or key[0]:
+            close_run()
+            items.append(f"{h.addr} ({', '.join(h.names)})" if named and h.names else h.addr)
+        elif run and key[1] == run[2][1] and key[2] == run[2][2] + 1:
+            run[1:] = [h.addr, key]
+        else:
+            close_run()
+            run[:] = [h.addr, h.addr, key]
+    close_run()
+    if len(items) > limit:
+        items = items[:limit] + [f"+{len(items) - limit} more"]
+    return ", ".join(items)
+
+def render(scan: Scan, hosts_per_row: int = 32, max_rows: int = 200) -> str:
+    """The compact table sent to the model instead of the raw scan. Rows beyond `max_rows`
+    (the rarest port sets) are counted but not listed."""
+    rows: Dict[Tuple[Port, ...], List[Tuple[tuple, Host]]] = {}
+    idle = 0
+    for key, h in sorted(((_sort_key(h.addr), h) for h in scan.hosts.values()), key=lambda kh: kh[0]):
+        if not h.ports:
+            idle += 1
+            continue
+        sig = tuple(sorted(h.ports.values()))
+        rows.setdefault(sig, []).append((key, h))
+    open_ports = sum(len(sig) * len(hs) for sig, hs in rows.items())
+    plural = lambda n, word: f"{n} {word}" + ("" if n == 1 else "s")  # noqa: E731
+    out = [f"Parsed scan ({', '.join(scan.formats)}): {plural(len(scan.hosts), 'host')} up"
+           + (f", {scan.down} down" if scan.down else "")
+           + f", {plural(open_ports, 'open port')}"
+           + (f"; {scan.not_open} closed/filtered ports omitted" if scan.not_open else "")
+           + (f"; {plural(idle, 'host')} up with no open ports" if idle else ""),
+           "HOSTS | OPEN PORTS (port/proto service version)"]
+    ordered = sorted(rows.items(), key=lambda kv: (-len(kv[1]), kv[0]))
+    for sig, hs in ordered[:max_rows]:
+        ports = "; ".join(" ".join(x for x in (f"{p.port}/{p.proto}", p.service, p.version) if x) for p in sig)
+        count = f" [{len(hs)} hosts]" if len(hs) > 1 else ""
+        out.append(f"{_fold(hs, hosts_per_row)}{count} | {ports}")
+    if len(ordered) > max_rows:
+        rest = ordered[max_rows:]
+        out.append(f"+{len(rest)} more rows ({plural(sum(len(hs) for _, hs in rest), 'host')}) with less common port sets")
+    notes: Dict[str, List[str]] = {}
+    for h in scan.hosts.values():
+        for where, text in h.notes:
+            notes.setdefault(text, []).append(f"{h.addr}:{where}" if where else h.addr)
+        for text in h.info:
+            notes.setdefault(text, []).append(h.addr)
+    if notes:
+        out.append("Notable script output, banners and OS info:")
+        for text, where in list(notes.items())[:max_rows]:
+            more = f" (+{len(where) - 3} more)" if len(where) > 3 else ""
+            out.append(f"- {', '.join(where[:3])}{more}: {text}")
+        if len(notes) > max_rows:
+            out.append(f"- +{len(notes) - max_rows} more distinct notes")
+    return "\n".join(out) + "\n"
+
+def compact(text: str) -> Tuple[str, Optional[Scan]]:
+    """(table, scan) when `text` holds a recognisable scan, else (text, None)."""
+    scan = parse(text)
+    return (render(scan), scan) if scan is not None else (text, None)
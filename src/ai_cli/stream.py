@@ -1,4 +1,6 @@
-import sys, hashlib
+from __future__ import annotations
+import os, sys, stat, errno, itertools
+from typing import Iterable, Iterator, List, NamedTuple, Optional
 
 _GRAY = "\x1b[90m"
 _RESET = "\x1b[0m"
@@ -14,52 +16,422 @@ def divider(title: str) -> str:
         return f"\n\n{_GRAY}###############──────────────────── KullexAi ────────────────────###############{_RESET}\n"
     return f"\n\n{title}\n" + ("-" * len(title)) + "\n"
 
-def tail_window(limit: int) -> bytes:
-    window = bytearray()
-    read1 = getattr(sys.stdin.buffer, "read1", sys.stdin.buffer.read)
+class RingBuffer:
+    """Fixed-capacity byte ring: appends cost O(len(chunk)) no matter how large the capacity is.
+
+    The storage grows (doubling) as bytes arrive until it reaches the capacity and starts to
+    wrap, so a large -L (or -scan's whole-scan window) costs memory only for input that exists.
+    """
+
+    def __init__(self, capacity: int, head: int = 0):
+        self.capacity = max(int(capacity), 0)
+        self._buf = bytearray(min(self.capacity, 1 << 16))
+        self._start = 0     # offset of the oldest retained byte
+        self._len = 0       # number of retained bytes
+        self.total = 0      # bytes ever appended
+        self._head_cap = head
+        self.head = bytearray()  # first `head` bytes ever appended
+
+    def __len__(self) -> int:
+        return self._len
+
+    def _reserve(self, n: int) -> None:
+        # until the storage is full size nothing has wrapped: _start is 0 and the bytes are [0, _len)
+        size = len(self._buf)
+        if size < self.capacity and self._len + n > size:
+            grow = min(self.capacity, max(self._len + n, 2 * size)) - size
+            self._buf += bytes(grow)
+
+    def append(self, data) -> None:
+        mv = memoryview(data).cast("B")
+        n = len(mv)
+        self.total += n
+        if len(self.head) < self._head_cap:
+            self.head += mv[:self._head_cap - len(self.head)]
+        cap = self.capacity
+        if not n or not cap:
+            return
+        self._reserve(n)
+        if n >= cap:
+            self._buf[:] = mv[n - cap:]     # same length: the storage is full size after _reserve
+            self._start, self._len = 0, cap
+            return
+        end = (self._start + self._len) % cap
+        first = min(n, cap - end)
+        self._buf[end:end + first] = mv[:first]
+        if first < n:
+            self._buf[:n - first] = mv[first:]
+        overflow = self._len + n - cap
+        if overflow > 0:
+            self._start = (self._start + overflow) % cap
+            self._len = cap
+        else:
+            self._len += n
+
+    def views(self) -> tuple[memoryview, ...]:
+        """Zero-copy views of the retained bytes, oldest first (at most two segments)."""
+        mv = memoryview(self._buf)
+        end = self._start + self._len
+        if end <= self.capacity:
+            return (mv[self._start:end],)
+        return (mv[self._start:], mv[:end - self.capacity])
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.views())
+
+    def fill(self, fd: int, size: int) -> int:
+        """read(2) up to `size` bytes from fd straight into the ring; returns bytes read."""
+        cap = self.capacity
+        self._reserve(size)
+        end = (self._start + self._len) % cap
+        n = min(size, cap - end)
+        got = os.readv(fd, [memoryview(self._buf)[end:end + n]])
+        self.total += got
+        if len(self.head) < self._head_cap:
+            self.head += memoryview(self._buf)[end:end + min(got, self._head_cap - len(self.head))]
+        overflow = self._len + got - cap
+        if overflow > 0:
+            self._start = (self._start + overflow) % cap
+            self._len = cap
+        else:
+            self._len += got
+        return got
+
+    def last(self, n: int) -> memoryview:
+        """Zero-copy view of the n most recently appended bytes (n must not cross the wrap point)."""
+        end = (self._start + self._len) % self.capacity or self.capacity
+        return memoryview(self._buf)[end - n:end]
+
+def _fileno(stream) -> int | None:
+    try:
+        return stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+def _write_all(fd: int, data) -> None:
+    mv = memoryview(data)
+    while mv:
+        mv = mv[os.write(fd, mv):]
+
+_libc_tee = None
+
+def _tee_func():
+    """tee(2) via libc; os has splice() but no tee(). Returns None when unavailable."""
+    global _libc_tee
+    if _libc_tee is None:
+        _libc_tee = False
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fn = libc.tee
+            fn.argtypes = [ctypes.c_int, ctypes.c_int, ctypes.c_size_t, ctypes.c_uint]
+            fn.restype = ctypes.c_ssize_t
+            _libc_tee = (fn, ctypes.get_errno)
+        except (OSError, AttributeError):
+            pass
+    return _libc_tee or None
+
+def _copy_range(in_fd: int, out_fd: int, pos: int, size: int) -> int | None:
+    """Copy in_fd[pos:size] to out_fd inside the kernel; returns the end offset, or None when
+    the kernel cannot do it (e.g. O_APPEND stdout) and nothing was copied."""
+    copy = os.sendfile
+    if stat.S_ISREG(os.fstat(out_fd).st_mode) and hasattr(os, "copy_file_range"):
+        copy = lambda o, i, off, n: os.copy_file_range(i, o, n, off)  # noqa: E731
+    off = pos
+    try:
+        while off < size:
+            sent = copy(out_fd, in_fd, off, size - off)
+            if not sent:
+                break
+            off += sent
+    except OSError as e:
+        if off == pos and e.errno in (errno.EINVAL, errno.ENOSYS, errno.EXDEV, errno.EBADF, errno.ENOTSUP):
+            return None
+        if off == pos:
+            raise
+        # partial copy: finish the remainder in userspace
+        while off < size:
+            data = os.pread(in_fd, min(size - off, 1 << 20), off)
+            if not data:
+                break
+            _write_all(out_fd, data)
+            off += len(data)
+    return off
+
+def _tail_regular(limit: int, in_fd: int, out_fd: int, size: int, info: dict, head: int = 0) -> bytes | None:
+    """stdin is a regular file: copy it to stdout inside the kernel, then pread only the tail."""
+    pos = os.lseek(in_fd, 0, os.SEEK_CUR)
+    off = _copy_range(in_fd, out_fd, pos, size)
+    if off is None:
+        return None                         # caller falls back to the read loop
+    os.lseek(in_fd, off, os.SEEK_SET)
+    info["bytes_in"] = off - pos
+    info["head"] = os.pread(in_fd, min(head, off - pos), pos) if head else b""
+    start = max(pos, off - limit)
+    parts, at = [], start
+    while at < off:
+        data = os.pread(in_fd, off - at, at)
+        if not data:
+            break
+        parts.append(data)
+        at += len(data)
+    return b"".join(parts)
+
+def _tail_fds(ring: RingBuffer, in_fd: int, out_fd: int, chunk_size: int) -> None:
+    """Raw-fd loop: read(2) straight into the ring, echo with tee(2) when both ends are pipes."""
+    tee = None
+    if stat.S_ISFIFO(os.fstat(in_fd).st_mode) and stat.S_ISFIFO(os.fstat(out_fd).st_mode):
+        tee = _tee_func()
     while True:
-        chunk = read1(8192)
+        if tee is not None:
+            fn, get_errno = tee
+            n = fn(in_fd, out_fd, 1 << 20, 0)
+            if n < 0:
+                err = get_errno()
+                if err == errno.EINTR:
+                    continue
+                if err in (errno.EINVAL, errno.ENOSYS):
+                    tee = None              # not spliceable after all; echo from userspace
+                    continue
+                raise OSError(err, os.strerror(err))
+            if n == 0:
+                break
+            while n:                        # consume what tee duplicated
+                got = ring.fill(in_fd, n)
+                if not got:
+                    break
+                n -= got
+            continue
+        got = ring.fill(in_fd, chunk_size)
+        if not got:
+            break
+        _write_all(out_fd, ring.last(got))
+
+def tail_window(limit: int, src=None, dst=None, chunk_size: int = 65536,
+                info: dict | None = None, head: int = 0) -> bytes:
+    """Echo src to dst chunk by chunk and return the last `limit` bytes.
+
+    With the real stdin/stdout on Linux the echo happens in the kernel where it can
+    (sendfile/copy_file_range for a regular-file stdin, tee(2) between pipes).
+    If `info` is given it receives bytes_in (total input size) and, when head > 0,
+    head (the first `head` bytes of the input).
+    """
+    info = info if info is not None else {}
+    ring = RingBuffer(limit, head=head)
+    if src is None and dst is None and limit > 0 and sys.platform.startswith("linux"):
+        in_fd, out_fd = _fileno(sys.stdin), _fileno(sys.stdout)
+        if in_fd is not None and out_fd is not None:
+            sys.stdout.flush()
+            st = os.fstat(in_fd)
+            if stat.S_ISREG(st.st_mode):
+                tail = _tail_regular(limit, in_fd, out_fd, st.st_size, info, head)
+                if tail is not None:
+                    return tail
+            _tail_fds(ring, in_fd, out_fd, chunk_size)
+            return _finish(ring, info)
+    src = src if src is not None else sys.stdin.buffer
+    dst = dst if dst is not None else sys.stdout.buffer
+    read1 = getattr(src, "read1", src.read)
+    while True:
+        chunk = read1(chunk_size)
         if not chunk:
             break
-        sys.stdout.buffer.write(chunk)
-        sys.stdout.buffer.flush()
-        window += chunk
-        if len(window) > limit:
-            window = window[-limit:]
-    return bytes(window)
+        dst.write(chunk)
+        dst.flush()
+        ring.append(chunk)
+    return _finish(ring, info)
+
+def _finish(ring: RingBuffer, info: dict) -> bytes:
+    info["bytes_in"] = ring.total
+    info["head"] = bytes(ring.head)
+    return ring.getvalue()
+
+class _Discard:
+    def write(self, b) -> int:
+        return len(b)
+
+    def flush(self) -> None:
+        pass
+
+DISCARD = _Discard()
+
+# gzip, xz and bz2 are recognised by content, so rotated logs without the usual suffix work too
+_MAGIC = ((b"\x1f\x8b", "gzip"), (b"\xfd7zXZ\x00", "lzma"), (b"BZh", "bz2"))
+
+def open_input(path: str):
+    """Binary reader for `path`, decompressing gzip/xz/bz2 on the fly."""
+    f = open(path, "rb")
+    magic = f.peek(6)[:6]
+    for sig, module in _MAGIC:
+        if magic.startswith(sig):
+            f.close()
+            from importlib import import_module
+            return import_module(module).open(path, "rb")
+    return f
+
+def _line_start(buf, start: int, end: int) -> int:
+    """First line boundary at or after `start`; `start` itself when buf[start:end] holds no complete line."""
+    if start == 0 or buf[start - 1:start] == b"\n":
+        return start
+    nl = buf.find(b"\n", start, end)
+    return nl + 1 if 0 <= nl < end - 1 else start
+
+def _tail_mapped(fd: int, limit: int, echo: bool, info: dict, head: int) -> bytes:
+    size = os.fstat(fd).st_size
+    if echo and size:
+        sys.stdout.flush()
+        out_fd = _fileno(sys.stdout)
+        if out_fd is None or _copy_range(fd, out_fd, 0, size) is None:
+            off = 0
+            while off < size:
+                data = os.pread(fd, min(size - off, 1 << 20), off)
+                if not data:
+                    break
+                sys.stdout.buffer.write(data)
+                off += len(data)
+            sys.stdout.buffer.flush()
+    info["bytes_in"], info["head"], info["aligned"] = size, b"", True
+    if not size or limit <= 0:
+        return b""
+    import mmap
+    with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mm:
+        start = _line_start(mm, max(0, size - limit), size)
+        if head and start:
+            info["head"] = mm[:head]
+        return mm[start:size]
+
+def tail_file(path: str, limit: int, echo: bool = True, info: dict | None = None, head: int = 0,
+              chunk_size: int = 1 << 20) -> bytes:
+    """The last `limit` bytes of a file, starting at a line boundary; optionally echo the file to stdout.
+
+    A plain file is mmapped and only the window is read, whatever its size (the
+    echo, if any, is a kernel copy). A compressed file is decompressed as a
+    stream through the same ring buffer stdin uses, without a temp file.
+    """
+    import io
+    info = info if info is not None else {}
+    with open_input(path) as f:
+        if isinstance(f, io.BufferedReader) and stat.S_ISREG(os.fstat(f.fileno()).st_mode):
+            return _tail_mapped(f.fileno(), limit, echo, info, head)
+        window = tail_window(limit, src=f, dst=sys.stdout.buffer if echo else DISCARD, chunk_size=chunk_size,
+                             info=info, head=head)
+    if info["bytes_in"] > len(window):      # the ring cut into a line
+        window = window[_line_start(window, 1, len(window)):]
+    info["aligned"] = True
+    return window
 
 def sha256_hex(b: bytes) -> str:
+    import hashlib
     return hashlib.sha256(b).hexdigest()
 
-def iter_sse_lines(resp):  # requests.Response(stream=True)
-    buf = []
-    for raw in resp.iter_lines(decode_unicode=True):
-        if raw is None:
-            continue
-        if raw == "":
-            if not buf:
+class SSEEvent(NamedTuple):
+    event: str          # "message" unless the server sent an event: field
+    data: str           # data: lines joined with "\n"
+    id: Optional[str]
+
+_new_tuple = tuple.__new__     # SSEEvent(...) without the namedtuple __new__ frame
+
+class SSEDecoder:
+    """Incremental text/event-stream decoder.
+
+    Framing happens on raw bytes: CR/CRLF are normalised, the buffer is cut at
+    the last blank line, and the complete events are decoded to str in one go
+    (a UTF-8 sequence can't straddle a blank line). Comments are dropped,
+    `retry:` and `id:` update the decoder state as the spec describes, and
+    events of a type not in `types` are skipped before their data is sliced out.
+    """
+
+    def __init__(self, types: Optional[Iterable[str]] = None):
+        self.types = frozenset(types) if types is not None else None
+        self.last_id: Optional[str] = None
+        self.retry: Optional[int] = None
+        self._buf = b""
+        self._cr = False        # previous chunk ended in \r, which may be the first half of \r\n
+
+    def feed(self, chunk: bytes) -> List[SSEEvent]:
+        if self._cr or b"\r" in chunk:
+            if self._cr and chunk[:1] == b"\n":
+                chunk = chunk[1:]
+            self._cr = chunk[-1:] == b"\r"
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        buf = self._buf + chunk if self._buf else chunk
+        end = buf.rfind(b"\n\n")
+        if end < 0:
+            self._buf = buf
+            return []
+        self._buf = buf[end + 2:]
+        out: List[SSEEvent] = []
+        add, types, last_id = out.append, self.types, self.last_id
+        plain = types is None or "message" in types
+        for block in buf[:end].decode("utf-8", "replace").split("\n\n"):
+            # fast paths for the two shapes LLM APIs send: "data: X" and "event: T\ndata: X"
+            nl = block.find("\n")
+            if nl < 0:
+                if block[:5] == "data:":
+                    if plain:
+                        add(_new_tuple(SSEEvent, ("message", block[6:] if block[5:6] == " " else block[5:], last_id)))
+                    continue
+            elif block[:6] == "event:" and block[nl + 1:nl + 6] == "data:" and block.find("\n", nl + 1) < 0:
+                event = block[7:nl] if block[6:7] == " " else block[6:nl]
+                if types is None or event in types:
+                    add(_new_tuple(SSEEvent, (event, block[nl + 7:] if block[nl + 6:nl + 7] == " " else block[nl + 6:],
+                                              last_id)))
                 continue
-            event = {"event": None, "data": "", "id": None}
-            for line in buf:
-                if line.startswith("data:"):
-                    event["data"] += line[5:].lstrip() + "\n"
-                elif line.startswith("event:"):
-                    event["event"] = line[6:].lstrip()
-                elif line.startswith("id:"):
-                    event["id"] = line[3:].lstrip()
-            event["data"] = event["data"].rstrip("\n")
-            yield event
-            buf = []
+            ev = self._parse(block)
+            last_id = self.last_id
+            if ev is not None:
+                add(ev)
+        return out
+
+    def flush(self) -> List[SSEEvent]:
+        """Dispatch a final event the server did not terminate with a blank line."""
+        buf, self._buf = self._buf, b""
+        ev = self._parse(buf.decode("utf-8", "replace").strip("\n")) if buf.strip() else None
+        return [ev] if ev is not None else []
+
+    def _parse(self, block: str) -> Optional[SSEEvent]:
+        event, data = "message", []
+        for line in block.split("\n"):
+            if not line or line[0] == ":":
+                continue
+            name, colon, value = line.partition(":")
+            if colon and value[:1] == " ":
+                value = value[1:]
+            if name == "data":
+                data.append(value)
+            elif name == "event":
+                event = value
+            elif name == "id":
+                if "\0" not in value:
+                    self.last_id = value
+            elif name == "retry":
+                if value.isdigit():
+                    self.retry = int(value)
+        if not data or (self.types is not None and event not in self.types):
+            return None
+        return SSEEvent(event, "\n".join(data), self.last_id)
+
+def iter_sse(resp, types: Optional[Iterable[str]] = None, chunk_size: int = 16384) -> Iterator[SSEEvent]:
+    """Decode a streaming requests.Response as server-sent events.
+
+    Reads whatever the socket has (up to `chunk_size`) rather than fixed-size
+    blocks, so a token is never stuck waiting for the buffer to fill.
+    """
+    dec = SSEDecoder(types)
+    read1 = getattr(resp.raw, "read1", None)
+    encoded = (resp.headers.get("Content-Encoding") or "identity").strip().lower() != "identity"
+    if read1 is not None and encoded:
+        try:    # raw read1 skips urllib3's gzip/deflate decoding unless asked
+            first = read1(chunk_size, decode_content=True)
+        except TypeError:   # urllib3 < 2: no decoding read1, let requests decode
+            read1 = None
         else:
-            buf.append(raw)
-    if buf:
-        event = {"event": None, "data": "", "id": None}
-        for line in buf:
-            if line.startswith("data:"):
-                event["data"] += line[5:].lstrip() + "\n"
-            elif line.startswith("event:"):
-                event["event"] = line[6:].lstrip()
-            elif line.startswith("id:"):
-                event["id"] = line[3:].lstrip()
-        event["data"] = event["data"].rstrip("\n")
-        yield event
\ No newline at end of file
+            chunks = itertools.chain((first,), iter(lambda: read1(chunk_size, decode_content=True), b""))
+    elif read1 is not None:
+        chunks = iter(lambda: read1(chunk_size), b"")
+    if read1 is None:
+        chunks = resp.iter_content(chunk_size)
+    for chunk in chunks:
+        if chunk:
+            yield from dec.feed(chunk)
+    yield from dec.flush()
@@ -0,0 +1,193 @@
+from __future__ import annotations
+import re
+from collections import Counter
+from typing import Iterable, List, Optional
+
+# Drain-style log template miner: mask variable tokens, bucket lines by token
+# count and first token, and merge each line into the most similar template in
+# its bucket. Repeats collapse into one exemplar with a count and time range.
+# A masked line seen before goes straight to its cluster without a similarity
+# scan; a full bucket replaces its least used cluster with the new one.
+
+LEADING_TS = re.compile(
+    r"^(?:"
+    r"\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(?:[.,]\d+)?(?:Z|[+-]\d{2}:?\d{2})?"   # ISO-8601 / short-iso
+    r"|[A-Z][a-z]{2} [ \d]\d \d{2}:\d{2}:\d{2}"                                      # syslog
+    r"|\[\d{2}/[A-Z][a-z]{2}/\d{4}:\d{2}:\d{2}:\d{2} [+-]\d{4}\]"                   # nginx/apache
+    r"|\[\s*\d+\.\d+\]"                                                              # dmesg
+    r")\s*"
+)
+
+_MASKS = [
+    (re.compile(r"\b[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\b"), "<UUID>"),
+    (re.compile(r"\b\d{1,3}(?:\.\d{1,3}){3}(?::\d+)?\b"), "<IP>"),
+    (re.compile(r"\b(?:[0-9a-fA-F]{1,4}:){2,7}[0-9a-fA-F]{1,4}\b"), "<IP6>"),
+    (re.compile(r"\b0x[0-9a-fA-F]+\b|\b(?=[0-9a-fA-F]*\d)(?=[0-9a-fA-F]*[a-fA-F])[0-9a-fA-F]{8,}\b"), "<HEX>"),
+    (re.compile(r"(?<![A-Za-z])[-+]?\d+(?:\.\d+)?(?:ms|s|us|ns|[KMGT]i?B|%)?(?![A-Za-z])"), "<NUM>"),
+]
+
+WILDCARD = "<*>"
+
+def mask(line: str) -> str:
+    for rx, tag in _MASKS:
+        line = rx.sub(tag, line)
+    return line
+
+def split_timestamp(line: str) -> tuple[str, str]:
+    m = LEADING_TS.match(line)
+    if not m:
+        return "", line
+    return m.group(0).strip(), line[m.end():]
+
+class Cluster:
+    __slots__ = ("tokens", "count", "first_ts", "last_ts", "exemplar", "wild")
+
+    def __init__(self, tokens: List[str], exemplar: str, ts: str):
+        self.tokens = tokens
+        self.count = 1
+        self.first_ts = self.last_ts = ts
+        self.exemplar = exemplar
+        self.wild = tokens.count(WILDCARD)
+
+    @property
+    def template(self) -> str:
+        return " ".join(self.tokens)
+
+class _Bucket:
+    """Clusters of one (token count, first token) bucket, indexed by (position, constant
+    token): a line's similarity to every cluster is then counted by a few lookups."""
+    __slots__ = ("clusters", "index")
+
+    def __init__(self):
+        self.clusters: List[Cluster] = []
+        self.index: dict[tuple[int, str], List[Cluster]] = {}
+
+    def add(self, c: Cluster) -> None:
+        self.clusters.append(c)
+        for key in enumerate(c.tokens):
+            if key[1] != WILDCARD:
+                self.index.setdefault(key, []).append(c)
+
+    def unindex(self, c: Cluster, key: tuple[int, str]) -> None:
+        cs = self.index[key]
+        cs.remove(c)
+        if not cs:
+            del self.index[key]
+
+    def evict(self, c: Cluster) -> None:
+        self.clusters.remove(c)
+        for key in enumerate(c.tokens):
+            if key[1] != WILDCARD:
+                self.unindex(c, key)
+
+class TemplateMiner:
+    def __init__(self, sim: float = 0.7, max_clusters_per_bucket: int = 200, max_seen: int = 65536):
+        self.sim = sim
+        self.max_clusters_per_bucket = max_clusters_per_bucket
+        self.max_seen = max_seen
+        self._buckets: dict[tuple[int, str], _Bucket] = {}
+        self._seen: dict[str, Cluster] = {}     # masked line -> the cluster it went into
+        self.clusters: List[Cluster] = []
+        self.lines = 0
+
+    def _match(self, bucket: _Bucket, tokens: List[str]) -> Optional[Cluster]:
+        n = len(tokens)
+        need = 0                # matching positions (equal or <*>) for a similarity of self.sim
+        while need / n < self.sim:
+            need += 1
+        same = Counter()
+        get = bucket.index.get
+        for key in enumerate(tokens):
+            cs = get(key)
+            if cs:
+                same.update(cs)
+        best, best_same = None, need - 1
+        for c in bucket.clusters:
+            s = same[c] + c.wild
+            if s > best_same:
+                best, best_same = c, s
+        return best
+
+    def add(self, line: str) -> Optional[Cluster]:
+        ts, body = split_timestamp(line)
+        masked = mask(body)
+        c = self._seen.get(masked)
+        if c is not None:       # merging an identical line again would not change the template
+            self.lines += 1
+            c.count += 1
+            if ts:
+                c.first_ts = c.first_ts or ts
+                c.last_ts = ts
+            return c
+        tokens = masked.split()
+        if not tokens:
+            return None
+        self.lines += 1
+        if len(self._seen) >= self.max_seen:
+            self._seen.clear()
+        head = tokens[0] if not any(ch.isdigit() or ch == "<" for ch in tokens[0]) else WILDCARD
+        bucket = self._buckets.get((len(tokens), head))
+        if bucket is None:
+            bucket = self._buckets[len(tokens), head] = _Bucket()
+        c = self._match(bucket, tokens)
+        if c is None:
+            c = Cluster(tokens, line, ts)
+            if len(bucket.clusters) >= self.max_clusters_per_bucket:
+                # full: the least used cluster stops taking new lines (it stays in the output)
+                bucket.evict(min(bucket.clusters, key=lambda c: c.count))
+            bucket.add(c)
+            self.clusters.append(c)
+            return c
+        c.count += 1
+        if ts:
+            c.first_ts = c.first_ts or ts
+            c.last_ts = ts
+        for i, (a, b) in enumerate(zip(c.tokens, tokens)):
+            if a != b and a != WILDCARD:
+                bucket.unindex(c, (i, a))
+                c.tokens[i] = WILDCARD
+                c.wild += 1
+        self._seen[masked] = c
+        return c
+
+    def prune(self, max_clusters: int) -> None:
+        """Keep only the most frequent templates so a long-running miner stays bounded."""
+        if len(self.clusters) <= max_clusters:
+            return
+        keep = set(map(id, sorted(self.clusters, key=lambda c: -c.count)[:max_clusters]))
+        self.clusters = [c for c in self.clusters if id(c) in keep]
+        self._seen = {k: c for k, c in self._seen.items() if id(c) in keep}
+        for key, bucket in list(self._buckets.items()):
+            for c in [c for c in bucket.clusters if id(c) not in keep]:
+                bucket.evict(c)
+            if not bucket.clusters:
+                del self._buckets[key]
+
+    def top(self, n: int) -> List[Cluster]:
+        return sorted(self.clusters, key=lambda c: -c.count)[:n]
+
+    def feed(self, lines: Iterable[str]) -> "TemplateMiner":
+        for line in lines:
+            self.add(line)
+        return self
+
+    def render(self) -> str:
+        """Compact form: unique lines verbatim, repeats as '[xN first .. last] template' plus one exemplar."""
+        out = [f"[kull] {self.lines} lines collapsed into {len(self.clusters)} templates "
+               f"(<*>, <NUM>, <IP>, <HEX> mark variable fields)"]
+        for c in self.clusters:
+            if c.count == 1:
+                out.append(c.exemplar)
+                continue
+            span = f" {c.first_ts} .. {c.last_ts}" if c.first_ts else ""
+            out.append(f"[x{c.count}{span}] {c.template}")
+            out.append(f"    e.g. {c.exemplar}")
+        return "\n".join(out) + "\n"
+
+def compact(text: str, sim: float = 0.7) -> str:
+    """Collapse repeated log lines into templates; returns the input unchanged if that does not shrink it."""
+    miner = TemplateMiner(sim=sim).feed(text.splitlines())
+    if not miner.clusters or len(miner.clusters) == miner.lines:
+        return text
+    out = miner.render()
+    return out if len(out) < len(text) else text
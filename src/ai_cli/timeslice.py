@@ -0,0 +1,266 @@
+from __future__ import annotations
+import calendar, re, time
+from typing import Callable, NamedTuple, Optional, Tuple
+
+# --since / --until: keep the lines whose timestamps fall in a time range.
+# The timestamp format is detected from the first lines (syslog, ISO-8601 /
+# journald short-iso / RFC 5424, nginx access log). A plain file is
+# binary-searched through an mmap, so only the slice is ever read; a stream
+# (stdin, a compressed file) is bisected one chunk at a time, which parses a
+# handful of timestamps per chunk instead of one per line. Lines without a
+# timestamp (tracebacks, continuations) stay with the line before them.
+
+_MONTHS = {m: i for i, m in enumerate(
+    (b"Jan", b"Feb", b"Mar", b"Apr", b"May", b"Jun", b"Jul", b"Aug", b"Sep", b"Oct", b"Nov", b"Dec"), 1)}
+
+def _offset(tz: bytes) -> int:
+    """Seconds east of UTC for b"Z", b"+0200" or b"-05:30"."""
+    if tz == b"Z":
+        return 0
+    digits = tz[1:].replace(b":", b"")
+    secs = int(digits[:2]) * 3600 + int(digits[2:4]) * 60
+    return -secs if tz[:1] == b"-" else secs
+
+def _epoch(y: int, mo: int, d: int, hh: int, mm: int, ss: int, tz: Optional[bytes]) -> float:
+    t = (y, mo, d, hh, mm, ss, 0, 0, -1)
+    return time.mktime(t) if tz is None else calendar.timegm(t) - _offset(tz)
+
+# group 1 is the whole timestamp ("ts"); the fields start at group 2
+
+def _iso(m, now: float) -> float:
+    return _epoch(int(m[2]), int(m[3]), int(m[4]), int(m[5]), int(m[6]), int(m[7]), m[8])
+
+def _syslog(m, now: float) -> float:
+    # no year in the line: take the current one, or last year's when that would be in the future
+    year = time.localtime(now).tm_year
+    args = (_MONTHS[m[2]], int(m[3]), int(m[4]), int(m[5]), int(m[6]), None)
+    ts = _epoch(year, *args)
+    return _epoch(year - 1, *args) if ts > now + 86400 else ts
+
+def _nginx(m, now: float) -> float:
+    return _epoch(int(m[4]), _MONTHS[m[3]], int(m[2]), int(m[5]), int(m[6]), int(m[7]), m[8])
+
+class Format(NamedTuple):
+    name: str
+    rx: re.Pattern      # matched at the start of a line; group "ts" is the timestamp text
+    parse: Callable
+
+FORMATS = (
+    Format("iso", re.compile(rb"(?:<\d{1,3}>\d{0,2} ?)?(?P<ts>(\d{4})-(\d\d)-(\d\d)[T ](\d\d):(\d\d):(\d\d)"
+                             rb"(?:[.,]\d+)?(Z|[+-]\d\d:?\d\d)?)"), _iso),
+    Format("syslog", re.compile(rb"(?P<ts>(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec) ([ \d]\d) "
+                                rb"(\d\d):(\d\d):(\d\d))[ .]"), _syslog),
+    Format("nginx", re.compile(rb"\S+ \S+ \S+ \[(?P<ts>(\d\d)/(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)/"
+                               rb"(\d{4}):(\d\d):(\d\d):(\d\d) ([+-]\d{4}))\]"), _nginx),
+)
+
+def parse_when(spec: str, now: Optional[float] = None) -> float:
+    """Epoch seconds for "15m", "2h", "1d" (ago), "now", "today", "yesterday", "10:30[:00]" (today)
+    or an ISO date/time ("2024-05-01", "2024-05-01 10:30", "2024-05-01T10:30:00Z")."""
+    now = time.time() if now is None else now
+    s = spec.strip().lower()
+    m = re.fullmatch(r"-?(\d+(?:\.\d+)?)\s*(s|sec|m|min|h|d|w)", s)
+    if m:
+        return now - float(m[1]) * {"s": 1, "sec": 1, "m": 60, "min": 60, "h": 3600, "d": 86400, "w": 604800}[m[2]]
+    if s == "now":
+        return now
+    if s in ("today", "yesterday"):
+        t = time.localtime(now)
+        return time.mktime((t.tm_year, t.tm_mon, t.tm_mday - (s == "yesterday"), 0, 0, 0, 0, 0, -1))
+    m = re.fullmatch(r"(\d\d?):(\d\d)(?::(\d\d))?", s)
+    if m:
+        t = time.localtime(now)
+        return time.mktime((t.tm_year, t.tm_mon, t.tm_mday, int(m[1]), int(m[2]), int(m[3] or 0), 0, 0, -1))
+    m = re.fullmatch(r"(\d{4})-(\d\d)-(\d\d)(?:[t ](\d\d):(\d\d)(?::(\d\d))?(?:\.\d+)?(z|[+-]\d\d:?\d\d)?)?", s)
+    if m:
+        tz = m[7].upper().encode() if m[7] else None
+        return _epoch(int(m[1]), int(m[2]), int(m[3]), int(m[4] or 0), int(m[5] or 0), int(m[6] or 0), tz)
+    raise ValueError(f"cannot parse time {spec!r} (try 15m, 2h, 10:30 or 2024-05-01T10:30)")
+
+def detect(buf, end: int, lines: int = 200) -> Optional[Format]:
+    """The format that stamps most of the first `lines` lines of buf[:end]."""
+    counts = [0] * len(FORMATS)
+    pos = 0
+    for _ in range(lines):
+        if pos >= end:
+            break
+        for i, fmt in enumerate(FORMATS):
+            if fmt.rx.match(buf, pos, end):
+                counts[i] += 1
+        nl = buf.find(b"\n", pos, end)
+        pos = end if nl < 0 else nl + 1
+    best = max(range(len(FORMATS)), key=counts.__getitem__)
+    return FORMATS[best] if counts[best] else None
+
+class Slicer:
+    def __init__(self, fmt: Format, since: Optional[float] = None, until: Optional[float] = None,
+                 now: Optional[float] = None):
+        self.fmt, self.since, self.until = fmt, since, until
+        self.now = time.time() if now is None else now
+
+    def stamp(self, buf, pos: int, end: int) -> Optional[float]:
+        m = self.fmt.rx.match(buf, pos, end)
+        if m is None:
+            return None
+        try:
+            return self.fmt.parse(m, self.now)
+        except (ValueError, OverflowError):
+            return None
+
+    def label(self, buf, pos: int, end: int) -> str:
+        m = self.fmt.rx.match(buf, pos, end)
+        return m["ts"].decode("ascii", "replace") if m else ""
+
+    def next_stamped(self, buf, pos: int, end: int) -> Tuple[int, int, Optional[float]]:
+        """(start, end) of the first timestamped line at or after `pos`, and its time; (end, end, None) if none."""
+        while pos < end:
+            nl = buf.find(b"\n", pos, end)
+            nxt = end if nl < 0 else nl + 1
+            ts = self.stamp(buf, pos, end)
+            if ts is not None:
+                return pos, nxt, ts
+            pos = nxt
+        return end, end, None
+
+    def last_stamped(self, buf, start: int, end: int, lines: int = 1000) -> int:
+        """Start of the last timestamped line in buf[start:end] (looking back at most `lines` lines), or -1."""
+        pos = end
+        for _ in range(lines):
+            if pos <= start:
+                break
+            line = max(buf.rfind(b"\n", start, pos - 1) + 1, start)
+            if self.stamp(buf, line, end) is not None:
+                return line
+            pos = line
+        return -1
+
+    def bisect(self, buf, start: int, end: int, target: float, after: bool = False) -> int:
+        """Offset of the first line in buf[start:end] stamped at or after `target` (strictly after with
+        after=True); `end` when there is none. Assumes timestamps do not go backwards."""
+        lo, hi = start, end
+        while hi - lo > 16384:
+            mid = (lo + hi) // 2
+            nl = buf.find(b"\n", mid, hi)
+            if nl < 0:
+                break
+            line, nxt, ts = self.next_stamped(buf, nl + 1, hi)
+            if ts is None:
+                hi = mid
+            elif ts < target or (after and ts == target):
+                lo = nxt
+            else:
+                hi = line
+        pos = lo
+        while True:
+            line, pos, ts = self.next_stamped(buf, pos, end)
+            if ts is None:
+                return end
+            if ts > target or (ts == target and not after):
+                return line
+
+    def span(self, buf, start: int, end: int, started: bool = False) -> Tuple[int, int]:
+        """The [lo, hi) part of buf[start:end] inside the range. With started=True the range began
+        before `start`, so leading lines without a timestamp belong to it."""
+        lo = start if started or self.since is None else self.bisect(buf, start, end, self.since)
+        hi = end if self.until is None else self.bisect(buf, lo, end, self.until, after=True)
+        return lo, hi
+
+    def window_label(self, buf, start: int, end: int) -> Optional[Tuple[str, str]]:
+        """Timestamps of the first and last timestamped lines in buf[start:end]."""
+        first, _, ts = self.next_stamped(buf, start, end)
+        last = self.last_stamped(buf, start, end)
+        if ts is None or last < 0:
+            return None
+        return self.label(buf, first, end), self.label(buf, last, end)
+
+def _range(since: Optional[float], until: Optional[float]) -> str:
+    fmt = lambda t: time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(t)) if t is not None else "…"  # noqa: E731
+    return f"{fmt(since)} → {fmt(until)}"
+
+def select_file(path: str, since: Optional[float], until: Optional[float], limit: int, echo: bool = True,
+                info: Optional[dict] = None, head: int = 0) -> bytes:
+    """The lines of `path` stamped between `since` and `until` (None = open end), at most the last `limit`
+    bytes of them. The selected lines (not the whole file) are echoed to stdout."""
+    import io, mmap, os, stat, sys
+    from .stream import _copy_range, _fileno, _line_start, open_input
+    info = info if info is not None else {}
+    f = open_input(path)
+    with f:
+        if not (isinstance(f, io.BufferedReader) and stat.S_ISREG(os.fstat(f.fileno()).st_mode)):
+            return select_stream(f, since, until, limit, sys.stdout.buffer if echo else None, info, head)
+        size = os.fstat(f.fileno()).st_size
+        info["bytes_in"], info["head"] = 0, b""
+        if not size:
+            return b""
+        with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as mm:
+            fmt = detect(mm, size)
+            if fmt is None:
+                raise ValueError(f"no syslog, ISO-8601 or nginx timestamps found in {path}")
+            sl = Slicer(fmt, since, until)
+            lo, hi = sl.span(mm, 0, size)
+            if echo and hi > lo:
+                sys.stdout.flush()
+                out_fd = _fileno(sys.stdout)
+                if out_fd is None or _copy_range(f.fileno(), out_fd, lo, hi) is None:
+                    sys.stdout.buffer.write(mm[lo:hi])
+                    sys.stdout.buffer.flush()
+            start = _line_start(mm, max(lo, hi - limit), hi) if limit > 0 else hi
+            info["bytes_in"], info["aligned"] = hi - lo, True
+            if head and start > lo:
+                info["head"] = mm[lo:min(lo + head, start)]
+            info["time_window"] = sl.window_label(mm, start, hi)
+            if hi == lo:
+                info["time_range"] = _range(since, until)
+                whole = sl.window_label(mm, 0, size)
+                if whole:
+                    info["file_range"] = f"{whole[0]} → {whole[1]}"
+            return mm[start:hi]
+
+def select_stream(src, since: Optional[float], until: Optional[float], limit: int, echo=None,
+                  info: Optional[dict] = None, head: int = 0, chunk_size: int = 1 << 20) -> bytes:
+    """select_file for a binary stream: each chunk is cut at its last newline and bisected on its own."""
+    from .stream import RingBuffer, _line_start
+    info = info if info is not None else {}
+    ring = RingBuffer(limit, head=head)
+    read1 = getattr(src, "read1", src.read)
+    sl: Optional[Slicer] = None
+    pending = b""
+    started = False
+    while True:
+        chunk = read1(chunk_size)
+        data = pending + chunk
+        if chunk:
+            cut = data.rfind(b"\n") + 1
+            if not cut:
+                pending = data
+                continue
+            data, pending = data[:cut], data[cut:]
+        else:
+            pending = b""
+        if data:
+            if sl is None:
+                fmt = detect(data, len(data))
+                if fmt is None:
+                    raise ValueError("no syslog, ISO-8601 or nginx timestamps found in the input")
+                sl = Slicer(fmt, since, until)
+            lo, hi = sl.span(data, 0, len(data), started)
+            started = started or lo < len(data)
+            if hi > lo:
+                view = memoryview(data)[lo:hi]
+                ring.append(view)
+                if echo is not None:
+                    echo.write(view)
+                    echo.flush()
+            if hi < len(data):
+                break           # past --until: nothing later can be in range
+        if not chunk:
+            break
+    window = ring.getvalue()
+    info["bytes_in"], info["head"], info["aligned"] = ring.total, bytes(ring.head), True
+    if ring.total > len(window):
+        window = window[_line_start(window, 1, len(window)):]
+    if sl is not None:
+        info["time_window"] = sl.window_label(window, 0, len(window))
+    if not window:
+        info["time_range"] = _range(since, until)
+    return window
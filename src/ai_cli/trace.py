@@ -0,0 +1,101 @@
+from __future__ import annotations
+import json, os, sys, threading, time
+from collections import Counter
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Per-run instrumentation. Stages are timed with perf_counter and summed by
+# name; everything else (bytes, token estimates, pool and cache figures) is a
+# plain field. One JSON object per run goes to stderr or a file (--trace) and,
+# when metrics_log is set, is appended to a local log for p50/p99 charts.
+
+# Token usage as reported by the providers (input, output, cached prefix
+# tokens), summed over every call in this process. collect_usage() also
+# gathers the calls made by the current thread, which is how `kull serve`
+# hands per-request usage back to its client.
+USAGE: Counter = Counter()
+_usage_lock = threading.Lock()
+_local = threading.local()
+
+def record_usage(**counts) -> None:
+    counts = {k: int(v) for k, v in counts.items() if v is not None}
+    if not counts:
+        return
+    with _usage_lock:
+        USAGE.update(counts)
+    mine = getattr(_local, "usage", None)
+    if mine is not None:
+        mine.update(counts)
+
+@contextmanager
+def collect_usage() -> Iterator[Counter]:
+    _local.usage = Counter()
+    try:
+        yield _local.usage
+    finally:
+        _local.usage = None
+
+class _Stage:
+    __slots__ = ("trace", "name", "t")
+
+    def __init__(self, trace: "Trace", name: str):
+        self.trace, self.name = trace, name
+
+    def __enter__(self) -> None:
+        self.t = time.perf_counter()
+
+    def __exit__(self, *exc) -> None:
+        self.trace.add(self.name, time.perf_counter() - self.t)
+
+class Trace:
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.stages: dict = {}          # name -> seconds
+        self.fields: dict = {}
+
+    def stage(self, name: str) -> _Stage:
+        return _Stage(self, name)
+
+    def add(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def set(self, **fields) -> None:
+        self.fields.update(fields)
+
+    def record(self) -> dict:
+        rec = {"ts": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())}
+        rec.update(self.fields)
+        rec["stages_ms"] = {k: round(v * 1000, 2) for k, v in self.stages.items()}
+        rec["total_ms"] = round((time.perf_counter() - self.t0) * 1000, 2)
+        return rec
+
+    def emit(self, dest: Optional[str] = None, metrics_log: Optional[str] = None) -> None:
+        """Write the record to `dest` ("-" = stderr) and append it to `metrics_log`; either may be empty."""
+        if not dest and not metrics_log:
+            return
+        line = json.dumps(self.record(), separators=(",", ":")) + "\n"
+        if dest == "-":
+            sys.stderr.write(line)
+            sys.stderr.flush()
+        for path in {dest, metrics_log} - {None, "", "-"}:
+            try:
+                path = os.path.expanduser(path)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+                try:
+                    os.write(fd, line.encode("utf-8"))
+                finally:
+                    os.close(fd)
+            except OSError as e:
+                print(f"[kull] trace: cannot write {path}: {e}", file=sys.stderr)
+
+class _NullTrace(Trace):
+    """Accepts every call and keeps nothing; used where no run-level trace exists (batch, follow)."""
+
+    def add(self, name: str, seconds: float) -> None:
+        pass
+
+    def set(self, **fields) -> None:
+        pass
+
+NULL = _NullTrace()
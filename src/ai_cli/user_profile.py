@@ -1,7 +1,6 @@
 from __future__ import annotations
 from enum import Enum
 from dataclasses import dataclass
-import profile
 from typing import List, Optional
 
 class SkillLevel(Enum):
@@ -0,0 +1,79 @@
+import os, threading, time
+
+from ai_cli.cache import ResponseCache, cache_key, replay
+
+
+def test_key_covers_every_part():
+    base = ("sha", "prompt", "text", "openai", "gpt", 512, "")
+    keys = {cache_key(*base)}
+    for i in range(len(base)):
+        changed = list(base)
+        changed[i] = changed[i] + 1 if isinstance(changed[i], int) else changed[i] + "x"
+        keys.add(cache_key(*changed))
+    assert len(keys) == len(base) + 1
+
+
+def test_put_get_and_ttl(tmp_path):
+    cache = ResponseCache(tmp_path, ttl=60)
+    cache.put("ab" * 32, "answer", provider="p")
+    cache.put("cd" * 32, "other")
+    assert cache.get("ab" * 32) == "answer"
+    assert cache.get("ef" * 32) is None
+    old = time.time() - 120             # evict() reads "created" from the mtime
+    os.utime(cache._path("cd" * 32), (old, old))
+    cache.evict()
+    assert not cache._path("cd" * 32).exists() and cache._path("ab" * 32).exists()
+    cache.ttl = 1
+    time.sleep(1.1)
+    assert cache.get("ab" * 32) is None and not cache._path("ab" * 32).exists()
+
+
+def test_evict_drops_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path, max_bytes=10 ** 6, evict_every=10 ** 6)
+    keys = [f"{i:02x}" * 32 for i in range(4)]
+    for i, key in enumerate(keys):
+        cache.put(key, "x" * 1000)
+        t = time.time() - 100 + i
+        os.utime(cache._path(key), (t, os.stat(cache._path(key)).st_mtime))
+    cache.get(keys[0])                  # now the most recently used
+    cache.max_bytes = 2500
+    cache.evict()
+    assert [cache._path(k).exists() for k in keys] == [True, False, False, True]
+
+
+def test_put_evicts_only_now_and_then(tmp_path, monkeypatch):
+    cache = ResponseCache(tmp_path, evict_every=5, evict_interval=3600)
+    calls = []
+    real = cache.evict
+    monkeypatch.setattr(cache, "evict", lambda: (calls.append(1), real()))
+    for i in range(12):
+        cache.put(f"{i:02x}" * 32, "answer")
+    assert len(calls) == 3              # the first put (no marker yet), then every 5th
+
+
+def test_concurrent_puts_of_one_key(tmp_path):
+    cache = ResponseCache(tmp_path, evict_every=10 ** 6)
+    key = "ef" * 32
+    errors = []
+
+    def put(n):
+        try:
+            for _ in range(50):
+                cache.put(key, str(n) * 5000)
+        except Exception as e:      # pragma: no cover
+            errors.append(e)
+
+    threads = [threading.Thread(target=put, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not errors
+    text = cache.get(key)
+    assert text is not None and len(set(text)) == 1 and len(text) == 5000
+    assert [p.name for p in cache._path(key).parent.iterdir()] == [f"{key}.json"]
+
+
+def test_replay():
+    assert "".join(replay("abcdefghij", chunk=3)) == "abcdefghij"
+    assert list(replay("abcdefghij", chunk=3))[0] == "abc"
@@ -0,0 +1,24 @@
+from ai_cli.facts import LogFacts
+
+
+def test_severity_on_non_ascii_text():
+    # "İ".lower() is two characters: offsets taken from text.lower() drift past such lines
+    text = "İİİİİİİİ login ok\nERROR boom\nWarning: disk\nsome İnfo text\nINFO started\n"
+    facts = LogFacts().add(text)
+    assert facts.lines == 5
+    assert dict(facts.levels) == {"error": 1, "warning": 1, "info": 1, "unmarked": 2}
+
+
+def test_first_word_on_a_line_wins_and_priority_prefix_beats_words():
+    facts = LogFacts().add("warning: retry after error\n<3>info: failed\nterror is not a level\n")
+    assert dict(facts.levels) == {"warning": 1, "error": 1, "unmarked": 1}
+
+
+def test_feed_matches_add_across_chunks():
+    data = b"Nov 14 22:13:00 web1 sshd[1]: error: exit code 255\nNov 14 22:13:01 web1 nginx[2]: warn x.service\n" * 7
+    expect = LogFacts().add(data.decode()).render()
+    for size in (1, 5, 33):
+        facts = LogFacts()
+        for i in range(0, len(data), size):
+            facts.feed(data[i:i + size])
+        assert facts.close().render() == expect
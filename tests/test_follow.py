@@ -0,0 +1,64 @@
+from ai_cli.follow import Follower
+
+
+def test_facts_count_the_raw_lines():
+    f = Follower(every=0, limit=200, facts=True)
+    for i in range(20):
+        f.add(f"Nov 14 22:13:{i:02d} web1 sshd[12]: error: auth failed for root from 10.0.0.{i}")
+    for i in range(3):
+        f.add(f"Nov 14 22:14:{i:02d} web1 cron[3]: info: job ran")
+    text = f.take()
+    assert "[... 20 lines elided ...]" in text      # the text sent is summarized ...
+    facts = f.taken                                 # ... the facts are not
+    assert facts.lines == 23
+    assert facts.levels["error"] == 20 and facts.levels["info"] == 3
+    assert facts.programs == {"sshd": 20, "cron": 3}
+    f.add("Nov 14 22:15:00 web1 cron[3]: info: again")
+    f.take()
+    assert f.taken.lines == 1
+
+
+def test_no_facts_by_default():
+    f = Follower(every=0)
+    f.add("error: x")
+    f.take()
+    assert f.facts is None and f.taken is None
+
+
+def test_echo_goes_on_while_an_analysis_runs():
+    import os, threading
+    from ai_cli.follow import run
+
+    in_r, in_w = os.pipe()
+    out_r, out_w = os.pipe()
+    started, release = threading.Event(), threading.Event()
+    updates = []
+
+    def analyze(text, facts):
+        updates.append(text)
+        started.set()
+        release.wait(5)
+
+    t = threading.Thread(target=run, args=(Follower(every=0, every_lines=2), analyze, in_r, out_w), daemon=True)
+    t.start()
+    os.write(in_w, b"one\ntwo\n")
+    assert started.wait(5)
+    os.write(in_w, b"three\nfour\nfi")          # arrives during the analysis
+    echoed = b""
+    while not echoed.endswith(b"four\n"):
+        echoed += os.read(out_r, 100)
+    assert echoed == b"one\ntwo\nthree\nfour\n"     # the partial line waits until the analysis is done
+    release.set()
+    os.write(in_w, b"ve\n")
+    os.close(in_w)
+    t.join(5)
+    assert not t.is_alive()
+    os.close(out_w)
+    while True:
+        data = os.read(out_r, 100)
+        if not data:
+            break
+        echoed += data
+    assert echoed == b"one\ntwo\nthree\nfour\nfive\n"
+    new = [u.split("analysis", 1)[1].split("\n", 1)[1] for u in updates]
+    assert "".join(new) == "one\ntwo\nthree\nfour\nfive\n"
@@ -0,0 +1,76 @@
+import json
+
+from ai_cli.budget import approx_tokens
+from ai_cli.jsonlog import JsonFacts, JsonLog, _priority, compact, detect
+
+
+def _journal(n):
+    units = [("nginx.service", "6"), ("sshd.service", "3"), ("cron.service", "6"), ("app.service", "4")]
+    out = []
+    for i in range(n):
+        unit, prio = units[i % len(units)]
+        out.append(json.dumps({"__REALTIME_TIMESTAMP": str(1700000000000000 + i * 1000000), "_SYSTEMD_UNIT": unit,
+                               "PRIORITY": prio, "MESSAGE": f"message {i} from {unit}", "_HOSTNAME": "web1"}))
+    return "\n".join(out) + "\n"
+
+
+def test_detect():
+    assert detect(_journal(5))
+    assert detect('{"level":"info","msg":"a"}\n{"level":"warn","msg":"b"}\nplain\n')
+    assert not detect('{"level":"info","msg":"only one"}\n')
+    assert not detect('{"a":1}\n{"a":2}\n{"a":3}\n')          # JSON lines, but not a log
+    assert not detect('{"msg":"a"}\n{"msg":"b"}\nx\ny\nz\n')   # mostly plain text
+    assert not detect("Nov 14 22:13:20 web1 sshd[1]: hello\n")
+
+
+def test_priority_bunyan_levels():
+    assert [_priority(v) for v in (60, 50, 40, 30, 20, 10)] == [2, 3, 4, 6, 7, 7]
+    assert _priority(3) == 3 and _priority("3") == 3
+    assert _priority("WARN") == 4 and _priority("fatal") == 2
+    assert _priority(True) is None and _priority(8) is None and _priority("nope") is None
+
+
+def test_compact_groups_by_unit_and_priority():
+    text, log = compact(_journal(8))
+    assert log is not None and log.kind == "journald" and len(log.entries) == 8
+    assert text.startswith("JSON log (journald): 8 entries, 4 units")
+    assert "[sshd.service | err | 2 entries | host=web1]" in text
+    assert text.index("[sshd.service") < text.index("[app.service") < text.index("[nginx.service")
+    assert "message 5 from sshd.service" in text
+    assert compact("plain\ntext\n") == ("plain\ntext\n", None)
+
+
+def test_compact_priority_filter_and_partial_first():
+    text, log = compact(_journal(8), priority=4)
+    assert {e.prio for e in log.entries} == {3, 4}
+    assert "Filtered out (--priority warning): info 4" in text
+    cut = '_UNIT":"x"}\n' + _journal(4)
+    _, log = compact(cut, partial_first=True)
+    assert log.other == []
+    _, log = compact(cut)
+    assert log.other == ['_UNIT":"x"}']
+
+
+def test_budget_keeps_every_group_header():
+    full, _ = compact(_journal(400))
+    text, _ = compact(_journal(400), budget=300)
+    assert approx_tokens(text) <= 300 < approx_tokens(full)
+    for unit, prio in (("sshd.service", "err"), ("app.service", "warning"), ("cron.service", "info"),
+                       ("nginx.service", "info")):
+        assert f"[{unit} | {prio} | 100 entries | host=web1]" in text
+    assert "message 399 from app.service" in text        # newest rows are the ones kept
+    assert "earlier entries elided" in text
+    assert compact(_journal(8), budget=10000)[0] == compact(_journal(8))[0]
+
+
+def test_json_facts_across_chunk_boundaries():
+    data = (_journal(50) + "not json\n").encode()
+    expect = JsonLog()
+    for line in data.decode().splitlines():
+        expect.add(line)
+    expect = expect.facts().render()
+    for size in (1, 7, 64, len(data)):
+        facts = JsonFacts()
+        for i in range(0, len(data), size):
+            facts.feed(data[i:i + size])
+        assert facts.close().render() == expect
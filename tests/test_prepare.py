@@ -0,0 +1,56 @@
+import argparse
+
+from ai_cli.budget import approx_tokens
+from ai_cli.cli import _add_flags, _prepare_text
+
+CFG = {"redact": "basic", "json_logs": "on", "facts": "on"}
+
+
+def _args(*argv):
+    parser = argparse.ArgumentParser()
+    _add_flags(parser, CFG)
+    return parser.parse_args(list(argv))
+
+
+def _log(n):
+    return b"".join(b"Nov 14 22:%02d:%02d web1 app[7]: %s request %d done\n"
+                    % (i // 60 % 60, i % 60, b"error" if i % 50 == 0 else b"info", i) for i in range(n))
+
+
+def test_head_meeting_the_window_keeps_the_split_line():
+    data = _log(200)
+    cut = data.index(b"request 150") + 3         # the window starts inside a line
+    info = {"bytes_in": len(data), "head": data[:cut], "aligned": False}
+    text = _prepare_text(data[cut:], info, _args("-sum", "-B", "100000", "--no-facts"), CFG)
+    assert text == data.decode()                  # nothing skipped, nothing dropped
+    text = _prepare_text(data[cut:], dict(info), _args("-sum", "-B", "100000"), CFG)
+    assert "- Lines: 200 " in text and "input bytes" not in text
+
+
+def test_skipped_input_drops_the_partial_first_line():
+    data = _log(2000)
+    cut = data.index(b"request 1500") + 3
+    info = {"bytes_in": len(data), "head": data[:300], "aligned": False}
+    text = _prepare_text(data[cut:], info, _args("-sum", "-B", "100000", "--no-facts"), CFG)
+    assert "bytes of input elided" in text
+    assert "est 1500 done" not in text and "request 1501 done" in text
+
+
+def test_facts_and_time_window_count_against_the_budget():
+    data = _log(3000)
+    info = {"bytes_in": len(data), "time_window": ("22:00", "23:00")}
+    text = _prepare_text(data, info, _args("-sum", "-B", "500"), CFG)
+    assert text.startswith("Time window (--since/--until): 22:00 → 23:00\nLog facts")
+    block = text[:text.index("Nov 14 22:00:00 web1")]
+    assert "- Lines: 3000" in block and approx_tokens(block) > 50
+    assert approx_tokens(text) <= 500 + 10       # select() leaves its elision markers unbudgeted
+
+
+def test_json_budget_leaves_room_for_the_facts():
+    import json
+    lines = [json.dumps({"time": 1700000000 + i, "level": "error" if i % 3 else "info", "msg": f"event {i}"})
+             for i in range(500)]
+    data = ("\n".join(lines) + "\n").encode()
+    text = _prepare_text(data, {"bytes_in": len(data)}, _args("-sum", "-B", "300"), CFG)
+    assert "Log facts" in text and "[- | err | 333 entries]" in text and "[- | info | 167 entries]" in text
+    assert approx_tokens(text) <= 300 + 10
@@ -0,0 +1,83 @@
+import io, threading, time
+
+from ai_cli.race import Contender, RaceProvider
+
+
+class Fake:
+    def __init__(self, deltas, wait=None):
+        self.deltas, self.wait = deltas, wait
+
+    def stream(self, prompt, text, model, max_tokens, timeout):
+        if self.wait is not None:
+            self.wait.wait(5)
+        yield from self.deltas
+
+
+def test_stream_twice_on_same_provider():
+    slow = threading.Event()
+    race = RaceProvider([Contender("a", "m", Fake(["he", "llo"])), Contender("b", "m", Fake(["x"], wait=slow))],
+                        log=io.StringIO())
+    out = []
+
+    def run():
+        out.append(race.complete("p", "t", "m", 10, 5))
+        out.append(race.complete("p", "t", "m", 10, 5))
+        out.append(race.winner.name)
+
+    t = threading.Thread(target=run, daemon=True)
+    t.start()
+    t.join(5)
+    slow.set()
+    assert out == ["hello", "hello", "a"]
+
+
+
+class Echo:
+    """Streams the prompt back in two parts; fails for prompts in `fail`."""
+
+    def __init__(self, fail=(), delay=0.0):
+        self.fail, self.delay = fail, delay
+
+    def stream(self, prompt, text, model, max_tokens, timeout):
+        time.sleep(self.delay)
+        if prompt in self.fail:
+            raise RuntimeError("down")
+        yield prompt[:1]
+        yield prompt[1:]
+
+
+def _race():
+    return RaceProvider([Contender("a", "m", Echo(fail=("two",))), Contender("b", "m", Echo(delay=0.3))],
+                        log=io.StringIO())
+
+
+def test_interleaved_streams():
+    race = _race()
+    one = race.stream("one", "t", "m", 10, 5)
+    assert next(one) == "o"
+    two = race.stream("two", "t", "m", 10, 5)
+    assert next(two) == "t"
+    assert "".join(one) == "ne"
+    assert "".join(two) == "wo"
+
+
+def test_winner_is_per_call():
+    race = _race()
+    got, two_done = {}, threading.Event()
+
+    def first():
+        race.complete("one", "t", "m", 10, 5)
+        two_done.wait(5)                # the other call finished in between
+        got["one"] = race.winner.name
+
+    def second():
+        race.complete("two", "t", "m", 10, 5)
+        got["two"] = race.winner.name
+        two_done.set()
+
+    threads = [threading.Thread(target=f, daemon=True) for f in (first, second)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    assert got == {"one": "a", "two": "b"}
@@ -0,0 +1,76 @@
+from ai_cli.scan import compact, parse
+
+NMAP = """\
+Starting Nmap 7.94 ( https://nmap.org ) at 2024-05-01 10:00 UTC
+Nmap scan report for web1.example.com (10.0.0.1)
+Host is up (0.00050s latency).
+Not shown: 997 closed tcp ports (reset)
+PORT    STATE    SERVICE VERSION
+22/tcp  open     ssh     OpenSSH 8.9p1 Ubuntu 3ubuntu0.6 (protocol 2.0)
+80/tcp  open     http    nginx 1.18.0
+| http-title: Welcome
+|_Requested resource was /login
+443/tcp filtered https
+Service Info: OS: Linux; CPE: cpe:/o:linux:linux_kernel
+
+Nmap scan report for 10.0.0.2
+Host is up.
+PORT   STATE SERVICE VERSION
+22/tcp open  ssh     OpenSSH 8.9p1 Ubuntu 3ubuntu0.6 (protocol 2.0)
+80/tcp open  http    nginx 1.18.0
+| ssh-hostkey:
+|_  256 aa:bb (ED25519)
+
+Nmap scan report for 10.0.0.3
+Host is up.
+PORT   STATE SERVICE VERSION
+22/tcp open  ssh     OpenSSH 8.9p1 Ubuntu 3ubuntu0.6 (protocol 2.0)
+80/tcp open  http    nginx 1.18.0
+| http-title: Welcome
+|_Requested resource was /login
+
+Nmap done: 5 IP addresses (3 hosts up) scanned in 2.00 seconds
+"""
+
+
+def test_nmap_normal_rows_and_notes():
+    text, scan = compact(NMAP)
+    assert scan.formats == ["nmap"] and scan.down == 2 and scan.not_open == 998
+    h = scan.hosts["10.0.0.1"]
+    assert h.names == ["web1.example.com"] and sorted(h.ports) == [(22, "tcp"), (80, "tcp")]
+    assert h.ports[(80, "tcp")].version == "nginx 1.18.0"
+    lines = text.splitlines()
+    assert lines[0] == "Parsed scan (nmap): 3 hosts up, 2 down, 6 open ports; 998 closed/filtered ports omitted"
+    assert lines[2] == ("10.0.0.1 (web1.example.com), 10.0.0.2-10.0.0.3 [3 hosts] | "
+                        "22/tcp ssh OpenSSH 8.9p1 Ubuntu 3ubuntu0.6 (protocol 2.0); 80/tcp http nginx 1.18.0")
+    assert "- 10.0.0.1:80/tcp, 10.0.0.3:80/tcp: http-title: Welcome Requested resource was /login" in lines
+    assert "ssh-hostkey" not in text                     # uninteresting script output is dropped
+    assert compact("just a log line\n") == ("just a log line\n", None)
+
+
+def test_grepable_masscan_and_xml():
+    grep = ("Host: 10.0.1.5 (db)\tStatus: Up\n"
+            "Host: 10.0.1.5 (db)\tPorts: 5432/open/tcp//postgresql//PostgreSQL DB 9.6|10/, 6379/closed/tcp//redis///"
+            "\tIgnored State: closed (998)\n"
+            "Host: 10.0.1.6 ()\tStatus: Down\n")
+    scan = parse(grep)
+    assert scan.formats == ["nmap-grepable"] and list(scan.hosts) == ["10.0.1.5"] and scan.down == 1
+    assert scan.hosts["10.0.1.5"].ports[(5432, "tcp")].version == "PostgreSQL DB 9.6/10"
+    assert scan.not_open == 999
+
+    masscan = "".join(f"open tcp 443 10.1.0.{i} 1700000000\n" for i in range(1, 201))
+    masscan += "banner tcp 443 10.1.0.7 1700000000 ssl TLSv1.0 cipher\\x0d\\x0a\n"
+    text, scan = compact(masscan)
+    assert len(scan.hosts) == 200
+    assert "\n10.1.0.1-10.1.0.6, 10.1.0.8-10.1.0.200 [199 hosts] | 443/tcp\n10.1.0.7 | 443/tcp ssl\n" in text
+    assert "- 10.1.0.7:443/tcp: ssl: TLSv1.0 cipher" in text
+    text, _ = compact("".join(f"open tcp 80 10.1.1.{i} 1700000000\n" for i in range(1, 201, 2)))
+    assert "10.1.1.63, +68 more [100 hosts] | 80/tcp" in text
+
+    xml = ('<?xml version="1.0"?><nmaprun><host><status state="up"/><address addr="10.2.0.1" addrtype="ipv4"/>'
+           '<ports><port protocol="tcp" portid="21"><state state="open"/><service name="ftp" product="vsftpd" '
+           'version="3.0.3"/><script id="ftp-anon" output="Anonymous FTP login allowed"/></port></ports></host>'
+           '<host><status state="up"/><address addr="10.2.0.2" addrtype="ipv4"/><ports><port protocol="tcp" ')
+    text, scan = compact(xml)                            # the window ends mid-<host>
+    assert scan.formats == ["nmap-xml"] and list(scan.hosts) == ["10.2.0.1"]
+    assert "10.2.0.1 | 21/tcp ftp vsftpd 3.0.3" in text and "ftp-anon: Anonymous FTP login allowed" in text
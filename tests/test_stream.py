@@ -0,0 +1,103 @@
+import io, os, random
+
+from ai_cli.stream import RingBuffer, SSEDecoder, tail_file, tail_window
+
+
+def test_ring_keeps_the_last_capacity_bytes():
+    rnd = random.Random(0)
+    for cap in (1, 7, 100, 5000):
+        ring, seen = RingBuffer(cap, head=10), b""
+        for _ in range(200):
+            chunk = os.urandom(rnd.choice((0, 1, 3, cap - 1 or 1, cap, cap + 5, 777)))
+            ring.append(chunk)
+            seen += chunk
+            assert ring.getvalue() == seen[-cap:]
+            assert len(ring) == min(cap, len(seen)) and ring.total == len(seen)
+        assert bytes(ring.head) == seen[:10]
+
+
+def test_ring_grows_only_with_the_input():
+    ring = RingBuffer(64 << 20)
+    ring.append(b"x" * 1000)
+    assert len(ring._buf) < 1 << 20
+    ring.append(b"y" * (3 << 20))
+    assert (3 << 20) <= len(ring._buf) < (8 << 20)
+    assert ring.getvalue() == b"x" * 1000 + b"y" * (3 << 20)
+
+
+def test_ring_fill_from_a_pipe():
+    r, w = os.pipe()
+    data = os.urandom(300000)
+    ring = RingBuffer(100000)
+    pos = 0
+    try:
+        while pos < len(data):
+            n = os.write(w, data[pos:pos + 40000])
+            got = 0
+            while got < n:
+                last = ring.fill(r, 65536)
+                got += last
+                assert bytes(ring.last(last)) == data[pos + got - last:pos + got]
+            pos += n
+    finally:
+        os.close(r)
+        os.close(w)
+    assert ring.getvalue() == data[-100000:]
+
+
+def test_tail_window_echoes_and_keeps_the_tail():
+    src, dst, info = io.BytesIO(b"".join(b"line %d\n" % i for i in range(1000))), io.BytesIO(), {}
+    window = tail_window(100, src=src, dst=dst, chunk_size=64, info=info, head=20)
+    assert dst.getvalue() == src.getvalue()
+    assert window == src.getvalue()[-100:]
+    assert info["bytes_in"] == len(src.getvalue()) and info["head"] == src.getvalue()[:20]
+
+
+def test_tail_file_starts_at_a_line(tmp_path, capsys):
+    path = tmp_path / "log"
+    path.write_bytes(b"".join(b"line %d\n" % i for i in range(1000)))
+    info = {}
+    window = tail_file(str(path), 100, echo=False, info=info)
+    assert window.startswith(b"line ") and path.read_bytes().endswith(window) and len(window) <= 100
+    assert info["bytes_in"] == path.stat().st_size and info["aligned"]
+    assert tail_file(str(path), 10 ** 6, echo=False) == path.read_bytes()
+
+
+def test_tail_file_gzip(tmp_path):
+    import gzip
+    data = b"".join(b"entry %d\n" % i for i in range(5000))
+    path = tmp_path / "log.1"           # detected by content, not the suffix
+    path.write_bytes(gzip.compress(data))
+    window = tail_file(str(path), 200, echo=False)
+    assert window.startswith(b"entry ") and data.endswith(window) and len(window) <= 200
+
+
+def _sse(data, size, types=None):
+    dec = SSEDecoder(types)
+    out = []
+    for i in range(0, len(data), size):
+        out += dec.feed(data[i:i + size])
+    return out + dec.flush(), dec
+
+
+def test_sse_split_anywhere():
+    data = ("data: {\"delta\": \"héllo ☃\"}\r\n\r\n"
+            ": keep-alive\r\n\r\n"
+            "event: delta\r\ndata: one\r\n\r\n"
+            "id: 7\nretry: 1500\ndata: a\ndata:b\n\n"
+            "event: ping\ndata: x\n\n"
+            "data: last").encode()
+    expect = [("message", "{\"delta\": \"héllo ☃\"}", None), ("delta", "one", None),
+              ("message", "a\nb", "7"), ("ping", "x", "7"), ("message", "last", "7")]
+    for size in (1, 2, 3, 5, 16, len(data)):
+        events, dec = _sse(data, size)
+        assert [tuple(e) for e in events] == expect, size
+        assert dec.retry == 1500 and dec.last_id == "7"
+    events, _ = _sse(data, 1, types=("delta",))
+    assert [e.data for e in events] == ["one"]
+
+
+def test_sse_lone_cr_line_endings():
+    data = b"event: a\rdata: 1\r\rdata: 2\r\r"
+    for size in (1, 4, len(data)):
+        assert [(e.event, e.data) for e in _sse(data, size)[0]] == [("a", "1"), ("message", "2")]
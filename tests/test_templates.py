@@ -0,0 +1,63 @@
+import random
+
+from ai_cli.templates import WILDCARD, TemplateMiner, compact, mask
+
+
+def _similar(c, tokens):
+    return sum(1 for a, b in zip(c.tokens, tokens) if a == b or a == WILDCARD) / len(tokens)
+
+
+def test_mask():
+    assert mask("conn from 10.0.0.1:443 took 12ms id=deadbeef01") == "conn from <IP> took <NUM> id=<HEX>"
+
+
+def test_repeats_collapse():
+    lines = [f"Nov 14 22:13:{i:02d} web1 sshd[{100 + i}]: Failed password for root from 10.0.0.{i}" for i in range(30)]
+    miner = TemplateMiner().feed(lines + ["Nov 14 22:14:00 web1 cron[1]: job started"])
+    assert miner.lines == 31 and len(miner.clusters) == 2
+    c = miner.top(1)[0]
+    assert c.count == 30 and c.first_ts == "Nov 14 22:13:00" and c.last_ts == "Nov 14 22:13:29"
+    assert c.template == "web1 sshd[<NUM>]: Failed password for root from <IP>"
+    out = compact("\n".join(lines))
+    assert out.startswith("[kull] 30 lines collapsed into 1 templates")
+
+
+def test_matches_the_most_similar_cluster():
+    rnd = random.Random(1)
+    words = "alpha bravo charlie delta echo foxtrot".split()
+    miner = TemplateMiner()
+    for _ in range(2000):
+        tokens = ["host"] + [rnd.choice(words) for _ in range(6)]
+        bucket = miner._buckets.get((7, "host"))
+        scores = [_similar(c, tokens) for c in bucket.clusters] if bucket else []
+        c = miner.add(" ".join(tokens))
+        if scores and max(scores) >= miner.sim:
+            assert c is bucket.clusters[scores.index(max(scores))]
+        else:
+            assert c.count == 1
+
+
+def test_full_bucket_evicts_least_used_and_keeps_compacting():
+    miner = TemplateMiner(max_clusters_per_bucket=3)
+    for i in range(3):
+        for _ in range(i + 2):
+            miner.add(f"host job{i} alpha{i} beta{i} gamma{i} delta{i}")
+    miner.add("host new1 x y z w")      # bucket is full: job0 (2 lines) makes room
+    for _ in range(5):
+        miner.add("host new1 x y z w")
+    bucket = miner._buckets[(6, "host")]
+    assert [c.tokens[1] for c in bucket.clusters] == ["job1", "job2", "new1"]
+    assert bucket.clusters[-1].count == 6
+    assert len(miner.clusters) == 4     # the evicted cluster stays in the output
+    assert all(len(cs) <= 3 for cs in bucket.index.values())
+
+
+def test_prune_keeps_the_most_frequent():
+    miner = TemplateMiner()
+    for i in range(10):
+        for _ in range(i + 1):
+            miner.add(f"unit{i} started")
+    miner.prune(3)
+    assert sorted(c.count for c in miner.clusters) == [8, 9, 10]
+    miner.add("unit0 started")
+    assert miner.lines == 56 and len(miner.clusters) == 4
@@ -0,0 +1,76 @@
+import io, time
+
+import pytest
+
+from ai_cli.timeslice import FORMATS, Slicer, detect, parse_when, select_file, select_stream
+
+T0 = 1700000000     # 2023-11-14 22:13:20 UTC
+
+
+def _iso_log(n, step=1):
+    out = []
+    for i in range(n):
+        out.append(time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(T0 + i * step)).encode()
+                   + b" app[1]: request %d\n" % i)
+        if i % 10 == 3:
+            out.append(b"  Traceback line for %d\n" % i)    # unstamped continuation
+    return b"".join(out)
+
+
+def _lines(data):
+    return [l for l in data.decode().splitlines() if not l.startswith(" ")]
+
+
+def test_detect_and_parse_when():
+    assert detect(b"2024-05-01T10:00:00Z x\n", 23).name == "iso"
+    assert detect(b"Nov 14 22:13:20 web1 sshd[1]: x\n", 32).name == "syslog"
+    assert detect(b'1.2.3.4 - - [14/Nov/2023:22:13:20 +0000] "GET / HTTP/1.1" 200\n', 61).name == "nginx"
+    assert detect(b"no stamps\n", 10) is None
+    assert parse_when("2h", now=T0) == T0 - 7200
+    assert parse_when("2023-11-14T22:13:20Z") == T0
+    with pytest.raises(ValueError):
+        parse_when("soon")
+
+
+def test_bisect_matches_a_linear_scan():
+    data = _iso_log(20000)
+    sl = Slicer(next(f for f in FORMATS if f.name == "iso"))
+    starts = [0] + [i + 1 for i in range(len(data) - 1) if data[i] == 10]
+    for k in (0, 1, 777, 12345, 19999, 20000, -1):
+        target = T0 + k
+        want = next((p for p in starts if (sl.stamp(data, p, len(data)) or -1) >= target), len(data))
+        assert sl.bisect(data, 0, len(data), target) == want
+        after = next((p for p in starts if (sl.stamp(data, p, len(data)) or -1) > target), len(data))
+        assert sl.bisect(data, 0, len(data), target, after=True) == after
+
+
+def test_select_file_and_stream_agree(tmp_path, capsys):
+    data = _iso_log(5000)
+    path = tmp_path / "app.log"
+    path.write_bytes(data)
+    since, until = T0 + 1000, T0 + 1999
+    info = {}
+    window = select_file(str(path), since, until, limit=1 << 20, info=info)
+    got = _lines(window)
+    assert got[0].endswith("request 1000") and got[-1].endswith("request 1999") and len(got) == 1000
+    assert b"Traceback line for 1993" in window          # continuation lines stay with their line
+    assert capsys.readouterr().out.encode() == window    # only the slice is echoed
+    assert info["time_window"] == ("2023-11-14T22:30:00Z", "2023-11-14T22:46:39Z")
+    for chunk in (100, 4096, 1 << 20):
+        sinfo = {}
+        assert select_stream(io.BytesIO(data), since, until, 1 << 20, info=sinfo, chunk_size=chunk) == window
+        assert sinfo["time_window"] == info["time_window"]
+
+
+def test_select_keeps_the_last_limit_bytes(tmp_path):
+    data = _iso_log(5000)
+    path = tmp_path / "app.log"
+    path.write_bytes(data)
+    info = {}
+    window = select_file(str(path), T0 + 1000, None, limit=2000, echo=False, info=info, head=100)
+    assert len(window) <= 2000 and _lines(window)[-1].endswith("request 4999")
+    assert window[:1] != b" " and info["head"].startswith(b"2023-11-14T22:30:00Z app[1]: request 1000")
+    assert select_stream(io.BytesIO(data), T0 + 1000, None, 2000, chunk_size=333) == window
+    empty = {}
+    assert select_file(str(path), T0 + 99999, None, limit=2000, echo=False, info=empty) == b""
+    assert "time_range" in empty and empty["file_range"].startswith("2023-11-14T22:13:20Z")